@@ -0,0 +1,167 @@
+"""
+Headless batch mode: one instruction per input line, JSONL results, no prompts or UI.
+
+    python run_assistant.py --batch script.txt > results.jsonl
+    cat script.txt | python run_assistant.py --batch - --allow "read_file,list_directory,search_web"
+
+Each line is interpreted and its commands executed under a pre-approved action policy
+(actions outside it are reported as denied, never executed). Lines are independent:
+each is interpreted with a fresh conversation history, so its result doesn't depend on
+which other lines finished first. They are processed concurrently by a bounded worker
+pool; results are written in input order.
+"""
+import sys
+import json
+import time
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ai_assistant.config import settings
+from ai_assistant.commands.interpreter import interpret_command
+from ai_assistant.executor.actions import execute_action
+from ai_assistant.llm.client import LLMClient, use_client
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer, LatencyHistogram
+
+logger = setup_logger(__name__)
+
+class ActionPolicy:
+    """Pre-approved actions: names or shell-style patterns ("*" allows everything)."""
+    def __init__(self, patterns):
+        self.patterns = [p.strip() for p in patterns if p.strip()]
+
+    @classmethod
+    def parse(cls, spec: str) -> "ActionPolicy":
+        return cls(spec.split(","))
+
+    def allows(self, action: str) -> bool:
+        return any(fnmatch.fnmatchcase(action or "", pattern) for pattern in self.patterns)
+
+def read_instructions(stream):
+    """(line number, instruction) for every non-empty line that isn't a # comment."""
+    for number, line in enumerate(stream, 1):
+        text = line.strip()
+        if text and not text.startswith("#"):
+            yield number, text
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+def run_instruction(number: int, instruction: str, policy: ActionPolicy) -> dict:
+    """Interprets and executes one line; never raises (failures are part of the record)."""
+    started = time.perf_counter()
+    record = {"line": number, "input": instruction, "status": "ok", "commands": []}
+    # A client of its own: no other line's turns in the prompt or the interpretation cache key
+    with use_client(LLMClient()), tracer.span("batch.line", line=number):
+        try:
+            commands = interpret_command(instruction)
+        except Exception as e:
+            logger.error(f"Line {number}: interpretation failed: {e}")
+            record.update(status="error", error=str(e), interpret_ms=_ms(started), total_ms=_ms(started))
+            return record
+        if isinstance(commands, dict):
+            commands = [commands]
+        record["interpret_ms"] = _ms(started)
+
+        for command in commands:
+            result = run_command(command, policy)
+            if result["status"] == "error":
+                record["status"] = "error"
+            elif result["status"] == "denied" and record["status"] == "ok":
+                record["status"] = "denied"
+            record["commands"].append(result)
+
+    record["total_ms"] = _ms(started)
+    return record
+
+def run_command(command: dict, policy: ActionPolicy) -> dict:
+    """Executes one command if the policy allows it; returns its result record (never raises)."""
+    action = command.get("action")
+    result = {"action": action, "params": command.get("params", {}), "confidence": command.get("confidence")}
+    if not policy.allows(action):
+        result["status"] = "denied"
+        return result
+    started = time.perf_counter()
+    try:
+        result["result"] = execute_action(command)
+        result["status"] = "error" if str(result["result"]).startswith("Error") else "ok"
+    except Exception as e:
+        result.update(status="error", result=str(e))
+    result["ms"] = _ms(started)
+    return result
+
+class _OrderedWriter:
+    """Writes records in line order although they complete out of order."""
+    def __init__(self, output):
+        self._output = output
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next = 0
+
+    def put(self, index: int, record: dict):
+        with self._lock:
+            self._pending[index] = record
+            while self._next in self._pending:
+                self._output.write(json.dumps(self._pending.pop(self._next), ensure_ascii=False) + "\n")
+                self._next += 1
+            self._output.flush()
+
+def run_batch(source, output, policy: ActionPolicy, workers: int = None) -> dict:
+    """
+    Runs every instruction from `source` (a text stream) and writes one JSON record per
+    line to `output`. Returns the summary: counts by status, latency and throughput.
+    """
+    workers = max(1, workers or settings.BATCH_WORKERS)
+    writer = _OrderedWriter(output)
+    latency = LatencyHistogram()
+    statuses = {}
+    lock = threading.Lock()
+    # Bounds how many lines are read ahead of the workers, so huge inputs stream through
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    def run(index: int, number: int, instruction: str):
+        try:
+            try:
+                record = run_instruction(number, instruction, policy)
+            except Exception as e:
+                record = {"line": number, "input": instruction, "status": "error", "error": str(e),
+                          "commands": [], "total_ms": 0.0}
+            with lock:
+                latency.record(record["total_ms"])
+                statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+            writer.put(index, record)
+        finally:
+            slots.release()
+
+    started = time.perf_counter()
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        for index, (number, instruction) in enumerate(read_instructions(source)):
+            slots.acquire()
+            pool.submit(run, index, number, instruction)
+            count += 1
+    wall = time.perf_counter() - started
+
+    return {
+        "lines": count,
+        "statuses": statuses,
+        "workers": workers,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(count / wall, 2) if wall else 0.0,
+        "latency": latency.summary(),
+    }
+
+def main(path: str, allow: str = None, workers: int = None, output_path: str = "-") -> int:
+    """Entry point for --batch. Returns the process exit code (1 if any line failed)."""
+    policy = ActionPolicy.parse(allow if allow is not None else settings.BATCH_ALLOWED_ACTIONS)
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    output = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        summary = run_batch(source, output, policy, workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    return 1 if summary["statuses"].get("error") else 0
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Messages of the history that go into the key: the last exchange (user + assistant)
+HISTORY_KEY_MESSAGES = 2
+
+@lru_cache(maxsize=8)
+def prompt_digest(prompt: str) -> str:
+    """Digest of a system prompt, computed once per prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+def normalize_input(user_input: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    text = " ".join(user_input.lower().split())
+    return text.rstrip(".!?")
+
+class InterpretationCache:
+    """
+    Two-tier cache for LLM interpretations.
+    Tier 1: in-memory LRU with size and TTL eviction.
+    Tier 2: sqlite store on disk that survives restarts.
+    """
+    def __init__(self, max_size: int = 512, ttl: float = 7 * 24 * 3600, db_path: str = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory = OrderedDict()   # key -> (stored_at, commands_json)
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def make_key(self, user_input: str, model: str, history: list[dict], prompt: str = "") -> str:
+        """
+        Key = normalized input + model name + digest of the system prompt + hash of the
+        last exchange. A changed prompt (or output schema) never gets the old answers, and
+        "close the app" after "open chrome" is not the answer given after "open spotify":
+        no word list can tell which inputs the model resolves against the history.
+        """
+        text = normalize_input(user_input)
+        history_hash = ""
+        if history:
+            recent = history[-HISTORY_KEY_MESSAGES:]
+            history_hash = hashlib.sha256(json.dumps(recent, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        raw = "\x1f".join([text, model or "", prompt_digest(prompt), history_hash])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._db is None and self.db_path:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS interpretations ("
+                    "key TEXT PRIMARY KEY, commands TEXT NOT NULL, stored_at REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM interpretations WHERE stored_at < ?", (time.time() - self.ttl,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open interpretation cache at {self.db_path}: {e}")
+                self.db_path = None
+                self._db = None
+        return self._db
+
+    def _remember(self, key: str, stored_at: float, payload: str):
+        self._memory[key] = (stored_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Returns a fresh copy of the cached command list, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                if now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return json.loads(payload)
+                del self._memory[key]
+
+            db = self._connect()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT commands, stored_at FROM interpretations WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.error(f"Interpretation cache read failed: {e}")
+                    row = None
+                if row is not None and now - row[1] <= self.ttl:
+                    self._remember(key, row[1], row[0])
+                    self.stats["disk_hits"] += 1
+                    return json.loads(row[0])
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, commands: list[dict]):
+        payload = json.dumps(commands)
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, payload)
+            self.stats["stores"] += 1
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO interpretations (key, commands, stored_at) VALUES (?, ?, ?)",
+                        (key, payload, stored_at)
+                    )
+                    db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Interpretation cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM interpretations")
+                db.commit()
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+# Global instance
+interpretation_cache = InterpretationCache(
+    max_size=settings.INTERPRET_CACHE_SIZE,
+    ttl=settings.INTERPRET_CACHE_TTL,
+    db_path=settings.INTERPRET_CACHE_PATH if settings.INTERPRET_CACHE_PERSIST else None,
+)
@@ -0,0 +1,296 @@
+import os
+import re
+import json
+import threading
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Built-in training examples (input, action) on top of the SYSTEM_PROMPT few-shot examples
+SEED_EXAMPLES = [
+    ("open chrome", "open_app"), ("launch spotify", "open_app"), ("open visual studio code", "open_app"),
+    ("open the calculator app", "open_app"), ("can you open notepad", "open_app"), ("launch file explorer", "open_app"),
+    ("close chrome", "close_app"), ("quit spotify", "close_app"), ("kill notepad", "close_app"),
+    ("terminate the zoom app", "close_app"), ("please close discord", "close_app"), ("exit excel", "close_app"),
+    ("shutdown my laptop", "system_control"), ("turn off the computer", "system_control"),
+    ("restart my pc", "system_control"), ("reboot the system", "system_control"),
+    ("lock my screen", "system_control"), ("lock the computer", "system_control"),
+    ("search for python tutorials", "search_web"), ("look up the weather in london", "search_web"),
+    ("who won the super bowl", "search_web"), ("what is the latest news on ai", "search_web"),
+    ("find information about black holes", "search_web"), ("google best pizza near me", "search_web"),
+    ("what does this error message mean", "analyze_screen"), ("what is on my screen", "analyze_screen"),
+    ("describe what you see on the screen", "analyze_screen"), ("can you read the error on screen", "analyze_screen"),
+    ("explain this code on my screen", "analyze_screen"),
+    ("list my files", "list_directory"), ("show me the workspace", "list_directory"),
+    ("what files do i have", "list_directory"), ("show all files in the workspace", "list_directory"),
+    ("read notes.txt", "read_file"), ("show me the contents of todo.md", "read_file"),
+    ("what is in report.csv", "read_file"), ("open the file config.json and read it", "read_file"),
+    ("show me budget.xlsx", "read_file"), ("display the readme.md file", "read_file"),
+    ("open youtube.com", "open_url"), ("go to github.com", "open_url"), ("visit https://news.ycombinator.com", "open_url"),
+    ("create a folder called projects", "create_folder"), ("make a new directory named photos", "create_folder"),
+    # Chat examples: when they are the nearest neighbour, the input goes to the LLM
+    ("tell me a joke", "respond"), ("hi", "respond"), ("hello there", "respond"), ("how are you", "respond"),
+    ("thank you", "respond"), ("what can you do", "respond"), ("explain quantum computing briefly", "respond"),
+    ("write a poem about the sea", "respond"), ("what is the meaning of life", "respond"),
+]
+
+_STOP_PREFIX = re.compile(r"^(?:(?:hey|ok|okay|please|can you|could you|would you|will you|i want to|i need to|i'd like to)\s+)+")
+_TRAILING = re.compile(r"\s+(?:for me|please|now|right now|app|application|program)$")
+_URL = re.compile(r"(https?://\S+|www\.\S+|\b[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|org|net|io|dev|ai|edu|gov|co|app)(?:/\S*)?)")
+_FILENAME = re.compile(r"([\w./\\-]+\.[a-z0-9]{1,5})\b")
+# Questions ("how do I restart my router") are never a request to do it
+_QUESTION = re.compile(r"^(?:how|why|when|where|which|who|what|whats|what's|should|shall|do|does|did|is|are|am|"
+                       r"was|were|can i|can we|could i|may i|will it)\b")
+# Verbs no classifier action covers; "delete notes.txt" must not come back as read_file
+_OTHER_VERBS = re.compile(r"^(?:delete|remove|erase|rename|move|copy|write|save|send|email|message|type|"
+                          r"summari[sz]e|translate|edit|install|uninstall|play|pause|set|turn on)\b")
+# Actions that only make sense as an imperative, never as the answer to a question
+IMPERATIVE_ACTIONS = {"open_app", "close_app", "system_control", "open_url", "create_folder"}
+_ARTICLES = ("a", "an", "some", "the", "my")
+_SYSTEM_OBJECT = r"(?:\s+(?:the|my|this))?\s+(?:computer|pc|laptop|system|machine|workstation)"
+
+def _strip_filler(text: str) -> str:
+    text = _STOP_PREFIX.sub("", text)
+    previous = None
+    while previous != text:
+        previous = text
+        text = _TRAILING.sub("", text)
+    return text.strip()
+
+def _extract_app(text: str, verbs: str):
+    text = _strip_filler(text)
+    m = re.match(rf"^(?:{verbs})\s+(?:the\s+|my\s+)?(.+)$", text)
+    if not m:
+        return None
+    name = _strip_filler(m.group(1))
+    # Short names only; anything longer is probably not just an app name
+    if not name or len(name.split()) > 3 or name in ("it", "that", "this", "them") or name.split()[0] in _ARTICLES:
+        return None
+    return {"name": name}
+
+def _extract_search(text: str):
+    text = _strip_filler(text)
+    m = re.match(r"^(?:search(?: the web| online| google)?(?: for)?|google|look up|find(?: info| information)?(?: about| on)?)\s+(.+)$", text)
+    query = (m.group(1) if m else text).strip()
+    return {"query": query} if query else None
+
+def _extract_system(text: str):
+    text = _strip_filler(text)
+    # The whole input is the command: "turn off dark mode" or "restart my router" is not one
+    if re.match(rf"^(?:(?:shut ?down|power off)(?:{_SYSTEM_OBJECT})?|turn off{_SYSTEM_OBJECT})$", text):
+        return {"action": "shutdown"}
+    if re.match(rf"^(?:restart|reboot)(?:{_SYSTEM_OBJECT})?$", text):
+        return {"action": "restart"}
+    if re.match(rf"^lock(?:{_SYSTEM_OBJECT}|(?:\s+(?:the|my))?\s+screen)?$", text):
+        return {"action": "lock"}
+    return None
+
+def _extract_url(text: str):
+    text = _strip_filler(text)
+    m = re.match(r"^(?:open|go to|visit|browse to|navigate to|load)\s+(?:the\s+)?(?:(?:web)?site\s+|page\s+)?", text)
+    url = _URL.fullmatch(text[m.end():]) if m else None
+    if not url:
+        return None
+    url = url.group(1)
+    return {"url": url if url.startswith("http") else "https://" + url}
+
+def _extract_filename(text: str):
+    text = _strip_filler(text)
+    m = re.match(r"^(?:read|show|display|view|open|print|cat|what(?:'s| is) in(?:side)?)\s+(?:me\s+)?", text)
+    filename = _FILENAME.search(text, m.end()) if m else None
+    return {"filename": filename.group(1)} if filename else None
+
+def _extract_listing(text: str):
+    text = _strip_filler(text)
+    if _FILENAME.search(text) or not re.match(r"^(?:list|show|display|what files|which files)\b", text):
+        return None
+    return {}
+
+def _extract_folder(text: str):
+    text = _strip_filler(text)
+    m = re.match(r"^(?:create|make|add)\s+(?:a\s+)?(?:new\s+)?(?:folder|directory)\s+(?:called\s+|named\s+)?([\w./\\-]+)$", text)
+    return {"name": m.group(1)} if m else None
+
+# Action -> parameter extractor(normalized text, original text). Actions whose parameters
+# must be generated (respond, type_text, write_file) are learned but left to the LLM.
+EXTRACTORS = {
+    "open_app": lambda text, original: _extract_app(text, "open|launch"),
+    "close_app": lambda text, original: _extract_app(text, "close|quit|kill|terminate|exit"),
+    "system_control": lambda text, original: _extract_system(text),
+    "search_web": lambda text, original: _extract_search(text),
+    "analyze_screen": lambda text, original: {"prompt": original.strip()},
+    "list_directory": lambda text, original: _extract_listing(text),
+    "read_file": lambda text, original: _extract_filename(text),
+    "open_url": lambda text, original: _extract_url(text),
+    "create_folder": lambda text, original: _extract_folder(text),
+}
+
+def parse_prompt_examples(prompt: str) -> list[tuple[str, str]]:
+    """
+    Extracts (input, action) pairs from the few-shot examples of a system prompt.
+    Only single-command examples are useful as classifier training data.
+    """
+    examples = []
+    pattern = re.compile(r'Input:\s*"(.*?)".*?\n\s*Output:\s*(\[.*?\])\s*(?=\n\s*\n|\n\s*Input:|\n\s*Output Format|$)', re.S)
+    for text, output in pattern.findall(prompt):
+        try:
+            commands = json.loads(output)
+        except json.JSONDecodeError:
+            continue
+        if len(commands) == 1:
+            examples.append((text, commands[0].get("action")))
+    return examples
+
+def load_example_file(path: str) -> list[tuple[str, str]]:
+    """
+    Reads user examples: one JSON object per line, {"input": "...", "action": "..."}.
+    """
+    examples = []
+    if not path or not os.path.exists(path):
+        return examples
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                item = json.loads(line)
+                examples.append((item["input"], item["action"]))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                logger.warning(f"Skipping invalid intent example at {path}:{line_no}")
+    return examples
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s./:'-]", " ", text.lower()).split())
+
+class IntentClassifier:
+    """
+    Offline intent classifier: character n-gram TF-IDF vectors with cosine
+    nearest-neighbour search, vectorized with NumPy.
+    predict() returns a command with a confidence score, or None when the input
+    can't be handled locally (unknown action, composite input, missing parameters).
+    """
+    def __init__(self, ngram_range=(2, 4), min_similarity: float = 0.3, temperature: float = 0.1):
+        self.ngram_range = ngram_range
+        self.min_similarity = min_similarity
+        self.temperature = temperature
+        self.vocabulary = {}
+        self.idf = None
+        self.matrix = None     # (examples x vocabulary), rows L2-normalized
+        self.labels = []
+        self.classes = []
+        self._class_rows = []  # per class: indices of its examples
+        self.stats = {"answered": 0, "abstained": 0}
+
+    def _ngrams(self, text: str) -> list[str]:
+        padded = f" {text} "
+        low, high = self.ngram_range
+        return [padded[i:i + n] for n in range(low, high + 1) for i in range(len(padded) - n + 1)]
+
+    def fit(self, examples: list[tuple[str, str]]):
+        import numpy as np
+
+        examples = [(normalize(text), action) for text, action in examples if action]
+        documents = [self._ngrams(text) for text, _ in examples]
+        for grams in documents:
+            for gram in grams:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, grams in enumerate(documents):
+            for gram in grams:
+                counts[row, self.vocabulary[gram]] += 1
+
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+        tfidf = (1 + np.log(np.maximum(counts, 1))) * (counts > 0) * self.idf
+        norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+        self.matrix = tfidf / np.maximum(norms, 1e-9)
+        self.labels = [action for _, action in examples]
+        self.classes = sorted(set(self.labels))
+        self._class_rows = [
+            np.array([row for row, label in enumerate(self.labels) if label == action]) for action in self.classes
+        ]
+        logger.info(f"Intent classifier trained on {len(self.labels)} examples ({len(self.vocabulary)} features).")
+        return self
+
+    def _vectorize(self, text: str):
+        import numpy as np
+
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for gram in self._ngrams(text):
+            index = self.vocabulary.get(gram)
+            if index is not None:
+                vector[index] += 1
+        mask = vector > 0
+        vector[mask] = (1 + np.log(vector[mask])) * self.idf[mask]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def classify(self, user_input: str):
+        """
+        Returns (action, confidence) for user_input, or (None, 0.0).
+        Each action scores the similarity of its nearest example; confidence is the softmax
+        probability of the best action, so an input equally close to two actions scores low.
+        The temperature sets how much closer the best action must be to score high: at 0.1 a
+        similarity lead of 0.2 gives about 0.88 against a single runner-up.
+        Inputs not similar enough to any example (below min_similarity) get no action.
+        """
+        import numpy as np
+
+        if self.matrix is None or not self.labels:
+            return None, 0.0
+        vector = self._vectorize(normalize(user_input))
+        if vector is None:
+            return None, 0.0
+        similarities = self.matrix @ vector
+        scores = np.array([similarities[rows].max() for rows in self._class_rows])
+        best = int(scores.argmax())
+        if scores[best] < self.min_similarity:
+            return None, 0.0
+        weights = np.exp((scores - scores[best]) / self.temperature)
+        return self.classes[best], float(weights[best] / weights.sum())
+
+    def predict(self, user_input: str):
+        text = normalize(user_input)
+        # Composite requests need the rule engine or the LLM to be split properly
+        if re.search(r"\b(?:and|then)\b", text) or _OTHER_VERBS.match(_strip_filler(text)):
+            self.stats["abstained"] += 1
+            return None
+
+        action, confidence = self.classify(user_input)
+        if action in IMPERATIVE_ACTIONS and (_QUESTION.match(_strip_filler(text)) or user_input.rstrip().endswith("?")):
+            action = None
+        params = EXTRACTORS[action](text, user_input) if action in EXTRACTORS else None
+        if params is None:
+            self.stats["abstained"] += 1
+            return None
+
+        self.stats["answered"] += 1
+        return {"action": action, "params": params, "confidence": round(confidence, 2)}
+
+# Global instance (trained on first use)
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier(prompt_examples: str = ""):
+    """
+    Returns the trained classifier, or None when NumPy is unavailable or it is disabled.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                if not settings.CLASSIFIER_ENABLED:
+                    _classifier = False
+                else:
+                    try:
+                        import numpy  # noqa: F401
+                        examples = parse_prompt_examples(prompt_examples) + SEED_EXAMPLES
+                        examples += load_example_file(settings.INTENT_EXAMPLES_PATH)
+                        _classifier = IntentClassifier().fit(examples)
+                    except ImportError:
+                        logger.warning("NumPy not installed. Offline intent classifier disabled.")
+                        _classifier = False
+    return _classifier or None
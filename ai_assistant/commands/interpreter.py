@@ -1,53 +1,17 @@
-import re
 import json
-from ai_assistant.llm.client import ask_llm
+import functools
+from ai_assistant.config import settings
+from ai_assistant.llm.client import ask_llm, ask_llm_cascade, ask_llm_stream, record_exchange, get_history
+from ai_assistant.commands.parser import CommandStreamParser
+from ai_assistant.commands.cache import interpretation_cache
+from ai_assistant.commands.rules import rule_engine
+from ai_assistant.commands.classifier import get_classifier
 from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
 
 logger = setup_logger(__name__)
 
-def interpret_command(user_input: str) -> list[dict]:
-    """
-    Parses natural language into structured commands.
-    Returns: list[dict] (A list of command objects)
-    """
-    text = user_input.strip().lower()
-
-    # --- 1. Rule-Based Matching ---
-    
-    # "open google.com" -> open_url
-    url_match = re.match(r"^open\s+(https?://[^\s]+|www\.[^\s]+|[a-z0-9]+\.[a-z]{2,})$", text)
-    if url_match:
-        url = url_match.group(1)
-        if not url.startswith("http"): url = "https://" + url
-        return [{"action": "open_url", "params": {"url": url}, "confidence": 1.0}]
-
-    # "open [app]" -> REMOVED greedy regex to allow LLM to handle composite commands
-    # app_match = re.match(r"^open\s+(?!https?://|www\.)(.+)$", text)
-    # if app_match:
-    #     app_name = app_match.group(1).strip()
-    #     return [{"action": "open_app", "params": {"name": app_name}, "confidence": 1.0}]
-
-    # "create folder [name]" -> REMOVED greedy regex to allow LLM to handle composite commands
-    # folder_match = re.match(r"^create folder\s+(.+)$", text)
-    # if folder_match:
-    #     name = folder_match.group(1).strip()
-    #     return [{"action": "create_folder", "params": {"name": name}, "confidence": 1.0}]
-        
-    # "ls" or "list files" -> list_directory
-    if text in ["ls", "list", "list files", "show files"]:
-        return [{"action": "list_directory", "params": {}, "confidence": 1.0}]
-
-    # "system status" -> respond with special flag or just show status (handling in interpreter to be simple)
-    # Ideally main.py handles this, but we can hack it by returning a respond action with the status.
-    # Actually, let's map it to a "show_status" action if we had one, or just let LLM handle.
-    # But LLM failed, so let's add a rule.
-    if "system status" in text or "status" == text:
-        return [{"action": "respond", "params": {"message": "All systems operational. (View 'System Status' table above)"}, "confidence": 1.0}]
-
-    # --- 2. LLM Fallback ---
-    # logger.info("Rule mismatch. delegating to LLM.")
-    
-    SYSTEM_PROMPT = """
+SYSTEM_PROMPT = """
     You are a Command Parser. Your ONLY job is to convert User Input into a JSON ARRAY of commands.
     Do NOT explain. Do NOT write Python code. Do NOT output markdown.
     
@@ -66,9 +30,9 @@ def interpret_command(user_input: str) -> list[dict]:
     - analyze_screen(prompt: str) <-- Use when user asks about screen content/errors/images
     - type_text(text: str) <-- Use to type text into the currently active window (e.g. Notepad)
     - create_folder(name: str)
-    - write_file(filename: str, content: str)
-    - read_file(filename: str) <-- Use to read content of a file
-    - list_directory()
+    - write_file(filename: str, content: str, mode: str) <-- Optional: mode "append" adds to the end of the file instead of replacing it
+    - read_file(filename: str, lines: str, head: int, tail: int, search: str, context: int) <-- Use to read content of a file. Optional: lines "120-180", head/tail line counts, or search (regex) with context lines, for large files and logs
+    - list_directory(path: str, recursive: bool, pattern: str, sort: str, page: int) <-- All params optional. pattern is a glob (e.g. "*.py"), sort is "name", "size" or "mtime"
     - respond(message: str)  <-- Use this for general chat/questions
 
     Examples:
@@ -110,29 +74,200 @@ def interpret_command(user_input: str) -> list[dict]:
     
     Output Format (Raw JSON Array Only):
     """
+
+# Actions the executor knows, with the parameters each one requires
+ACTION_SCHEMA = {
+    "open_url": ("url",),
+    "open_app": ("name",),
+    "close_app": ("name",),
+    "system_control": ("action",),
+    "search_web": ("query",),
+    "analyze_screen": (),
+    "type_text": ("text",),
+    "create_folder": ("name",),
+    "write_file": ("filename", "content"),
+    "read_file": ("filename",),
+    "list_directory": (),
+    "respond": ("message",),
+}
+
+def _parse_response(raw_response: str) -> list[dict]:
+    """
+    Extracts the command list from a model reply (raises json.JSONDecodeError for plain text).
+    """
+    clean_json = raw_response.strip()
+
+    # 1. Try removing markdown blocks first
+    if "```json" in clean_json:
+        clean_json = clean_json.split("```json")[1].split("```")[0].strip()
+    elif "```" in clean_json:
+        clean_json = clean_json.split("```")[1].split("```")[0].strip()
+
+    # 2. Extract JSON part
+    start = clean_json.find('[')
+    end = clean_json.rfind(']')
+
+    if start != -1 and end != -1:
+        clean_json = clean_json[start:end+1]
+
+    data = json.loads(clean_json)
+
+    if isinstance(data, dict):
+        # Normalize single object to list
+        data = [data]
+    return data
+
+def _validate_response(raw_response: str):
+    """
+    Checks a fast-model reply before it is trusted (see settings.FAST_MODEL_NAME).
+    Returns (commands, None), or (None, reason) when the main model should answer instead.
+    """
+    try:
+        commands = _parse_response(raw_response)
+    except json.JSONDecodeError:
+        return None, "parse_error"
+    if not isinstance(commands, list) or not commands:
+        return None, "parse_error"
+    for command in commands:
+        if not isinstance(command, dict) or command.get("action") not in ACTION_SCHEMA:
+            return None, "unknown_action"
+        params = command.get("params") or {}
+        if not isinstance(params, dict) or any(params.get(name) in (None, "") for name in ACTION_SCHEMA[command["action"]]):
+            return None, "missing_params"
+        try:
+            confidence = float(command.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if confidence < settings.CASCADE_MIN_CONFIDENCE:
+            return None, "low_confidence"
+    return commands, None
+
+def _match_rules(user_input: str):
+    """
+    Rule-based tier (see commands/rules.py). Returns a list of commands, or None if no rule applies.
+    Composite inputs ("open notepad and type hello") are handled here as long as every clause matches.
+    """
+    commands = rule_engine.match(user_input)
+    if commands is not None:
+        tracer.annotate(tier="rules")
+    return commands
+
+def _classify(user_input: str):
+    """
+    Offline classifier tier. Returns a single-command list when it is confident
+    enough (settings.CONFIDENCE_THRESHOLD), otherwise None.
+    """
+    classifier = get_classifier(SYSTEM_PROMPT)
+    if classifier is None:
+        return None
+    command = classifier.predict(user_input)
+    if command is None or command["confidence"] < settings.CONFIDENCE_THRESHOLD:
+        return None
+    logger.info(f"Intent classifier: {command['action']} ({command['confidence']:.2f})")
+    tracer.annotate(tier="classifier")
+    return [command]
+
+def _apply(deferred, func, *args):
+    """
+    Runs a side effect (history or cache update) now, or queues it on `deferred` when the
+    interpretation is speculative and may still be thrown away.
+    """
+    if deferred is None:
+        func(*args)
+    else:
+        deferred.append(functools.partial(func, *args))
+
+def _cascade_active() -> bool:
+    return bool(settings.FAST_MODEL_NAME) and settings.CASCADE_MODE in ("cascade", "race")
+
+def _answering_models() -> str:
+    """
+    The models (and cascade settings) an answer may come from, for the cache key: a fast-model
+    answer must not be served once the cascade is off or configured differently.
+    """
+    if not _cascade_active():
+        return settings.MODEL_NAME
+    return f"{settings.CASCADE_MODE}:{settings.FAST_MODEL_NAME}>{settings.MODEL_NAME}@{settings.CASCADE_MIN_CONFIDENCE}"
+
+def _cache_lookup(user_input: str, deferred: list = None):
+    """
+    Returns (key, cached commands or None). Key is None when caching is disabled.
+    """
+    if not settings.INTERPRET_CACHE_ENABLED:
+        return None, None
+    key = interpretation_cache.make_key(user_input, _answering_models(), get_history(), SYSTEM_PROMPT)
+    commands = interpretation_cache.get(key)
+    if commands is not None:
+        logger.info("Interpretation cache hit.")
+        tracer.annotate(tier="cache")
+        # Keep the conversation context as if the model had answered
+        _apply(deferred, record_exchange, user_input, json.dumps(commands))
+    return key, commands
+
+def interpret_command(user_input: str) -> list[dict]:
+    """
+    Parses natural language into structured commands.
+    Returns: list[dict] (A list of command objects)
+    """
+    with tracer.span("interpret") as span:
+        commands = _interpret_command(user_input)
+        span.set("commands", len(commands))
+        return commands
+
+def interpret_speculatively(user_input: str):
+    """
+    interpret_command() without side effects, for input that may still change (e.g. a partial
+    voice transcript). Returns (commands, commit): history and cache are only updated by
+    commit(), which the caller runs once the input turned out to be final.
+    """
+    deferred = []
+    with tracer.span("interpret", speculative=True) as span:
+        commands = _interpret_command(user_input, deferred)
+        span.set("commands", len(commands))
+
+    def commit():
+        for effect in deferred:
+            effect()
+    return commands, commit
+
+def _interpret_command(user_input: str, deferred: list = None) -> list[dict]:
+    # --- 1. Rule-Based Matching ---
+    commands = _match_rules(user_input)
+    if commands is not None:
+        return commands
+
+    # --- 2. Offline Intent Classifier ---
+    commands = _classify(user_input)
+    if commands is not None:
+        return commands
+
+    # --- 3. Interpretation Cache ---
+    cache_key, commands = _cache_lookup(user_input, deferred)
+    if commands is not None:
+        return commands
+
+    # --- 4. LLM Fallback ---
+    # logger.info("Rule mismatch. delegating to LLM.")
     
+    tracer.annotate(tier="llm")
+    raw_response = ""
     try:
-        raw_response = ask_llm(user_input, system_prompt=SYSTEM_PROMPT)
-        clean_json = raw_response.strip()
-        
-        # 1. Try removing markdown blocks first
-        if "```json" in clean_json:
-            clean_json = clean_json.split("```json")[1].split("```")[0].strip()
-        elif "```" in clean_json:
-            clean_json = clean_json.split("```")[1].split("```")[0].strip()
-
-        # 2. Extract JSON part
-        start = clean_json.find('[')
-        end = clean_json.rfind(']')
-        
-        if start != -1 and end != -1:
-            clean_json = clean_json[start:end+1]
-        
-        data = json.loads(clean_json)
-        
-        if isinstance(data, dict):
-            # Normalize single object to list
-            data = [data]
+        if _cascade_active():
+            # Small model first; the main model only answers what it can't
+            raw_response, data = ask_llm_cascade(
+                user_input, SYSTEM_PROMPT, _validate_response,
+                race=settings.CASCADE_MODE == "race", update_history=deferred is None,
+            )
+        else:
+            raw_response = ask_llm(user_input, system_prompt=SYSTEM_PROMPT, update_history=deferred is None)
+            data = None
+        if deferred is not None:
+            deferred.append(functools.partial(record_exchange, user_input, raw_response))
+        if data is None:
+            data = _parse_response(raw_response)
+
+        if cache_key:
+            _apply(deferred, interpretation_cache.put, cache_key, data)
             
         return data
 
@@ -141,3 +276,48 @@ def interpret_command(user_input: str) -> list[dict]:
     except Exception as e:
         logger.error(f"Interpretation Error: {e}")
         return [{"action": "respond", "params": {"message": "I encountered an error parsing your command."}, "confidence": 0.0}]
+
+def interpret_command_stream(user_input: str, on_message=None):
+    """
+    Streaming variant of interpret_command().
+    Yields each command object as soon as the LLM has finished producing it,
+    so the caller can present command 1 while command 2 is still being generated.
+    on_message receives the text of "respond" messages while they are generated
+    (see CommandStreamParser), e.g. to start speaking them early.
+    """
+    span = tracer.start_span("interpret", stream=True)
+    try:
+        yield from tracer.iterate(span, _interpret_command_stream(user_input, on_message))
+    finally:
+        span.end()
+
+def _interpret_command_stream(user_input: str, on_message=None):
+    commands = _match_rules(user_input) or _classify(user_input)
+    if commands is not None:
+        yield from commands
+        return
+
+    cache_key, commands = _cache_lookup(user_input)
+    if commands is not None:
+        yield from commands
+        return
+
+    tracer.annotate(tier="llm")
+    parser = CommandStreamParser(on_message=on_message)
+    received = []
+    try:
+        for chunk in ask_llm_stream(user_input, system_prompt=SYSTEM_PROMPT):
+            for command in parser.feed(chunk):
+                received.append(command)
+                yield command
+    except Exception as e:
+        logger.error(f"Interpretation Error: {e}")
+        if parser.count == 0:
+            yield {"action": "respond", "params": {"message": "I encountered an error parsing your command."}, "confidence": 0.0}
+        return
+
+    # No JSON objects at all: the model answered in plain text
+    if parser.count == 0:
+        yield {"action": "respond", "params": {"message": parser.text.strip()}, "confidence": 1.0}
+    elif cache_key:
+        interpretation_cache.put(cache_key, received)
@@ -0,0 +1,135 @@
+import json
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+class CommandStreamParser:
+    """
+    Incremental parser for the JSON array of commands produced by the LLM.
+    Feed it text chunks as they arrive; every command object is returned as soon
+    as its closing brace has been seen, without waiting for the rest of the array.
+    Surrounding noise (markdown fences, the array brackets, commas) is ignored.
+
+    With on_message, the text of a "respond" command's message is also passed to it while
+    it is still being generated (decoded, a piece per chunk), then None once it is complete.
+    """
+    def __init__(self, on_message=None):
+        self.raw = []          # Every chunk received, for the plain-text fallback
+        self.count = 0         # Number of command objects emitted so far
+        self.on_message = on_message
+        self._buffer = []      # Characters of the object currently being read
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Just enough JSON structure to find {"action": "respond", "params": {"message": "..."}}
+        self._key = None           # Key whose value the next string is
+        self._last_string = None   # Last complete string (it is a key if a colon follows)
+        self._string_key = None    # Key of the string being read
+        self._string = []          # Decoded characters of the string being read
+        self._unicode = None       # Hex digits of a \uXXXX escape being read
+        self._action = None        # Action of the object being read
+        self._message = []         # Message text not yet passed to on_message
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Consumes a chunk of text and returns the command objects it completed.
+        """
+        self.raw.append(chunk)
+        completed = []
+
+        for ch in chunk:
+            if self._depth == 0:
+                # Outside of an object: wait for the next opening brace
+                if ch == "{":
+                    self._buffer = [ch]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(ch)
+
+            if self._in_string:
+                if self._unicode is not None:
+                    self._unicode += ch
+                    if len(self._unicode) == 4:
+                        try:
+                            self._add_char(chr(int(self._unicode, 16)))
+                        except ValueError:
+                            pass
+                        self._unicode = None
+                elif self._escape:
+                    self._escape = False
+                    if ch == "u":
+                        self._unicode = ""
+                    else:
+                        self._add_char(_ESCAPES.get(ch, ch))
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._end_string()
+                else:
+                    self._add_char(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string, self._string_key, self._key = [], self._key, None
+            elif ch == ":":
+                self._key = self._last_string
+            elif ch == ",":
+                self._key = None
+            elif ch in "{[":
+                self._depth += 1
+                self._key = None
+            elif ch in "}]":
+                self._depth -= 1
+                self._key = None
+                if self._depth == 0:
+                    self._action = None
+                    command = self._decode("".join(self._buffer))
+                    self._buffer = []
+                    if command is not None:
+                        self.count += 1
+                        completed.append(command)
+
+        self._flush_message()
+        return completed
+
+    def _narrating(self) -> bool:
+        return self.on_message is not None and self._string_key == "message" and self._action == "respond"
+
+    def _add_char(self, ch: str):
+        self._string.append(ch)
+        if self._narrating():
+            self._message.append(ch)
+
+    def _end_string(self):
+        text = "".join(self._string)
+        if self._string_key is None:
+            self._last_string = text
+        elif self._string_key == "action" and self._depth == 1:
+            self._action = text
+        elif self._narrating():
+            self._flush_message()
+            self.on_message(None)
+        self._string_key = None
+
+    def _flush_message(self):
+        if self._message:
+            self.on_message("".join(self._message))
+            self._message = []
+
+    def _decode(self, text: str):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed command object in stream: {text[:80]}")
+            return None
+        return data if isinstance(data, dict) else None
+
+    @property
+    def text(self) -> str:
+        """The full raw text received so far."""
+        return "".join(self.raw)
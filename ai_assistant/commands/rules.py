@@ -0,0 +1,191 @@
+import re
+import threading
+from collections import Counter
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Words that refer back to earlier context; inputs using them are left to the LLM
+_PRONOUNS = r"(?!(?:it|that|this|them|those|these|the app|the file)\b)"
+# Slots that name a single thing must not swallow a following "and ..."/"then ..." clause
+_NO_CONJUNCTION = r"(?!.*\b(?:and|then)\b)"
+_FILE_EXTENSIONS = r"(?:txt|md|py|js|json|csv|log|pdf|docx?|xlsx?|html?|css|ya?ml|ini|cfg)"
+
+# Slot type -> regex
+SLOT_TYPES = {
+    # A name of up to three words, not a phrase: "start a timer for 5 minutes" is no app
+    "app": _PRONOUNS + _NO_CONJUNCTION + r"(?!(?:a|an|the|my|your|some)\b)(?!\S*\." + _FILE_EXTENSIONS + r"$)"
+           r"[a-z0-9][\w.+&'-]*(?: [\w.+&'-]+){0,2}",
+    "url": r"(?!\S*\." + _FILE_EXTENSIONS + r"$)(?:https?://\S+|www\.\S+|[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}(?:/\S*)?)",
+    "file": _PRONOUNS + r"[\w./\\-]+\.\w+",
+    "path": _PRONOUNS + _NO_CONJUNCTION + r"[\w./\\ -]+?",
+    "text": r".+?",
+    "number": r"\d{1,7}",
+}
+
+_SLOT = re.compile(r"\{(\w+):(\w+)\}")
+
+# Separators between clauses of a composite command
+_CONJUNCTION = re.compile(r"\s*,?\s+(?:and\s+then|and|then)\s+|\s*;\s*|\s*,\s*then\s+", re.IGNORECASE)
+
+def _with_scheme(url: str) -> str:
+    return url if url.lower().startswith("http") else "https://" + url
+
+class Rule:
+    """
+    One declarative rule: a pattern with {slot:type} placeholders and the command it produces.
+    `params` maps parameter names to constants or "{slot}" references; `transforms`
+    post-processes slot values (e.g. adding https:// to bare domains).
+    """
+    def __init__(self, name: str, pattern: str, action: str, params: dict = None,
+                 transforms: dict = None, confidence: float = 1.0):
+        self.name = name
+        self.pattern = pattern
+        self.action = action
+        self.params = params or {}
+        self.transforms = transforms or {}
+        self.confidence = confidence
+
+    def build(self, slots: dict, text: str) -> dict:
+        values = {slot: value.strip() for slot, value in slots.items()}
+        for slot, transform in self.transforms.items():
+            values[slot] = transform(values[slot])
+        values["input"] = text
+        params = {
+            key: value.format(**values) if isinstance(value, str) else value
+            for key, value in self.params.items()
+        }
+        return {"action": self.action, "params": params, "confidence": self.confidence}
+
+# Ordered by priority: the first rule whose pattern matches the whole clause wins
+RULES = [
+    Rule("system_status", r"(?:show |check )?(?:the )?(?:system )?status", "respond",
+         {"message": "All systems operational. (View 'System Status' table above)"}),
+    Rule("list_directory", r"ls|list|(?:list|show)(?: me)?(?: all)?(?: my| the)? (?:files|workspace)|what(?:'s| is) in (?:my |the )?workspace",
+         "list_directory"),
+    Rule("list_folder", r"(?:ls|list|show)(?: me)?(?: all)?(?: the)? (?:files|contents) (?:in|of)(?: the)?(?: folder| directory)? {path:path}",
+         "list_directory", {"path": "{path}"}),
+    Rule("analyze_screen", r"(?:what(?:'s| is) on|describe|analy[sz]e|look at|read) (?:my |the )?screen",
+         "analyze_screen", {"prompt": "{input}"}),
+    # Only with an object: a bare "turn off" is as likely to be about the lights or the music
+    Rule("system_shutdown", r"(?:shut ?down|power off|turn off)(?: (?:my|the|this))? (?:computer|laptop|pc|system|machine)",
+         "system_control", {"action": "shutdown"}),
+    Rule("system_restart", r"(?:restart|reboot)(?: (?:my|the|this))?(?: computer| laptop| pc| system| machine)?",
+         "system_control", {"action": "restart"}),
+    Rule("system_lock", r"lock(?: (?:my|the|this))?(?: screen| computer| laptop| pc| workstation)?",
+         "system_control", {"action": "lock"}),
+    Rule("open_url", r"(?:open|go to|visit|browse to) {url:url}", "open_url",
+         {"url": "{url}"}, transforms={"url": _with_scheme}),
+    Rule("read_file", r"(?:read|show|display|cat|print)(?: me)?(?: the)?(?: file)? {filename:file}|open (?:the )?file {filename:file}",
+         "read_file", {"filename": "{filename}"}),
+    Rule("tail_file", r"(?:show |read |print )?(?:me )?(?:the )?last {count:number} lines (?:of|in|from) (?:the )?(?:file )?{filename:file}",
+         "read_file", {"filename": "{filename}", "tail": "{count}"}),
+    Rule("head_file", r"(?:show |read |print )?(?:me )?(?:the )?first {count:number} lines (?:of|in|from) (?:the )?(?:file )?{filename:file}",
+         "read_file", {"filename": "{filename}", "head": "{count}"}),
+    Rule("search_file", r"(?:search(?: for)?|grep(?: for)?|find|look for) {pattern:text} in (?:the )?(?:file )?{filename:file}",
+         "read_file", {"filename": "{filename}", "search": "{pattern}"}, transforms={"pattern": re.escape}),
+    Rule("create_folder", r"(?:create|make|add)(?: a)?(?: new)? (?:folder|directory)(?: called| named)? {name:path}",
+         "create_folder", {"name": "{name}"}),
+    Rule("write_file_with", r"(?:create|write|make)(?: a)?(?: new)? file(?: called| named)? {filename:file} (?:with|containing|saying)(?: the text)? {content:text}",
+         "write_file", {"filename": "{filename}", "content": "{content}"}),
+    Rule("append_file", r"(?:append|add) {content:text} (?:to|at) (?:the end of )?(?:the )?(?:file )?{filename:file}",
+         "write_file", {"filename": "{filename}", "content": "{content}", "mode": "append"},
+         transforms={"content": lambda text: text + "\n"}),
+    Rule("write_file_to", r"(?:write|save|put) {content:text} (?:to|into|in)(?: the)?(?: file)? {filename:file}",
+         "write_file", {"filename": "{filename}", "content": "{content}"}),
+    # No "start", "run" or "stop": "run tests" and "stop the music" are not about apps
+    Rule("close_app", r"(?:close|quit|kill|terminate) {name:app}", "close_app", {"name": "{name}"}),
+    Rule("open_app", r"(?:open|launch) {name:app}", "open_app", {"name": "{name}"}),
+    Rule("search_web", r"(?:search(?: the web| online| google)? for|search|google|look up|find (?:info|information) (?:about|on)) {query:text}",
+         "search_web", {"query": "{query}"}),
+    Rule("type_text", r"type(?: out)? {text:text}", "type_text", {"text": "{text}"}),
+]
+
+class RuleEngine:
+    """
+    Compiles a rule table into a single combined-alternation regex.
+    One match call tells both which rule fired (the named rule group) and its slot values,
+    so matching cost barely grows with the number of rules.
+    """
+    def __init__(self, rules: list[Rule], max_clauses: int = 8):
+        self.rules = rules
+        self.max_clauses = max_clauses
+        self.hits = Counter()
+        self._lock = threading.Lock()
+        self._slot_groups = []   # per rule: [(group name, slot name)]
+        self._regex = self._compile(rules)
+
+    def _compile(self, rules: list[Rule]):
+        alternatives = []
+        for i, rule in enumerate(rules):
+            groups = []
+            def slot(match, i=i, groups=groups):
+                # A slot may appear in several alternatives of one rule; group names must be unique
+                name, slot_type = match.groups()
+                group = f"r{i}_{len(groups)}"
+                groups.append((group, name))
+                return f"(?P<{group}>{SLOT_TYPES[slot_type]})"
+            alternatives.append(f"(?P<r{i}>{_SLOT.sub(slot, rule.pattern)})")
+            self._slot_groups.append(groups)
+        return re.compile(r"^(?:" + "|".join(alternatives) + r")$", re.IGNORECASE)
+
+    def match_clause(self, clause: str):
+        """
+        Matches one clause against all rules at once. Returns (rule, command) or None.
+        """
+        m = self._regex.match(clause)
+        if not m:
+            return None
+        # The rule group encloses its slot groups, so it is the last group to close
+        index = int(m.lastgroup[1:])
+        rule = self.rules[index]
+        slots = {slot: m.group(group) for group, slot in self._slot_groups[index] if m.group(group) is not None}
+        return rule, rule.build(slots, clause)
+
+    def match(self, user_input: str):
+        """
+        Returns the list of commands for user_input, or None if the rules can't handle it.
+        Composite inputs ("open notepad and type hello") are split into clauses; the split
+        producing the most commands where every part matches a rule wins, so
+        "type salt and pepper" still stays a single type_text command.
+        """
+        text = user_input.strip().rstrip(".!?").strip()
+        if not text:
+            return None
+
+        pieces = _CONJUNCTION.split(text)
+        separators = _CONJUNCTION.findall(text)
+        if len(pieces) > self.max_clauses:
+            pieces, separators = [text], []
+
+        # best[i] = (number of commands, matches) for the first i pieces, or None
+        n = len(pieces)
+        best = [None] * (n + 1)
+        best[0] = (0, [])
+        for end in range(1, n + 1):
+            for start in range(end):
+                if best[start] is None:
+                    continue
+                clause = pieces[start] + "".join(separators[k] + pieces[k + 1] for k in range(start, end - 1))
+                matched = self.match_clause(clause)
+                if matched is None:
+                    continue
+                candidate = (best[start][0] + 1, best[start][1] + [matched])
+                if best[end] is None or candidate[0] > best[end][0]:
+                    best[end] = candidate
+
+        if best[n] is None:
+            return None
+
+        with self._lock:
+            for rule, _ in best[n][1]:
+                self.hits[rule.name] += 1
+        return [command for _, command in best[n][1]]
+
+    def stats(self) -> dict:
+        """Per-rule hit counters."""
+        with self._lock:
+            return dict(self.hits)
+
+# Global instance
+rule_engine = RuleEngine(RULES)
@@ -15,6 +15,19 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-3.5-turbo")
 # Vision model (fallback to main model if not specified, but for Groq we default to a vision one)
 VISION_MODEL_NAME = os.getenv("VISION_MODEL_NAME", "llama-3.2-90b-vision-preview")
+# Model used to fold old conversation turns into a summary
+SUMMARY_MODEL_NAME = os.getenv("SUMMARY_MODEL_NAME", MODEL_NAME)
+
+# Small, fast model tried before MODEL_NAME for interpretation (empty: disabled).
+# CASCADE_MODE "cascade" escalates to MODEL_NAME when the fast answer is invalid or below
+# CASCADE_MIN_CONFIDENCE; "race" asks both at once and takes the first valid answer.
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "")
+CASCADE_MODE = os.getenv("CASCADE_MODE", "cascade").lower()
+CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+
+# Conversation history is bounded by tokens; the most recent messages are never summarized
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "4"))
 
 # Security & Sandbox
 # Default to a 'workspace' folder in the current execution directory
@@ -23,6 +36,117 @@ BASE_WORKSPACE_DIR = os.getenv("BASE_WORKSPACE_DIR", os.path.join(os.getcwd(), "
 # Advanced
 DRY_RUN = os.getenv("DRY_RUN", "False").lower() == "true"
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.6"))
+# Offline intent classifier between the rules and the LLM (answers only above CONFIDENCE_THRESHOLD)
+CLASSIFIER_ENABLED = os.getenv("CLASSIFIER_ENABLED", "True").lower() == "true"
+# Extra training examples, one JSON object per line: {"input": "...", "action": "..."}
+INTENT_EXAMPLES_PATH = os.getenv("INTENT_EXAMPLES_PATH", os.path.join(os.getcwd(), "intent_examples.jsonl"))
+# Stream LLM output and present each command as soon as it has been generated
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "False").lower() == "true"
+
+# LLM HTTP transport: one pooled keep-alive connection pool shared by every request
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "True").lower() == "true"  # used when the h2 package is installed and the backend supports it
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "5"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))  # seconds an idle connection is kept open
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))  # seconds
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))  # seconds without data from the server
+
+# Startup: preload capabilities on background threads while the banner renders
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "True").lower() == "true"
+WARMUP_CONNECTION = os.getenv("WARMUP_CONNECTION", "True").lower() == "true"  # open the LLM HTTP connection early
+WARMUP_WAIT = float(os.getenv("WARMUP_WAIT", "0.5"))  # max seconds the boot screen waits for warm-up
+
+# Run independent commands of a plan concurrently
+PARALLEL_EXECUTION = os.getenv("PARALLEL_EXECUTION", "True").lower() == "true"
+PLAN_MAX_WORKERS = int(os.getenv("PLAN_MAX_WORKERS", "4"))
+
+# Confirmation: a matching allow/deny rule decides, otherwise commands up to PERMISSION_AUTO_APPROVE risk run
+# without asking. Risk tiers: low (reading, searching), medium (opening, writing), high (typing, closing, system)
+PERMISSIONS_ENABLED = os.getenv("PERMISSIONS_ENABLED", "True").lower() == "true"
+PERMISSIONS_DB = os.getenv("PERMISSIONS_DB", os.path.join(os.getcwd(), "permissions.sqlite3"))  # rules granted with "always"
+PERMISSION_RULES = os.getenv("PERMISSION_RULES", "")  # e.g. "read_file:*,open_url:https://docs.*,!system_control" (! denies)
+PERMISSION_AUTO_APPROVE = os.getenv("PERMISSION_AUTO_APPROVE", "low").lower()  # "none" asks for everything
+PERMISSION_PLAN_TIER = os.getenv("PERMISSION_PLAN_TIER", "medium").lower()  # plans within this tier are confirmed once, as a whole
+PERMISSION_RISK = os.getenv("PERMISSION_RISK", "")  # per-action tier overrides, e.g. "write_file:high,open_app:low"
+
+# Headless batch mode (--batch): actions executed without confirmation, and lines processed concurrently
+BATCH_ALLOWED_ACTIONS = os.getenv("BATCH_ALLOWED_ACTIONS", "respond,search_web,read_file,list_directory")
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# Local API server (--serve): one conversation history per session, idle sessions evicted
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")  # actions run on this machine; don't expose it carelessly
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8765"))
+SERVER_ALLOWED_ACTIONS = os.getenv("SERVER_ALLOWED_ACTIONS", BATCH_ALLOWED_ACTIONS)
+SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "100"))  # least recently used are evicted beyond this
+SERVER_SESSION_TTL = float(os.getenv("SERVER_SESSION_TTL", "1800"))  # seconds idle before a session is evicted
+SERVER_LLM_CONCURRENCY = int(os.getenv("SERVER_LLM_CONCURRENCY", "8"))  # interpretations in flight across sessions (keep within LLM_MAX_CONNECTIONS)
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "4"))  # actions executing at once across sessions
+
+# Web search rate limiting (requests per second, burst size, retries with exponential backoff)
+WEB_RATE_LIMIT = float(os.getenv("WEB_RATE_LIMIT", "1.0"))
+WEB_RATE_BURST = int(os.getenv("WEB_RATE_BURST", "3"))
+WEB_MAX_RETRIES = int(os.getenv("WEB_MAX_RETRIES", "2"))
+WEB_BACKOFF = float(os.getenv("WEB_BACKOFF", "2.0"))
+WEB_CACHE_TTL = float(os.getenv("WEB_CACHE_TTL", "600"))  # seconds
+WEB_CACHE_SIZE = int(os.getenv("WEB_CACHE_SIZE", "256"))
+
+# Voice: interim transcripts while the user speaks; a stable one is interpreted before the final transcript
+VOICE_SPECULATION = os.getenv("VOICE_SPECULATION", "True").lower() == "true"
+VOICE_PARTIAL_INTERVAL = float(os.getenv("VOICE_PARTIAL_INTERVAL", "0.25"))  # seconds of audio between interim transcripts
+VOICE_STABLE_PARTIALS = int(os.getenv("VOICE_STABLE_PARTIALS", "2"))  # identical interim transcripts before speculating
+
+# Voice capture: the microphone stays open; voice activity detection decides where utterances start and end
+VOICE_SAMPLE_RATE = int(os.getenv("VOICE_SAMPLE_RATE", "16000"))
+VOICE_VAD = os.getenv("VOICE_VAD", "energy").lower()  # "energy" (NumPy) or "webrtc" (needs webrtcvad)
+VOICE_ENERGY_RATIO = float(os.getenv("VOICE_ENERGY_RATIO", "3.0"))  # speech = this many times the noise floor
+VOICE_PREROLL = float(os.getenv("VOICE_PREROLL", "0.3"))  # seconds of audio kept from before speech started
+VOICE_MIN_SPEECH = float(os.getenv("VOICE_MIN_SPEECH", "0.1"))  # seconds of speech that start an utterance
+VOICE_END_SILENCE = float(os.getenv("VOICE_END_SILENCE", "0.5"))  # seconds of silence that end it
+
+# Speech recognition backend: "google" (web API), "vosk" or "whisper" (offline, CPU)
+STT_BACKEND = os.getenv("STT_BACKEND", "google").lower()
+STT_FALLBACK = os.getenv("STT_FALLBACK", "").lower()  # used when the backend can't be reached, e.g. "vosk"
+STT_PARTIAL_BACKEND = os.getenv("STT_PARTIAL_BACKEND", "").lower()  # for interim transcripts; empty = same as STT_BACKEND
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "")  # directory of an unpacked Vosk model
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")  # faster-whisper model name or path
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "4"))
+
+# Speech output: interrupting the assistant while it speaks (barge-in)
+TTS_BARGE_IN_KEY = os.getenv("TTS_BARGE_IN_KEY", "True").lower() == "true"  # any key press stops the speech
+TTS_BARGE_IN_VOICE = os.getenv("TTS_BARGE_IN_VOICE", "False").lower() == "true"  # speaking stops it; needs headphones (no echo cancellation)
+TTS_BARGE_IN_SPEECH = float(os.getenv("TTS_BARGE_IN_SPEECH", "0.4"))  # seconds of speech that count as barge-in
+
+# Screen watcher: samples the screen in the background so analyze_screen can skip capture
+SCREEN_WATCHER_ENABLED = os.getenv("SCREEN_WATCHER_ENABLED", "False").lower() == "true"
+SCREEN_WATCHER_INTERVAL = float(os.getenv("SCREEN_WATCHER_INTERVAL", "1.0"))  # seconds
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "64"))
+VISION_CACHE_TTL = float(os.getenv("VISION_CACHE_TTL", "300"))  # seconds
+VISION_HASH_TOLERANCE = int(os.getenv("VISION_HASH_TOLERANCE", "0"))  # 0: exact screen match; >0: differing bits of a coarse 8x8 hash still counted as "unchanged" (misses small changes)
+
+# Workspace index: metadata of every workspace entry, kept current by a watcher
+WORKSPACE_WATCH = os.getenv("WORKSPACE_WATCH", "True").lower() == "true"
+WORKSPACE_POLL_INTERVAL = float(os.getenv("WORKSPACE_POLL_INTERVAL", "2.0"))  # seconds (without watchdog)
+WORKSPACE_FULL_RESCAN_INTERVAL = float(os.getenv("WORKSPACE_FULL_RESCAN_INTERVAL", "60"))  # seconds (without watchdog)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "100"))  # entries per list_directory page
+
+# read_file: larger files (and excerpts) are cut to this many bytes; by default a preview of the first lines is shown
+READ_MAX_BYTES = int(os.getenv("READ_MAX_BYTES", str(100 * 1024)))
+READ_PREVIEW_LINES = int(os.getenv("READ_PREVIEW_LINES", "200"))
+
+# write_file: files are replaced atomically; fsync makes them survive power loss at the cost of latency
+WRITE_FSYNC = os.getenv("WRITE_FSYNC", "False").lower() == "true"
+WRITE_BATCHING = os.getenv("WRITE_BATCHING", "True").lower() == "true"  # coalesce ready writes of a plan into one pass
+
+# Caching
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.getcwd(), ".cache"))
+INTERPRET_CACHE_ENABLED = os.getenv("INTERPRET_CACHE_ENABLED", "True").lower() == "true"
+INTERPRET_CACHE_PERSIST = os.getenv("INTERPRET_CACHE_PERSIST", "True").lower() == "true"
+INTERPRET_CACHE_SIZE = int(os.getenv("INTERPRET_CACHE_SIZE", "512"))
+INTERPRET_CACHE_TTL = float(os.getenv("INTERPRET_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+INTERPRET_CACHE_PATH = os.getenv("INTERPRET_CACHE_PATH", os.path.join(CACHE_DIR, "interpretations.sqlite3"))
+PHRASE_CACHE_ENABLED = os.getenv("PHRASE_CACHE_ENABLED", "True").lower() == "true"  # pre-rendered audio of recurring phrases
+PHRASE_CACHE_DIR = os.getenv("PHRASE_CACHE_DIR", os.path.join(CACHE_DIR, "phrases"))
+PHRASE_CACHE_MAX_MB = float(os.getenv("PHRASE_CACHE_MAX_MB", "20"))
 
 def validate_config():
     """Validates critical configuration."""
@@ -1,12 +1,16 @@
 import os
+import re
+import time
 import webbrowser
 import platform
 from pathlib import Path
 from ai_assistant.config import settings
 from ai_assistant.utils.logger import setup_logger
-from ai_assistant.vision.screen import capture_screen_base64
+from ai_assistant.utils.tracing import tracer
+from ai_assistant.vision.watcher import analyze_screen
 from ai_assistant.utils.web import search_web
-from ai_assistant.llm.client import ask_llm
+from ai_assistant.executor.workspace import get_workspace_index
+from ai_assistant.executor.files import MappedFile, parse_line_range, write_text, write_stream, write_batch
 
 logger = setup_logger(__name__)
 
@@ -23,11 +27,174 @@ def _get_safe_path(filename: str) -> str:
     
     return str(target)
 
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def _list_directory(params: dict) -> str:
+    """
+    Lists the workspace from the index.
+    Optional params: path, recursive, pattern (glob), sort ("name", "size", "mtime"),
+    descending, page (1-based) and page_size.
+    """
+    index = get_workspace_index()
+    path = params.get("path") or ""
+    if path:
+        path = index.relative(_get_safe_path(path))
+        entry = index.stat(path)
+        if entry is None or not entry.is_dir:
+            return f"Error: Folder not found: {params.get('path')}"
+
+    page_size = max(1, min(int(params.get("page_size") or settings.LIST_PAGE_SIZE), 1000))
+    page = max(1, int(params.get("page") or 1))
+    entries, total = index.list(
+        path,
+        recursive=bool(params.get("recursive")),
+        pattern=params.get("pattern"),
+        sort=params.get("sort") or "name",
+        descending=bool(params.get("descending")),
+        offset=(page - 1) * page_size,
+        limit=page_size,
+    )
+
+    where = f"'{path}'" if path else "workspace"
+    if total == 0:
+        if params.get("pattern"):
+            return f"No files in {where} match '{params['pattern']}'."
+        return "Workspace is empty." if not path else f"Folder {where} is empty."
+
+    prefix = f"{path}/" if path else ""
+    lines = []
+    for entry in entries:
+        name = entry.path[len(prefix):]
+        if entry.is_dir:
+            lines.append(f"- {name}/")
+        else:
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.mtime))
+            lines.append(f"- {name} ({_format_size(entry.size)}, modified {modified})")
+
+    result = f"Files in {where}:\n" + "\n".join(lines)
+    if total > page_size:
+        first = (page - 1) * page_size + 1
+        pages = (total + page_size - 1) // page_size
+        result += f"\n\nShowing {first}-{first + len(entries) - 1} of {total} (page {page} of {pages})."
+        if page < pages:
+            result += f" Ask for page {page + 1} to see more."
+    return result
+
+def _read_file(filename: str, safe_path: str, params: dict) -> str:
+    """
+    Reads a file through a memory map, so multi-GB files are handled in constant memory.
+    Optional params select a part: lines ("120-180"), head / tail (line counts),
+    offset + length (bytes), or search (regex) with context lines.
+    Without them, small files are returned whole and large ones as a preview of the first lines.
+    """
+    limit = settings.READ_MAX_BYTES
+    with MappedFile(safe_path) as f:
+        if f.is_binary():
+            return f"Error: File {filename} appears to be binary."
+
+        if params.get("search"):
+            context = max(0, min(int(params.get("context", 2)), 20))
+            try:
+                matches, more = f.search(params["search"], context=context)
+            except re.error as e:
+                return f"Error: Invalid search pattern '{params['search']}': {e}"
+            if not matches:
+                return f"No matches for '{params['search']}' in {filename}."
+            blocks = []
+            for line_no, block in matches:
+                blocks.append("\n".join(f"{'>' if n == line_no else ' '} {n}: {text}" for n, text in block))
+            result = f"--- Matches for '{params['search']}' in {filename} ---\n" + "\n...\n".join(blocks)
+            if more:
+                result += f"\n--- Showing the first {len(matches)} matches; refine the search to see others ---"
+            return result[:limit]
+
+        if params.get("lines"):
+            first, last = parse_line_range(params["lines"])
+            text, last, truncated = f.lines(first, last, limit)
+            label = f"lines {first}-{last}"
+        elif params.get("head"):
+            text, truncated = f.head(int(params["head"]), limit)
+            label = f"first {int(params['head'])} lines"
+        elif params.get("tail"):
+            text, truncated = f.tail(int(params["tail"]), limit)
+            label = f"last {int(params['tail'])} lines"
+        elif params.get("offset") is not None or params.get("length") is not None:
+            start = max(0, int(params.get("offset") or 0))
+            length = min(int(params.get("length") or limit), limit)
+            text, truncated = f.decode(start, start + length), False
+            label = f"bytes {start}-{min(start + length, f.size)} of {f.size}"
+        elif f.size <= limit:
+            return f"--- Content of {filename} ---\n{f.decode(0, f.size)}\n--- End of File ---"
+        else:
+            text, _ = f.head(settings.READ_PREVIEW_LINES, limit)
+            preview = text.rstrip("\n")
+            return (
+                f"--- {filename} is {_format_size(f.size)}; showing the first {settings.READ_PREVIEW_LINES} lines ---\n"
+                f"{preview}\n"
+                f"--- Ask for specific lines, the tail, or search the file to see more ---"
+            )
+
+    note = " (cut to the size limit)" if truncated else ""
+    if text.endswith("\n"):
+        text = text[:-1]
+    return f"--- {filename}, {label}{note} ---\n{text}\n--- End of Excerpt ---"
+
+def _is_append(params: dict) -> bool:
+    return str(params.get("mode", "")).lower() == "append" or str(params.get("append", "")).lower() == "true"
+
+def _write_result(filename: str, append: bool) -> str:
+    return f"Appended to file in workspace: {filename}" if append else f"Saved file to workspace: {filename}"
+
+def write_files(commands: list[dict]) -> list[str]:
+    """
+    Executes several write_file commands in one pass (see files.write_batch): shared
+    directory creation, then all files renamed into place together.
+    Returns one result per command, in order.
+    """
+    results = [None] * len(commands)
+    batch, positions = [], []
+    for i, command in enumerate(commands):
+        params = command.get("params", {})
+        filename, content = params.get("filename"), params.get("content")
+        if not filename or not isinstance(content, str):
+            # Missing parameters and streamed content take the regular path
+            results[i] = execute_action(command)
+            continue
+        try:
+            safe_path = _get_safe_path(filename)
+        except ValueError as e:
+            logger.error(f"Execution Error: {e}")
+            results[i] = f"Failed to execute write_file: {str(e)}"
+            continue
+        batch.append((safe_path, content, _is_append(params)))
+        positions.append(i)
+
+    if batch:
+        with tracer.span("execute.batch", action="write_file", files=len(batch)):
+            errors = write_batch(batch)
+        index = get_workspace_index()
+        for (safe_path, _, append), i, error in zip(batch, positions, errors):
+            index.record(safe_path)
+            if error is not None:
+                logger.error(f"Execution Error: {error}")
+                results[i] = f"Failed to execute write_file: {str(error)}"
+            else:
+                results[i] = _write_result(commands[i]["params"]["filename"], append)
+    return results
+
 def execute_action(command: dict) -> str:
     """
     Dispatches command to safe handlers.
     Expects command format: {"action": "...", "params": {...}}
     """
+    with tracer.span("execute", action=command.get("action")):
+        return _dispatch(command)
+
+def _dispatch(command: dict) -> str:
     action = command.get("action")
     params = command.get("params", {})
     
@@ -60,6 +227,7 @@ def execute_action(command: dict) -> str:
             
             safe_path = _get_safe_path(name)
             os.makedirs(safe_path, exist_ok=True)
+            get_workspace_index().record(safe_path)
             return f"Created folder in workspace: {name}"
 
         elif action == "close_app":
@@ -106,52 +274,48 @@ def execute_action(command: dict) -> str:
                 return "Error: Missing filename or content."
             
             safe_path = _get_safe_path(filename)
+            append = _is_append(params)
             
-            # Ensure parent directories exist
-            os.makedirs(os.path.dirname(safe_path), exist_ok=True)
-            
-            with open(safe_path, "w", encoding="utf-8") as f:
-                f.write(content)
+            # Parent directories are created as needed; the file is replaced atomically
+            if isinstance(content, str):
+                write_text(safe_path, content, append=append)
+            else:
+                # Any other iterable is streamed to disk chunk by chunk
+                write_stream(safe_path, content, append=append)
+            get_workspace_index().record(safe_path)
                 
-            return f"Saved file to workspace: {filename}"
+            return _write_result(filename, append)
 
         elif action == "list_directory":
-            workspace = settings.BASE_WORKSPACE_DIR
-            files = os.listdir(workspace)
-            if not files:
-                return "Workspace is empty."
-            return "Files in workspace:\n" + "\n".join(f"- {f}" for f in files)
+            return _list_directory(params)
 
         elif action == "read_file":
             filename = params.get("filename")
             if not filename: return "Error: Missing filename."
             
             safe_path = _get_safe_path(filename)
-            if not os.path.exists(safe_path):
+            index = get_workspace_index()
+            entry = index.stat(index.relative(safe_path))
+            if entry is None or entry.is_dir:
                 return f"Error: File not found: {filename}"
                 
             try:
-                # Basic size check (example: 100KB limit for demo)
-                if os.path.getsize(safe_path) > 100 * 1024:
-                    return f"Error: File {filename} is too large to read directly."
-
-                with open(safe_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                return f"--- Content of {filename} ---\n{content}\n--- End of File ---"
-            except UnicodeDecodeError:
-                return f"Error: File {filename} appears to be binary or non-utf-8."
+                return _read_file(filename, safe_path, params)
+            except FileNotFoundError:
+                # Removed after the index last saw it
+                index.record(safe_path)
+                return f"Error: File not found: {filename}"
+            except ValueError as e:
+                return f"Error: {e}"
 
         elif action == "analyze_screen":
             prompt = params.get("prompt", "Describe this screen.")
             
-            # 1. Capture
-            img_base64 = capture_screen_base64()
-            if not img_base64:
+            # Capture (or reuse the watcher's latest frame) and analyze via LLM.
+            # Repeat questions about an unchanged screen are answered from cache.
+            response = analyze_screen(prompt)
+            if response is None:
                 return "Error: Failed to capture screen."
-            
-            # 2. Analyze via LLM
-            # We use the existing ask_llm function which now supports images
-            response = ask_llm(prompt, image_base64=img_base64)
             return f"Vision Analysis: {response}"
 
         elif action == "search_web":
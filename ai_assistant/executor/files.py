@@ -0,0 +1,416 @@
+import os
+import re
+import mmap
+import codecs
+import stat
+import bisect
+import secrets
+import threading
+from collections import OrderedDict
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024   # Bytes processed per step when scanning; bounds memory use
+BINARY_SNIFF = 8192
+
+class _LineCheckpoints:
+    """
+    Sparse line index of a file: (byte offset, lines before that offset) every CHUNK_SIZE bytes.
+    Built lazily by counting newlines chunk by chunk, and reused while the file is unchanged.
+    """
+    def __init__(self, size: int, mtime: float):
+        self.size = size
+        self.mtime = mtime
+        self.offsets = [0]
+        self.lines = [0]
+        self.complete = False
+        self.total_lines = None
+
+    def extend(self, mm, upto_line: int = None):
+        """Counts newlines until upto_line is covered (or the end of the file)."""
+        while not self.complete and (upto_line is None or self.lines[-1] <= upto_line):
+            start = self.offsets[-1]
+            end = min(start + CHUNK_SIZE, self.size)
+            if end >= self.size:
+                self.complete = True
+                self.total_lines = self.lines[-1] + mm[start:end].count(b"\n") + (1 if self.size and mm[self.size - 1:self.size] != b"\n" else 0)
+                return
+            self.lines.append(self.lines[-1] + mm[start:end].count(b"\n"))
+            self.offsets.append(end)
+
+    def nearest(self, line: int):
+        """Checkpoint (offset, newlines before it) at or before the start of 0-based line."""
+        i = bisect.bisect_right(self.lines, line) - 1
+        return self.offsets[i], self.lines[i]
+
+_checkpoints = OrderedDict()   # path -> _LineCheckpoints
+_checkpoints_lock = threading.Lock()
+
+def _get_checkpoints(path: str, size: int, mtime: float) -> _LineCheckpoints:
+    with _checkpoints_lock:
+        cp = _checkpoints.get(path)
+        if cp is None or cp.size != size or cp.mtime != mtime:
+            cp = _LineCheckpoints(size, mtime)
+            _checkpoints[path] = cp
+        _checkpoints.move_to_end(path)
+        while len(_checkpoints) > 16:
+            _checkpoints.popitem(last=False)
+        return cp
+
+class MappedFile:
+    """
+    Read-only, memory-mapped view of a file for working with files far larger than memory.
+    Pages are loaded by the OS on demand; only the requested parts are ever decoded into
+    Python strings. Text is decoded as UTF-8 incrementally, so ranges that start or end in
+    the middle of a multi-byte character don't fail.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        st = os.fstat(self._file.fileno())
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        # mmap can't map empty files
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Decoding ---
+
+    def is_binary(self) -> bool:
+        return b"\x00" in self._map[:BINARY_SNIFF]
+
+    def decode(self, start: int, end: int) -> str:
+        """
+        Decodes bytes [start, end) chunk by chunk. A character cut at `start` is skipped,
+        one cut at `end` is left out, invalid bytes are replaced.
+        """
+        start, end = max(0, start), min(end, self.size)
+        # Skip UTF-8 continuation bytes (10xxxxxx) of a character that began before start
+        skipped = 0
+        while start < end and skipped < 3 and (self._map[start] & 0xC0) == 0x80:
+            start += 1
+            skipped += 1
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parts = []
+        for offset in range(start, end, CHUNK_SIZE):
+            parts.append(decoder.decode(self._map[offset:min(offset + CHUNK_SIZE, end)], final=False))
+        if end == self.size:
+            # A truncated character at the end of the file is reported as U+FFFD
+            parts.append(decoder.decode(b"", final=True))
+        # Otherwise whatever is left in the decoder is a character cut at `end`
+        return "".join(parts)
+
+    # --- Lines ---
+
+    def _checkpoints(self) -> _LineCheckpoints:
+        return _get_checkpoints(self.path, self.size, self.mtime)
+
+    def line_offset(self, line: int) -> int:
+        """Byte offset where 0-based line starts (self.size if the file has fewer lines)."""
+        if line <= 0:
+            return 0
+        cp = self._checkpoints()
+        cp.extend(self._map, upto_line=line)
+        offset, seen = cp.nearest(line)
+        while seen < line:
+            newline = self._map.find(b"\n", offset)
+            if newline == -1:
+                return self.size
+            offset = newline + 1
+            seen += 1
+        return offset
+
+    def line_count(self) -> int:
+        cp = self._checkpoints()
+        cp.extend(self._map)
+        return cp.total_lines
+
+    def lines(self, first: int, last: int, max_bytes: int):
+        """
+        Text of 1-based lines first..last (inclusive), at most max_bytes.
+        Returns (text, last line actually included, truncated).
+        """
+        start = self.line_offset(first - 1)
+        end = self.line_offset(last)
+        truncated = end - start > max_bytes
+        if truncated:
+            end = self._map.rfind(b"\n", start, start + max_bytes) + 1 or start + max_bytes
+            last = max(first, first - 1 + self._map[start:end].count(b"\n"))
+        elif end == self.size:
+            # The file may have fewer lines than asked for
+            last = first - 1 + self._map[start:end].count(b"\n") + (0 if self._map[end - 1:end] == b"\n" else 1)
+        return self.decode(start, end), last, truncated
+
+    def head(self, count: int, max_bytes: int):
+        """First `count` lines. Returns (text, truncated)."""
+        text, _, truncated = self.lines(1, count, max_bytes)
+        return text, truncated
+
+    def tail(self, count: int, max_bytes: int):
+        """Last `count` lines, found by scanning backwards from the end. Returns (text, truncated)."""
+        end = self.size
+        # A trailing newline ends the last line; it doesn't start a new one
+        position = end - 1 if end and self._map[end - 1:end] == b"\n" else end
+        start = 0
+        for _ in range(count):
+            newline = self._map.rfind(b"\n", 0, position)
+            if newline == -1:
+                start = 0
+                break
+            start = newline + 1
+            position = newline
+        truncated = end - start > max_bytes
+        if truncated:
+            start = end - max_bytes
+            newline = self._map.find(b"\n", start, end)
+            if newline != -1:
+                start = newline + 1
+        return self.decode(start, end), truncated
+
+    def _count_newlines(self, start: int, end: int) -> int:
+        count = 0
+        for offset in range(start, end, CHUNK_SIZE):
+            count += self._map[offset:min(offset + CHUNK_SIZE, end)].count(b"\n")
+        return count
+
+    def _line_bounds(self, position: int):
+        start = self._map.rfind(b"\n", 0, position) + 1
+        end = self._map.find(b"\n", position)
+        return start, self.size if end == -1 else end
+
+    def search(self, pattern: str, context: int = 2, max_matches: int = 20, ignore_case: bool = True):
+        """
+        Regex search directly over the mapped bytes (no copy of the file).
+        Returns ([(match line number, [(line number, text), ...]), ...], more matches exist).
+        """
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex = re.compile(pattern.encode("utf-8"), flags)
+        results = []
+        counted_to, line_no = 0, 1   # line_no is the line containing offset counted_to
+        last_line = 0
+        for match in regex.finditer(self._map):
+            start, _ = self._line_bounds(match.start())
+            line_no += self._count_newlines(counted_to, start)
+            counted_to = start
+            if line_no == last_line:
+                continue   # Several matches on one line are reported once
+            if len(results) == max_matches:
+                return results, True
+            last_line = line_no
+
+            # Context lines before and after
+            begin, before = start, 0
+            while before < context and begin > 0:
+                begin = self._map.rfind(b"\n", 0, begin - 1) + 1
+                before += 1
+            finish, after = self._line_bounds(match.start())[1], 0
+            while after < context and finish < self.size:
+                next_end = self._map.find(b"\n", finish + 1)
+                finish = self.size if next_end == -1 else next_end
+                after += 1
+            block = self.decode(begin, finish).split("\n")
+            if finish == self.size and len(block) > 1 and block[-1] == "":
+                block.pop()   # The file's final newline doesn't start another line
+            first_no = line_no - before
+            results.append((line_no, [(first_no + i, text.rstrip("\r")) for i, text in enumerate(block)]))
+        return results, False
+
+def parse_line_range(value) -> tuple:
+    """
+    "120-180" -> (120, 180), "120" -> (120, 120), [120, 180] -> (120, 180). 1-based, inclusive.
+    """
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        first, last = int(value[0]), int(value[1])
+    else:
+        text = str(value).strip()
+        first_text, _, last_text = text.partition("-")
+        first = int(first_text)
+        last = int(last_text) if last_text.strip() else first
+    if first < 1 or last < first:
+        raise ValueError(f"Invalid line range: {value}")
+    return first, last
+
+# --- Writing ---
+
+def _temp_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+
+class AtomicWriter:
+    """
+    Writes a file through a temporary file in the same directory, which replaces the target
+    only once everything has been written (os.replace is atomic on POSIX and Windows).
+    Readers and crashes never see a half-written file: they get the old content or the new one.
+    As a context manager the content is committed on a clean exit and discarded on an exception.
+    """
+    def __init__(self, path: str, encoding: str = "utf-8", fsync: bool = None):
+        self.path = path
+        self.fsync = settings.WRITE_FSYNC if fsync is None else fsync
+        self.temp_path = _temp_path(path)
+        # 0o666 like open(): the process umask applies
+        fd = os.open(self.temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        self._file = os.fdopen(fd, "w", encoding=encoding)
+        self.prepared = False
+
+    def write(self, text: str) -> int:
+        return self._file.write(text)
+
+    def prepare(self):
+        """Finishes the temporary file (flush, optional fsync, permissions) without publishing it."""
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        try:
+            # Keep the permissions of the file being replaced
+            os.chmod(self.temp_path, stat.S_IMODE(os.stat(self.path).st_mode))
+        except FileNotFoundError:
+            pass
+        self.prepared = True
+
+    def publish(self, sync_directory: bool = True):
+        os.replace(self.temp_path, self.path)
+        if self.fsync and sync_directory:
+            _fsync_directory(os.path.dirname(self.path))
+
+    def commit(self):
+        if not self.prepared:
+            self.prepare()
+        self.publish()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.commit()
+            except BaseException:
+                self.discard()
+                raise
+        else:
+            self.discard()
+        return False
+
+def _fsync_directory(directory: str):
+    """Persists renames in a directory (POSIX only; Windows can't open directories)."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _ensure_directories(paths) -> set:
+    """Creates the parent directories of paths, each distinct directory once."""
+    directories = {os.path.dirname(path) for path in paths}
+    for directory in sorted(directories):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+    return directories
+
+def append_text(path: str, content: str, encoding: str = "utf-8", fsync: bool = None):
+    """Appends to a file (created if missing), e.g. for log-style content."""
+    fsync = settings.WRITE_FSYNC if fsync is None else fsync
+    with open(path, "a", encoding=encoding) as f:
+        f.write(content)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+def write_text(path: str, content: str, append: bool = False, encoding: str = "utf-8"):
+    """Writes one file: atomically replaced, or appended to."""
+    _ensure_directories([path])
+    if append:
+        append_text(path, content, encoding)
+        return
+    with AtomicWriter(path, encoding) as writer:
+        writer.write(content)
+
+def write_stream(path: str, chunks, append: bool = False, encoding: str = "utf-8") -> int:
+    """
+    Writes text chunks as they arrive (e.g. from a streaming model response) instead of
+    joining them first. Unless appending, the file only appears once the stream has ended;
+    if the stream fails the old content stays. Returns the number of characters written.
+    """
+    _ensure_directories([path])
+    written = 0
+    if append:
+        with open(path, "a", encoding=encoding) as f:
+            for chunk in chunks:
+                written += f.write(chunk)
+        return written
+    with AtomicWriter(path, encoding) as writer:
+        for chunk in chunks:
+            written += writer.write(chunk)
+    return written
+
+def write_batch(items: list, encoding: str = "utf-8") -> list:
+    """
+    Writes many files in one pass: every parent directory is created once, all contents go
+    to temporary files first and are then renamed into place together (with WRITE_FSYNC,
+    each directory is synced once instead of once per file).
+    items are (path, content, append) tuples. Returns one exception or None per item.
+    """
+    errors = [None] * len(items)
+    try:
+        directories = _ensure_directories(path for path, _, _ in items)
+    except OSError:
+        # Fall back to per-file creation so one bad directory doesn't fail the whole batch
+        directories = set()
+
+    writers = []   # (position, AtomicWriter)
+    for i, (path, content, append) in enumerate(items):
+        try:
+            if not directories:
+                _ensure_directories([path])
+            if append:
+                append_text(path, content, encoding)
+                continue
+            writer = AtomicWriter(path, encoding)
+        except OSError as e:
+            errors[i] = e
+            continue
+        try:
+            writer.write(content)
+            writer.prepare()
+            writers.append((i, writer))
+        except OSError as e:
+            writer.discard()
+            errors[i] = e
+
+    # Publish
+    for i, writer in writers:
+        try:
+            writer.publish(sync_directory=False)
+        except OSError as e:
+            writer.discard()
+            errors[i] = e
+
+    if settings.WRITE_FSYNC:
+        for directory in directories or {os.path.dirname(path) for path, _, _ in items}:
+            try:
+                _fsync_directory(directory)
+            except OSError as e:
+                logger.debug(f"Directory fsync skipped for {directory!r}: {e}")
+    return errors
@@ -0,0 +1,207 @@
+import posixpath
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from ai_assistant.config import settings
+from ai_assistant.executor.actions import execute_action, write_files
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
+
+logger = setup_logger(__name__)
+
+# Actions that act on whatever window currently has focus: they must keep their relative order
+FOREGROUND_ACTIONS = {"open_app", "close_app", "open_url", "type_text", "analyze_screen"}
+# Actions that change the workspace contents
+WORKSPACE_WRITES = {"create_folder", "write_file"}
+WORKSPACE_ACTIONS = WORKSPACE_WRITES | {"read_file", "list_directory"}
+# Actions with no ordering constraints at all
+INDEPENDENT_ACTIONS = {"respond", "search_web"}
+KNOWN_ACTIONS = FOREGROUND_ACTIONS | WORKSPACE_ACTIONS | INDEPENDENT_ACTIONS | {"system_control"}
+
+def _workspace_path(command: dict):
+    """
+    Returns the normalized workspace-relative path a file command touches, or None.
+    """
+    params = command.get("params", {})
+    name = params.get("filename") if command.get("action") in ("write_file", "read_file") else params.get("name")
+    if not name:
+        return None
+    return posixpath.normpath(str(name).replace("\\", "/")).lstrip("/").lower()
+
+def _is_within(path: str, folder: str) -> bool:
+    return path == folder or path.startswith(folder + "/")
+
+def depends_on(earlier: dict, later: dict) -> bool:
+    """
+    True if `later` must not start before `earlier` has finished.
+    """
+    a, b = earlier.get("action"), later.get("action")
+
+    # Unknown actions and system control (shutdown, lock) are barriers
+    if a not in KNOWN_ACTIONS or b not in KNOWN_ACTIONS:
+        return True
+    if a == "system_control" or b == "system_control":
+        return True
+
+    if a in INDEPENDENT_ACTIONS or b in INDEPENDENT_ACTIONS:
+        return False
+
+    # e.g. type_text must follow open_app, analyze_screen must see the opened window
+    if a in FOREGROUND_ACTIONS and b in FOREGROUND_ACTIONS:
+        return True
+
+    # The desktop and the workspace don't interfere with each other
+    if a not in WORKSPACE_ACTIONS or b not in WORKSPACE_ACTIONS:
+        return False
+
+    # A listing must reflect writes before it, and must not observe writes after it
+    if "list_directory" in (a, b):
+        return bool({a, b} & WORKSPACE_WRITES)
+
+    path_a, path_b = _workspace_path(earlier), _workspace_path(later)
+    if path_a is None or path_b is None:
+        return a in WORKSPACE_WRITES or b in WORKSPACE_WRITES
+
+    # write_file into a folder must follow create_folder of that folder
+    if a == "create_folder":
+        return _is_within(path_b, path_a)
+
+    # read-after-write, write-after-read and write-after-write on the same file
+    if path_a == path_b:
+        return a == "write_file" or b == "write_file"
+
+    return False
+
+def infer_dependencies(commands: list[dict]) -> list[set[int]]:
+    """
+    For each command, the indices of earlier commands it has to wait for.
+    """
+    return [
+        {j for j in range(i) if depends_on(commands[j], command)}
+        for i, command in enumerate(commands)
+    ]
+
+class _Node:
+    def __init__(self, index: int, command: dict):
+        self.index = index
+        self.command = command
+        self.future = Future()
+        self.remaining = 0
+        self.dependents = []
+        self.span = tracer.current()   # Traced as part of the turn that submitted it
+
+class PlanScheduler:
+    """
+    Executes commands on a bounded worker pool while respecting the ordering
+    constraints between them (see depends_on).
+    Commands can be submitted one at a time as they are confirmed; each one starts
+    as soon as the unfinished commands it depends on are done.
+    write_file commands that are ready at the same time are coalesced and handed to
+    batch_fn in one call (one pass over the disk instead of one per file); pass
+    batch_fn=None to execute every command on its own.
+    """
+    def __init__(self, max_workers: int = None, executor_fn=execute_action, batch_fn=write_files):
+        self.max_workers = max_workers or settings.PLAN_MAX_WORKERS
+        self.executor_fn = executor_fn
+        self.batch_fn = batch_fn if settings.WRITE_BATCHING else None
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan")
+        self._lock = threading.Lock()
+        self._pending = []   # Submitted nodes that have not finished yet
+        self._count = 0
+        self._write_queue = []   # Ready write_file nodes waiting for the next batch
+        self._flush_scheduled = False
+
+    def _add(self, command: dict) -> _Node:
+        # Caller holds the lock
+        node = _Node(self._count, command)
+        self._count += 1
+        for earlier in self._pending:
+            if depends_on(earlier.command, command):
+                earlier.dependents.append(node)
+                node.remaining += 1
+        self._pending.append(node)
+        return node
+
+    def submit(self, command: dict) -> Future:
+        """
+        Schedules a command. Returns a Future resolving to the action's result string.
+        """
+        return self.submit_many([command])[0]
+
+    def submit_many(self, commands: list[dict]) -> list[Future]:
+        """
+        Schedules several commands at once, so that the ready writes among them are
+        executed as a single batch. Returns one Future per command.
+        """
+        with self._lock:
+            nodes = [self._add(command) for command in commands]
+        self._launch([node for node in nodes if node.remaining == 0])
+        return [node.future for node in nodes]
+
+    def _launch(self, nodes: list[_Node]):
+        others = nodes
+        if self.batch_fn is not None:
+            writes = [node for node in nodes if node.command.get("action") == "write_file"]
+            others = [node for node in nodes if node.command.get("action") != "write_file"]
+            if writes:
+                with self._lock:
+                    self._write_queue.extend(writes)
+                    schedule = not self._flush_scheduled
+                    self._flush_scheduled = True
+                if schedule:
+                    self._pool.submit(self._flush_writes)
+        for node in others:
+            self._pool.submit(self._run, node)
+
+    def _run(self, node: _Node):
+        try:
+            with tracer.attach(node.span):
+                result = self.executor_fn(node.command)
+        except Exception as e:
+            logger.error(f"Execution Error: {e}")
+            result = f"Failed to execute {node.command.get('action')}: {str(e)}"
+        self._complete(node, result)
+
+    def _flush_writes(self):
+        """Executes every write that became ready since the last flush, as one batch."""
+        with self._lock:
+            nodes, self._write_queue = self._write_queue, []
+            self._flush_scheduled = False
+        if len(nodes) == 1:
+            self._run(nodes[0])
+            return
+
+        try:
+            with tracer.attach(nodes[0].span):
+                results = self.batch_fn([node.command for node in nodes])
+        except Exception as e:
+            logger.error(f"Execution Error: {e}")
+            results = [f"Failed to execute write_file: {str(e)}"] * len(nodes)
+        for node, result in zip(nodes, results):
+            self._complete(node, result)
+
+    def _complete(self, node: _Node, result: str):
+        with self._lock:
+            self._pending.remove(node)
+            ready = []
+            for dependent in node.dependents:
+                dependent.remaining -= 1
+                if dependent.remaining == 0:
+                    ready.append(dependent)
+
+        node.future.set_result(result)
+        if ready:
+            self._launch(ready)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+def execute_plan(commands: list[dict], max_workers: int = None) -> list[str]:
+    """
+    Runs a whole plan concurrently where possible and returns the results in plan order.
+    """
+    scheduler = PlanScheduler(max_workers=max_workers)
+    try:
+        futures = scheduler.submit_many(commands)
+        return [future.result() for future in futures]
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,323 @@
+import os
+import time
+import fnmatch
+import threading
+from stat import S_ISDIR
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class Entry:
+    __slots__ = ("path", "name", "is_dir", "size", "mtime")
+
+    def __init__(self, path: str, is_dir: bool, size: int, mtime: float):
+        self.path = path                       # Workspace-relative, "/"-separated
+        self.name = path.rsplit("/", 1)[-1]
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+
+    @classmethod
+    def from_stat(cls, path: str, st: os.stat_result, is_dir: bool):
+        return cls(path, is_dir, 0 if is_dir else st.st_size, st.st_mtime)
+
+def _parent(path: str) -> str:
+    return path.rsplit("/", 1)[0] if "/" in path else ""
+
+SORT_KEYS = {
+    "name": lambda e: e.path.lower(),
+    "size": lambda e: (e.size, e.path.lower()),
+    "mtime": lambda e: (e.mtime, e.path.lower()),
+}
+
+class WorkspaceIndex:
+    """
+    In-memory metadata index (type, size, mtime) of the workspace, built once with
+    os.scandir and then kept up to date incrementally:
+    - the executor records the files it writes right away (record()),
+    - a watcher picks up outside changes: watchdog (inotify/FSEvents/ReadDirectoryChangesW)
+      when installed, otherwise polling of directory mtimes, which change whenever an entry
+      is added, removed or renamed; a periodic full rescan catches in-place edits.
+    """
+    def __init__(self, root: str, poll_interval: float = 2.0, full_rescan_interval: float = 60.0):
+        self.root = os.path.abspath(root)
+        self.poll_interval = poll_interval
+        self.full_rescan_interval = full_rescan_interval
+        self._entries = {}      # path -> Entry ("" is the root)
+        self._children = {}     # directory path -> set of child paths
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+        self.built = False
+
+    # --- Paths ---
+
+    def relative(self, abs_path: str) -> str:
+        rel = os.path.relpath(os.path.abspath(abs_path), self.root)
+        return "" if rel == "." else rel.replace(os.sep, "/")
+
+    def absolute(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/")) if path else self.root
+
+    # --- Building ---
+
+    def _scan(self, path: str, entries: dict, children: dict, recursive: bool = True):
+        """Scans a directory (tree) into entries/children, iteratively: no recursion limit."""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            names = children.setdefault(current, set())
+            try:
+                with os.scandir(self.absolute(current)) as it:
+                    for item in it:
+                        child = f"{current}/{item.name}" if current else item.name
+                        try:
+                            is_dir = item.is_dir(follow_symlinks=False)
+                            entries[child] = Entry.from_stat(child, item.stat(follow_symlinks=False), is_dir)
+                        except OSError:
+                            continue
+                        names.add(child)
+                        if is_dir and recursive:
+                            stack.append(child)
+            except OSError as e:
+                logger.debug(f"Workspace scan skipped {current!r}: {e}")
+
+    def build(self):
+        """Full scan of the workspace. Replaces the index atomically."""
+        started = time.perf_counter()
+        entries, children = {}, {}
+        try:
+            entries[""] = Entry.from_stat("", os.stat(self.root), True)
+        except OSError:
+            os.makedirs(self.root, exist_ok=True)
+            entries[""] = Entry.from_stat("", os.stat(self.root), True)
+        self._scan("", entries, children)
+        with self._lock:
+            self._entries, self._children = entries, children
+            self.built = True
+        logger.info(f"Workspace index built: {len(entries) - 1} entries in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    # --- Incremental updates ---
+
+    def _remove(self, path: str):
+        # Caller holds the lock
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            self._entries.pop(current, None)
+            stack.extend(self._children.pop(current, ()))
+        self._children.get(_parent(path), set()).discard(path)
+
+    def _refresh_dir(self, path: str):
+        """Re-reads one directory: adds, updates and removes its direct children."""
+        # Caller holds the lock
+        try:
+            entry = Entry.from_stat(path, os.stat(self.absolute(path)), True)
+        except OSError:
+            self._remove(path)
+            return
+        self._entries[path] = entry
+
+        entries, children = {}, {}
+        self._scan(path, entries, children, recursive=False)
+        fresh = children[path]
+        for gone in self._children.get(path, set()) - fresh:
+            self._remove(gone)
+        for child in fresh:
+            new = entries[child]
+            if new.is_dir and child not in self._children:
+                # New subdirectory: index it completely
+                self._entries[child] = new
+                sub_entries, sub_children = {}, {}
+                self._scan(child, sub_entries, sub_children)
+                self._entries.update(sub_entries)
+                self._children.update(sub_children)
+            else:
+                self._entries[child] = new
+        self._children[path] = fresh
+
+    def record(self, abs_path: str):
+        """
+        Updates the index for one path right after it changed (created, written or deleted),
+        so it is listable and statable without waiting for the watcher.
+        """
+        path = self.relative(abs_path)
+        if path.startswith(".."):
+            return
+        with self._lock:
+            if not self.built:
+                return
+            try:
+                st = os.stat(abs_path, follow_symlinks=False)
+            except OSError:
+                self._remove(path)
+                return
+
+            # Make sure every parent directory is known
+            missing = []
+            parent = _parent(path) if path else None
+            while parent is not None and parent not in self._entries:
+                missing.append(parent)
+                parent = _parent(parent) if parent else None
+            for directory in reversed(missing):
+                self._entries[directory] = Entry.from_stat(directory, os.stat(self.absolute(directory)), True)
+                self._children.setdefault(directory, set())
+                self._children.setdefault(_parent(directory), set()).add(directory)
+
+            is_dir = S_ISDIR(st.st_mode)
+            known_dir = path in self._children
+            self._entries[path] = Entry.from_stat(path, st, is_dir)
+            if path:
+                self._children.setdefault(_parent(path), set()).add(path)
+            if is_dir and not known_dir:
+                self._refresh_dir(path)
+
+    # --- Queries ---
+
+    def stat(self, path: str):
+        """
+        Entry for a workspace-relative path, or None if it doesn't exist.
+        Falls back to a single os.stat for paths the watcher hasn't seen yet.
+        """
+        path = path.strip("/")
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None:
+            return entry
+        abs_path = self.absolute(path)
+        if not os.path.lexists(abs_path):
+            return None
+        self.record(abs_path)
+        with self._lock:
+            return self._entries.get(path)
+
+    def _walk(self, path: str, recursive: bool):
+        stack = [path]
+        while stack:
+            for child in self._children.get(stack.pop(), ()):
+                entry = self._entries.get(child)
+                if entry is None:
+                    continue
+                yield entry
+                if recursive and entry.is_dir:
+                    stack.append(child)
+
+    def list(self, path: str = "", recursive: bool = False, pattern: str = None, sort: str = "name",
+             descending: bool = False, offset: int = 0, limit: int = None):
+        """
+        Returns (entries, total) for a directory.
+        pattern is a glob matched against the name, or against the relative path if it contains "/".
+        sort is "name", "size" or "mtime"; offset/limit select one page.
+        """
+        path = path.strip("/")
+        key = SORT_KEYS.get(sort, SORT_KEYS["name"])
+        with self._lock:
+            entries = list(self._walk(path, recursive))
+        if pattern:
+            if "/" in pattern:
+                entries = [e for e in entries if fnmatch.fnmatch(e.path.lower(), pattern.lower())]
+            else:
+                entries = [e for e in entries if fnmatch.fnmatch(e.name.lower(), pattern.lower())]
+        entries.sort(key=key, reverse=descending)
+        total = len(entries)
+        end = None if limit is None else offset + limit
+        return entries[offset:end], total
+
+    def __len__(self) -> int:
+        return max(0, len(self._entries) - 1)
+
+    # --- Watching ---
+
+    @property
+    def watching(self) -> bool:
+        return self._observer is not None or (self._thread is not None and self._thread.is_alive())
+
+    def start(self):
+        """Starts following outside changes (watchdog if installed, polling otherwise)."""
+        if self.watching:
+            return
+        self._stop.clear()
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            self._thread = threading.Thread(target=self._poll, name="workspace-poller", daemon=True)
+            self._thread.start()
+            logger.info(f"Workspace index polling every {self.poll_interval}s (install watchdog for change notifications).")
+            return
+
+        index = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for attr in ("src_path", "dest_path"):
+                    changed = getattr(event, attr, None)
+                    if changed:
+                        index.record(os.fsdecode(changed))
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.root, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+        logger.info("Workspace index following file system notifications.")
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def poll_once(self):
+        """Rescans every directory whose mtime changed since it was indexed."""
+        with self._lock:
+            directories = [(path, self._entries[path].mtime) for path in self._children if path in self._entries]
+        for path, mtime in directories:
+            try:
+                current = os.stat(self.absolute(path)).st_mtime
+            except OSError:
+                current = None
+            if current != mtime:
+                with self._lock:
+                    if current is None:
+                        self._remove(path)
+                    else:
+                        self._refresh_dir(path)
+
+    def _poll(self):
+        last_full = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if time.monotonic() - last_full >= self.full_rescan_interval:
+                    self.build()
+                    last_full = time.monotonic()
+                else:
+                    self.poll_once()
+            except Exception as e:
+                logger.error(f"Workspace index poll failed: {e}")
+
+# Global instance (built on first use)
+_index = None
+_index_lock = threading.Lock()
+
+def get_workspace_index() -> WorkspaceIndex:
+    global _index
+    if _index is None or _index.root != os.path.abspath(settings.BASE_WORKSPACE_DIR):
+        with _index_lock:
+            if _index is None or _index.root != os.path.abspath(settings.BASE_WORKSPACE_DIR):
+                if _index is not None:
+                    _index.stop()
+                index = WorkspaceIndex(
+                    settings.BASE_WORKSPACE_DIR,
+                    poll_interval=settings.WORKSPACE_POLL_INTERVAL,
+                    full_rescan_interval=settings.WORKSPACE_FULL_RESCAN_INTERVAL,
+                )
+                index.build()
+                if settings.WORKSPACE_WATCH:
+                    index.start()
+                _index = index
+    return _index
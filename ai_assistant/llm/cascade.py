@@ -0,0 +1,192 @@
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer, LatencyHistogram
+
+logger = setup_logger(__name__)
+
+class CascadeStats:
+    """
+    Outcomes of the fast-model cascade: how often the fast model's answer was accepted,
+    how often (and why) it was escalated to the main model, and the latency saved.
+    Saved time is exact in race mode (the main model's reply is awaited in the background);
+    in cascade mode it is estimated from the main model's average latency, once known.
+    """
+    EWMA_WEIGHT = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.requests = 0
+        self.accepted = {"fast": 0, "main": 0}
+        self.escalations = {}          # reason -> count
+        self.latency = {"fast": LatencyHistogram(), "main": LatencyHistogram()}
+        self.saved_ms = 0.0            # Latency saved by answering from the fast model
+        self.added_ms = 0.0            # Time spent waiting for fast answers that were then escalated
+        self._main_estimate = None     # EWMA of the main model's latency (ms)
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def record_latency(self, tier: str, ms: float):
+        with self._lock:
+            self.latency[tier].record(ms)
+            if tier == "main":
+                if self._main_estimate is None:
+                    self._main_estimate = ms
+                else:
+                    self._main_estimate += self.EWMA_WEIGHT * (ms - self._main_estimate)
+
+    def record_answer(self, tier: str, fast_ms: float = None, saved_ms: float = None):
+        with self._lock:
+            self.requests += 1
+            self.accepted[tier] += 1
+            if tier == "fast":
+                if saved_ms is None and self._main_estimate is not None:
+                    saved_ms = self._main_estimate - fast_ms
+                if saved_ms is not None:
+                    self.saved_ms += saved_ms
+
+    def record_saving(self, saved_ms: float):
+        with self._lock:
+            self.saved_ms += saved_ms
+
+    def record_escalation(self, reason: str, fast_ms: float = None):
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+            if fast_ms is not None:
+                self.added_ms += fast_ms
+
+    def summary(self) -> dict:
+        with self._lock:
+            escalated = sum(self.escalations.values())
+            return {
+                "requests": self.requests,
+                "answered_by_fast": self.accepted["fast"],
+                "answered_by_main": self.accepted["main"],
+                "escalations": escalated,
+                "escalation_rate": round(escalated / self.requests, 3) if self.requests else 0.0,
+                "escalation_reasons": dict(self.escalations),
+                "fast_latency": self.latency["fast"].summary(),
+                "main_latency": self.latency["main"].summary(),
+                "latency_saved_ms": round(self.saved_ms, 1),
+                "latency_added_ms": round(self.added_ms, 1),
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cascade")
+    return _pool
+
+def _timed(ask, model: str, attempts: int):
+    started = time.perf_counter()
+    raw = ask(model, attempts)
+    return raw, (time.perf_counter() - started) * 1000
+
+def run_cascade(ask, validate, fast_model: str, main_model: str, race: bool = False):
+    """
+    Small-model-first request.
+    ask(model, attempts) performs one request without touching the history and returns the raw text.
+    validate(raw) returns (parsed, None) for an acceptable answer or (None, reason) otherwise.
+
+    Cascade: the fast model answers first; the main model is only asked when validation fails.
+    Race: both are asked at once and the first valid answer wins; the main model's answer is
+    used when neither is valid.
+    Returns (raw, parsed or None, model that answered).
+    """
+    with tracer.span("llm.cascade", mode="race" if race else "cascade", fast_model=fast_model) as span:
+        if race:
+            raw, parsed, tier = _race(ask, validate, fast_model, main_model, span)
+        else:
+            raw, parsed, tier = _cascade(ask, validate, fast_model, main_model, span)
+        span.set("answered_by", tier)
+        return raw, parsed, main_model if tier == "main" else fast_model
+
+def _cascade(ask, validate, fast_model: str, main_model: str, span):
+    try:
+        # A single attempt: on errors, escalating beats retrying the fast model
+        raw, fast_ms = _timed(ask, fast_model, 1)
+    except Exception as e:
+        logger.warning(f"Fast model failed ({e}); escalating to {main_model}.")
+        reason, fast_ms, raw = "error", None, None
+    else:
+        cascade_stats.record_latency("fast", fast_ms)
+        parsed, reason = validate(raw)
+        if parsed is not None:
+            cascade_stats.record_answer("fast", fast_ms=fast_ms)
+            return raw, parsed, "fast"
+
+    logger.info(f"Escalating to {main_model}: {reason}.")
+    span.event("escalate", reason=reason)
+    cascade_stats.record_escalation(reason, fast_ms)
+    raw, main_ms = _timed(ask, main_model, None)
+    cascade_stats.record_latency("main", main_ms)
+    cascade_stats.record_answer("main")
+    parsed, _ = validate(raw)
+    return raw, parsed, "main"
+
+def _race(ask, validate, fast_model: str, main_model: str, span):
+    pool = _get_pool()
+    # Each request runs in its own copy of the context, so its spans nest under this one
+    futures = {
+        pool.submit(contextvars.copy_context().run, _timed, ask, fast_model, 1): "fast",
+        pool.submit(contextvars.copy_context().run, _timed, ask, main_model, None): "main",
+    }
+    by_tier = {tier: future for future, tier in futures.items()}
+    pending = set(futures)
+    fallback, errors = None, {}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            tier = futures[future]
+            try:
+                raw, ms = future.result()
+            except Exception as e:
+                errors[tier] = e
+                if tier == "fast":
+                    cascade_stats.record_escalation("error")
+                continue
+            cascade_stats.record_latency(tier, ms)
+            parsed, reason = validate(raw)
+            if parsed is not None:
+                if tier == "fast":
+                    cascade_stats.record_answer("fast", fast_ms=ms, saved_ms=0.0)
+                    if fallback is None and "main" not in errors:
+                        # The main model's answer is no longer needed, but its latency tells what was saved
+                        by_tier["main"].add_done_callback(lambda f, ms=ms: _record_race_saving(f, ms))
+                else:
+                    cascade_stats.record_answer("main")
+                return raw, parsed, tier
+            if tier == "fast":
+                span.event("fast_rejected", reason=reason)
+                # Ran alongside the main model, so it added no latency
+                cascade_stats.record_escalation(reason)
+            else:
+                fallback = raw
+
+    if fallback is not None:
+        cascade_stats.record_answer("main")
+        return fallback, None, "main"
+    raise errors.get("main") or errors.get("fast")
+
+def _record_race_saving(future, fast_ms: float):
+    try:
+        _, main_ms = future.result()
+    except Exception:
+        return
+    cascade_stats.record_latency("main", main_ms)
+    cascade_stats.record_saving(max(0.0, main_ms - fast_ms))
+
+# Global instance
+cascade_stats = CascadeStats()
@@ -1,103 +1,311 @@
-from openai import OpenAI, APIError, APITimeoutError, BadRequestError
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 from ai_assistant.config import settings
+from ai_assistant.llm.history import ConversationHistory
 from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.startup import startup_profiler
+from ai_assistant.utils.tracing import tracer
 
 logger = setup_logger(__name__)
 
+SUMMARY_PROMPT = (
+    "Summarize the following conversation between a user and their desktop assistant in a few sentences. "
+    "Keep names of files, folders, apps, URLs and facts that later requests may refer to."
+)
+
+def _is_transient(error: BaseException) -> bool:
+    # openai is imported lazily: it is one of the slowest imports at startup
+    from openai import APIError, APITimeoutError
+    return isinstance(error, (APITimeoutError, APIError))
+
+def _trace_retry(retry_state):
+    # Called by tenacity before sleeping between attempts; lands on the enclosing "llm" span
+    tracer.event(
+        "retry",
+        attempt=retry_state.attempt_number,
+        wait_s=round(retry_state.next_action.sleep, 3),
+        error=str(retry_state.outcome.exception()),
+    )
+
 class LLMClient:
     def __init__(self):
+        from openai import OpenAI
+        from ai_assistant.llm.transport import get_http_client, build_timeout
         self.client = OpenAI(
             api_key=settings.OPENAI_API_KEY,
-            base_url=settings.OPENAI_BASE_URL
+            base_url=settings.OPENAI_BASE_URL,
+            # Shared keep-alive pool: connections opened by one request (or the warm-up) are reused
+            http_client=get_http_client(),
+            timeout=build_timeout(),
+        )
+        # Bounded by tokens; older turns are folded into a summary off the request path
+        self.history = ConversationHistory(
+            budget_tokens=settings.HISTORY_TOKEN_BUDGET,
+            keep_recent=settings.HISTORY_KEEP_RECENT,
+            summarizer=self._summarize,
         )
-        self.history = []
-        self.max_history = 10  # Keep last 10 exchanges
 
-    @retry(
-        retry=retry_if_exception_type((APITimeoutError, APIError)),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
-    def ask(self, prompt: str, system_prompt: str = None, image_base64: str = None) -> str:
+    def _summarize(self, previous_summary: str, messages: list[dict]) -> str:
+        """
+        Condenses old turns (plus the previous summary) into a short summary. Runs in the background.
+        """
+        lines = [f"Earlier summary: {previous_summary}"] if previous_summary else []
+        lines.extend(f"{m['role']}: {m['content'][:2000]}" for m in messages)
+        response = self.client.chat.completions.create(
+            model=settings.SUMMARY_MODEL_NAME,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": "\n".join(lines)},
+            ],
+            temperature=0.0,
+        )
+        return response.choices[0].message.content
+
+    def _build_messages(self, prompt: str, system_prompt: str = None, image_base64: str = None) -> list[dict]:
+        """
+        Constructs the message list: system prompt, history context, then the user turn.
+        """
+        msgs = []
+        if system_prompt:
+            msgs.append({"role": "system", "content": system_prompt})
+        msgs.extend(self.history.as_messages())
+
+        if image_base64:
+            content = [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
+            ]
+        else:
+            content = prompt
+
+        msgs.append({"role": "user", "content": content})
+        return msgs
+
+    def _remember(self, prompt: str, content: str, image_sent: bool = False):
+        """
+        Appends an exchange to the history (which enforces its own token budget).
+        """
+        # Note: We don't store the full base64 image in history to save tokens/memory, just a placeholder or text
+        if image_sent:
+            self.history.append("user", f"{prompt} [Image Sent]")
+        else:
+            self.history.append("user", prompt)
+
+        self.history.append("assistant", content)
+
+    def ask(self, prompt: str, system_prompt: str = None, image_base64: str = None,
+            model: str = None, update_history: bool = True) -> str:
         """
         Sends a prompt to the LLM with history context and returns the raw text response.
+        model overrides the configured (text or vision) model; with update_history=False the
+        exchange is not added to the history (the caller may record it later, see record_exchange).
+        """
+        model = model or (settings.VISION_MODEL_NAME if image_base64 else settings.MODEL_NAME)
+        with tracer.span("llm", model=model, image=bool(image_base64)):
+            return self._ask(prompt, system_prompt, image_base64, model, update_history)
+
+    def ask_cascade(self, prompt: str, system_prompt: str, validate, race: bool = False, update_history: bool = True):
+        """
+        Asks settings.FAST_MODEL_NAME first and escalates to settings.MODEL_NAME only when
+        validate(raw) rejects the answer (see llm/cascade.py); with race=True both are asked at once.
+        Only the answer that is used goes into the history (unless update_history=False).
+        Returns (raw text, validated result or None).
         """
+        from ai_assistant.llm.cascade import run_cascade
+
+        def ask(model: str, attempts: int = None) -> str:
+            if attempts is None:
+                return self.ask(prompt, system_prompt, model=model, update_history=False)
+            with tracer.span("llm", model=model):
+                # Fewer retries: a failing fast model is better escalated than retried
+                return LLMClient._ask.retry_with(stop=stop_after_attempt(attempts))(
+                    self, prompt, system_prompt, None, model, False
+                )
+
+        raw, parsed, _ = run_cascade(ask, validate, settings.FAST_MODEL_NAME, settings.MODEL_NAME, race=race)
+        if update_history:
+            self._remember(prompt, raw)
+        return raw, parsed
+
+    @retry(
+        retry=retry_if_exception(_is_transient),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=_trace_retry,
+    )
+    def _ask(self, prompt: str, system_prompt: str, image_base64: str, current_model: str, update_history: bool) -> str:
+        # One attempt; retried by tenacity on transient API errors
+        from openai import BadRequestError
         try:
-            logger.info(f"Sending LLM request (Model: {settings.MODEL_NAME})")
-            
-            # Helper to construct messages
-            def build_messages(use_image: bool):
-                msgs = []
-                if system_prompt:
-                    msgs.append({"role": "system", "content": system_prompt})
-                msgs.extend(self.history)
-                
-                if use_image and image_base64:
-                    content = [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-                    ]
-                else:
-                    content = prompt
-                    
-                msgs.append({"role": "user", "content": content})
-                return msgs
+            logger.info(f"Sending LLM request (Model: {current_model})")
 
             # 1. Try with Image (if requested)
             try:
-                messages = build_messages(use_image=bool(image_base64))
-                
-                # Select appropriate model
-                current_model = settings.VISION_MODEL_NAME if image_base64 else settings.MODEL_NAME
-                logger.info(f"Using Model for Request: {current_model}")
-
-                response = self.client.chat.completions.create(
-                    model=current_model,
-                    messages=messages,
-                    temperature=0.0,
-                )
+                messages = self._build_messages(prompt, system_prompt, image_base64)
+
+                with tracer.span("llm.attempt", model=current_model):
+                    response = self.client.chat.completions.create(
+                        model=current_model,
+                        messages=messages,
+                        temperature=0.0,
+                    )
             except BadRequestError as e:
                 # 2. Fallback if model rejects image structure (e.g. Llama-3)
                 if image_base64:
                     logger.warning(f"Model rejected image input ({e}). Falling back to text-only.")
-                    messages = build_messages(use_image=False)
+                    messages = self._build_messages(prompt, system_prompt)
                     # Append note to prompt so model knows context is missing
                     messages[-1]['content'] += "\n[System Note: Screen analysis failed due to model incompatibility. Use text context only.]"
                     
-                    response = self.client.chat.completions.create(
-                        model=settings.MODEL_NAME,
-                        messages=messages,
-                        temperature=0.0,
-                    )
+                    with tracer.span("llm.vision_fallback", model=settings.MODEL_NAME):
+                        response = self.client.chat.completions.create(
+                            model=settings.MODEL_NAME,
+                            messages=messages,
+                            temperature=0.0,
+                        )
                 else:
                     raise e
 
             content = response.choices[0].message.content.strip()
 
             # 2. Update History
-            # Note: We don't store the full base64 image in history to save tokens/memory, just a placeholder or text
-            if image_base64:
-                self.history.append({"role": "user", "content": f"{prompt} [Image Sent]"})
-            else:
-                self.history.append({"role": "user", "content": prompt})
-            
-            self.history.append({"role": "assistant", "content": content})
-            
-            # 3. Sliding Window (Keep roughly max_history * 2 items, as each turn is 2 messages)
-            if len(self.history) > self.max_history * 2:
-                self.history = self.history[-(self.max_history * 2):]
+            if update_history:
+                self._remember(prompt, content, image_sent=bool(image_base64))
 
             return content
         except Exception as e:
             logger.error(f"LLM request failed: {e}")
             raise
 
+    @retry(
+        retry=retry_if_exception(_is_transient),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=_trace_retry,
+    )
+    def _open_stream(self, messages: list[dict]):
+        # Only opening the stream is retried; a generator cannot be restarted mid-way.
+        with tracer.span("llm.attempt", model=settings.MODEL_NAME, stream=True):
+            return self.client.chat.completions.create(
+                model=settings.MODEL_NAME,
+                messages=messages,
+                temperature=0.0,
+                stream=True,
+            )
+
+    def ask_stream(self, prompt: str, system_prompt: str = None):
+        """
+        Streaming variant of ask() (text only).
+        Yields the response text chunk by chunk as the model produces it.
+        History is updated once the stream has completed.
+        """
+        logger.info(f"Sending streaming LLM request (Model: {settings.MODEL_NAME})")
+        # Not made current: the caller's own spans must not nest under it while we are suspended
+        span = tracer.start_span("llm", model=settings.MODEL_NAME, stream=True)
+        try:
+            with tracer.attach(span):
+                stream = self._open_stream(self._build_messages(prompt, system_prompt))
+            parts = []
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        span.event("first_token")
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            logger.error(f"LLM streaming request failed: {e}")
+            span.fail(e)
+            raise
+        finally:
+            span.end()
+
+        self._remember(prompt, "".join(parts).strip())
+
+    def record_exchange(self, prompt: str, content: str):
+        """
+        Adds an exchange answered without calling the model (e.g. from cache) to the history,
+        so later references like "close it" still resolve.
+        """
+        self._remember(prompt, content)
+
+    def warm_up(self):
+        """
+        Opens the HTTP connection ahead of the first real request (DNS, TCP and TLS setup).
+        """
+        started = time.perf_counter()
+        with tracer.span("llm.warm_up"):
+            try:
+                self.client.models.list()
+            except Exception as e:
+                # Some OpenAI-compatible backends don't implement /models; the connection is still open
+                logger.debug(f"Warm-up request failed: {e}")
+        logger.info(f"LLM connection warmed up in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    def token_footprint(self) -> dict:
+        """
+        Reports how many prompt tokens the history currently adds to every request.
+        """
+        return self.history.token_footprint()
+
     def clear_history(self):
-        self.history = []
+        self.history.clear()
+
+# Singleton instance (created on first use)
+_client = None
+_client_lock = threading.Lock()
+# Overrides the singleton for the current context, e.g. one client (and history) per server session
+_session_client = contextvars.ContextVar("session_client", default=None)
+
+@contextmanager
+def use_client(client: LLMClient):
+    """Routes every module-level call (ask_llm, get_history, ...) in this context to `client`."""
+    token = _session_client.set(client)
+    try:
+        yield client
+    finally:
+        _session_client.reset(token)
+
+def get_client() -> LLMClient:
+    global _client
+    session = _session_client.get()
+    if session is not None:
+        return session
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                with startup_profiler.phase("LLMClient init"):
+                    _client = LLMClient()
+    return _client
+
+def ask_llm(prompt: str, system_prompt: str = None, image_base64: str = None, update_history: bool = True) -> str:
+    return get_client().ask(prompt, system_prompt, image_base64, update_history=update_history)
+
+def ask_llm_cascade(prompt: str, system_prompt: str, validate, race: bool = False, update_history: bool = True):
+    return get_client().ask_cascade(prompt, system_prompt, validate, race, update_history)
+
+def ask_llm_stream(prompt: str, system_prompt: str = None):
+    return get_client().ask_stream(prompt, system_prompt)
+
+def record_exchange(prompt: str, content: str):
+    get_client().record_exchange(prompt, content)
+
+def get_history() -> list[dict]:
+    client = _session_client.get() or _client
+    return client.history.as_messages() if client is not None else []
+
+def get_token_footprint() -> dict:
+    return get_client().token_footprint()
 
-# Singleton instance
-_client = LLMClient()
+def get_cascade_stats() -> dict:
+    from ai_assistant.llm.cascade import cascade_stats
+    return cascade_stats.summary()
 
-def ask_llm(prompt: str, system_prompt: str = None, image_base64: str = None) -> str:
-    return _client.ask(prompt, system_prompt, image_base64)
+def get_transport_metrics() -> dict:
+    from ai_assistant.llm.transport import get_transport_metrics
+    return get_transport_metrics()
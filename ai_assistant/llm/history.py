@@ -0,0 +1,154 @@
+import threading
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count of a string: exact with tiktoken if installed, otherwise ~4 characters per token.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+class ConversationHistory:
+    """
+    Conversation history bounded by a token budget instead of a message count.
+    When the budget is exceeded, the oldest turns are folded into a rolling summary.
+    Summarization runs on a background thread so it never delays a request; until it
+    completes the turns stay in place, unless the history grows past the hard limit
+    (2x budget), in which case the oldest turns are dropped immediately.
+    """
+    def __init__(self, budget_tokens: int = 2000, keep_recent: int = 4, summarizer=None):
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent        # Messages never folded into the summary
+        self.summarizer = summarizer          # callable(previous_summary, messages) -> str
+        self.summary = None
+        self._messages = []                   # [(message, tokens)]
+        self._summary_tokens = 0
+        self._lock = threading.Lock()
+        self._compacting = False
+        self._generation = 0                  # Bumped by clear() to discard stale summaries
+
+    # --- Reading ---
+
+    def as_messages(self) -> list[dict]:
+        """Messages to prepend to a request: the rolling summary, then the recent turns."""
+        with self._lock:
+            msgs = []
+            if self.summary:
+                msgs.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+            msgs.extend(message for message, _ in self._messages)
+            return msgs
+
+    def _total_tokens(self) -> int:
+        return self._summary_tokens + sum(tokens for _, tokens in self._messages)
+
+    def token_footprint(self) -> dict:
+        """Current prompt cost of the history, in tokens."""
+        with self._lock:
+            message_tokens = sum(tokens for _, tokens in self._messages)
+            return {
+                "messages": len(self._messages),
+                "message_tokens": message_tokens,
+                "summary_tokens": self._summary_tokens,
+                "total_tokens": message_tokens + self._summary_tokens,
+                "budget_tokens": self.budget_tokens,
+                "compacting": self._compacting,
+            }
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    # --- Writing ---
+
+    def append(self, role: str, content: str):
+        tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._messages.append(({"role": role, "content": content}, tokens))
+            self._enforce_budget()
+
+    def clear(self):
+        with self._lock:
+            self._messages = []
+            self.summary = None
+            self._summary_tokens = 0
+            self._generation += 1
+            self._compacting = False
+
+    # --- Compaction ---
+
+    def _foldable_count(self, target: int) -> int:
+        """How many of the oldest messages must go for the history to fit in target tokens."""
+        total = self._total_tokens()
+        count = 0
+        limit = max(0, len(self._messages) - self.keep_recent)
+        while count < limit and total > target:
+            total -= self._messages[count][1]
+            count += 1
+        # Fold whole exchanges (user + assistant) where possible
+        if count % 2 and count < limit:
+            count += 1
+        return count
+
+    def _enforce_budget(self):
+        # Caller holds the lock
+        if self._total_tokens() <= self.budget_tokens:
+            return
+
+        if self._total_tokens() > 2 * self.budget_tokens:
+            # Summarization can't keep up: drop the oldest turns right away
+            drop = self._foldable_count(self.budget_tokens)
+            if drop:
+                logger.warning(f"History over hard limit; dropping {drop} oldest messages.")
+                del self._messages[:drop]
+                # A running summarization refers to messages that are gone now
+                self._generation += 1
+                self._compacting = False
+
+        if self._compacting or self.summarizer is None:
+            if self.summarizer is None:
+                del self._messages[:self._foldable_count(self.budget_tokens)]
+            return
+
+        # Fold enough turns to get comfortably below the budget
+        count = self._foldable_count(int(self.budget_tokens * 0.75))
+        if count == 0:
+            return
+        folded = [message for message, _ in self._messages[:count]]
+        self._compacting = True
+        threading.Thread(
+            target=self._compact, args=(self.summary, folded, count, self._generation),
+            name="history-summarizer", daemon=True
+        ).start()
+
+    def _compact(self, previous_summary, folded: list[dict], count: int, generation: int):
+        try:
+            summary = self.summarizer(previous_summary, folded)
+        except Exception as e:
+            logger.error(f"History summarization failed: {e}")
+            summary = None
+
+        with self._lock:
+            if generation != self._generation:
+                # History was cleared or truncated meanwhile; this summary is stale
+                return
+            self._compacting = False
+            if summary:
+                self.summary = summary.strip()
+                self._summary_tokens = estimate_tokens(self.summary) + MESSAGE_OVERHEAD_TOKENS
+            # The folded messages are still the oldest ones: appends only happen at the end
+            del self._messages[:count]
+            self._enforce_budget()
@@ -0,0 +1,182 @@
+import time
+import threading
+import httpx
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer, LatencyHistogram
+
+logger = setup_logger(__name__)
+
+_TIMING = "omnios.timing"   # Request extension carrying the per-request timing state
+
+class TransportMetrics:
+    """
+    Per-request HTTP metrics of the LLM transport: how often a pooled connection was
+    reused versus newly opened (DNS + TCP + TLS), the connection setup time, and the
+    time to first byte (request sent -> response headers received).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.http_versions = {}
+        self.ttfb = LatencyHistogram()
+        self.connect = LatencyHistogram()
+
+    def record(self, ttfb_ms: float, new_connection: bool, connect_ms: float, http_version: str):
+        with self._lock:
+            self.requests += 1
+            if new_connection:
+                self.new_connections += 1
+                self.connect.record(connect_ms)
+            else:
+                self.reused_connections += 1
+            self.http_versions[http_version] = self.http_versions.get(http_version, 0) + 1
+            self.ttfb.record(ttfb_ms)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+                "reuse_ratio": round(self.reused_connections / self.requests, 3) if self.requests else 0.0,
+                "http_versions": dict(self.http_versions),
+                "ttfb": self.ttfb.summary(),
+                "connect": self.connect.summary(),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+def _on_request(request):
+    state = {"sent": time.perf_counter(), "new": False, "connect_started": None, "connect_ms": 0.0}
+
+    def trace(event: str, info: dict):
+        # httpcore reports connection setup only for connections it has to open
+        if event == "connection.connect_tcp.started":
+            state["new"] = True
+            state["connect_started"] = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete") and state["connect_started"]:
+            state["connect_ms"] = (time.perf_counter() - state["connect_started"]) * 1000
+        elif event.endswith("send_request_headers.started"):
+            # Time to first byte is measured from the moment the request goes out on the wire
+            state["sent"] = time.perf_counter()
+
+    request.extensions["trace"] = trace
+    request.extensions[_TIMING] = state
+
+def _on_response(response):
+    state = response.request.extensions.get(_TIMING)
+    if state is None:
+        return
+    ttfb_ms = (time.perf_counter() - state["sent"]) * 1000
+    http_version = response.extensions.get("http_version", b"HTTP/1.1").decode("ascii", "replace")
+    transport_metrics.record(ttfb_ms, state["new"], state["connect_ms"], http_version)
+    # Hooks run on the calling thread, so this lands on the current llm.attempt span
+    tracer.annotate(
+        ttfb_ms=round(ttfb_ms, 3),
+        connection="new" if state["new"] else "reused",
+        connect_ms=round(state["connect_ms"], 3),
+        http_version=http_version,
+    )
+    tracer.record("llm.ttfb", ttfb_ms)
+    if state["new"]:
+        tracer.record("llm.connect", state["connect_ms"])
+
+def _http2_available() -> bool:
+    if not settings.LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx needs it for HTTP/2)
+        return True
+    except ImportError:
+        logger.debug("HTTP/2 disabled: the h2 package is not installed.")
+        return False
+
+def build_timeout():
+    """Per-request timeouts: connect (and waiting for a pooled connection) vs. read/write."""
+    return httpx.Timeout(
+        connect=settings.LLM_CONNECT_TIMEOUT,
+        read=settings.LLM_READ_TIMEOUT,
+        write=settings.LLM_READ_TIMEOUT,
+        pool=settings.LLM_CONNECT_TIMEOUT,
+    )
+
+class _ReusableEventStream(httpx.SyncByteStream):
+    """
+    Server-sent event body that, when closed right after the "data: [DONE]" event, first reads
+    the rest of the body (just the end of the chunked encoding) so the HTTP/1.1 connection
+    goes back to the pool. The SDK stops reading at [DONE], and httpcore drops connections
+    whose body wasn't read to the end. Streams abandoned midway are still closed right away.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._iterator = None
+        self._done = False
+
+    def __iter__(self):
+        self._iterator = iter(self._stream)
+        return self
+
+    def __next__(self):
+        chunk = next(self._iterator)
+        self._done = chunk.rstrip().endswith(b"[DONE]")
+        return chunk
+
+    def close(self):
+        if self._done and self._iterator is not None:
+            try:
+                for _ in self._iterator:
+                    pass
+            except httpx.HTTPError:
+                pass
+        self._stream.close()
+
+class _PooledTransport(httpx.HTTPTransport):
+    def handle_request(self, request):
+        response = super().handle_request(request)
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            response.stream = _ReusableEventStream(response.stream)
+        return response
+
+def build_http_client():
+    """
+    Pooled keep-alive HTTP client for the OpenAI SDK. HTTP/2 is negotiated (ALPN) when
+    enabled, the h2 package is installed and the backend supports it; otherwise HTTP/1.1.
+    """
+    transport = _PooledTransport(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return httpx.Client(
+        transport=transport,
+        timeout=build_timeout(),
+        follow_redirects=True,
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+# Global instances: one connection pool shared by every LLMClient (created on first use)
+transport_metrics = TransportMetrics()
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = build_http_client()
+    return _http_client
+
+def get_transport_metrics() -> dict:
+    return transport_metrics.summary()
@@ -1,6 +1,8 @@
+import re
 import sys
 import argparse
 import time
+import importlib.util
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
@@ -10,31 +12,21 @@ from rich.text import Text
 from rich import box
 
 from ai_assistant.config import settings
-from ai_assistant.commands.interpreter import interpret_command
+from ai_assistant.commands.interpreter import interpret_command, interpret_command_stream
 from ai_assistant.executor.actions import execute_action
+from ai_assistant.executor.scheduler import PlanScheduler
 from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.permissions import get_permission_manager, ALLOWED, DENIED, UNKNOWN
+from ai_assistant.utils.startup import startup_profiler, WarmUp
+from ai_assistant.utils.tracing import tracer
 
-# Optional Voice Imports
-try:
-    from ai_assistant.voice.listener import listen
-    from ai_assistant.voice.speaker import speak
-    VOICE_AVAILABLE = True
-except ImportError:
-    VOICE_AVAILABLE = False
-
-# Optional Vision/Web Imports
-try:
-    import pyautogui
-    from PIL import Image
-    VISION_AVAILABLE = True
-except ImportError:
-    VISION_AVAILABLE = False
-
-try:
-    from duckduckgo_search import DDGS
-    WEB_AVAILABLE = True
-except ImportError:
-    WEB_AVAILABLE = False
+# Optional capabilities are only probed here (cheap); they are imported on first use.
+def _available(*modules: str) -> bool:
+    return all(importlib.util.find_spec(m) is not None for m in modules)
+
+VOICE_AVAILABLE = _available("speech_recognition", "pyttsx3")
+VISION_AVAILABLE = _available("pyautogui", "PIL")
+WEB_AVAILABLE = _available("ddgs")
 
 
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
@@ -42,44 +34,81 @@ from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeEl
 logger = setup_logger(__name__)
 console = Console()
 
-def startup_sequence():
+def start_warm_up(voice_mode: bool) -> WarmUp:
+    """
+    Preloads capabilities on background threads while the banner renders.
+    """
+    warm_up = WarmUp()
+    if not settings.WARMUP_ENABLED:
+        return warm_up
+
+    def core():
+        from ai_assistant.llm.client import get_client
+        client = get_client()
+        if settings.WARMUP_CONNECTION:
+            client.warm_up()
+
+    def classifier():
+        from ai_assistant.commands.interpreter import SYSTEM_PROMPT
+        from ai_assistant.commands.classifier import get_classifier
+        get_classifier(SYSTEM_PROMPT)
+
+    def workspace():
+        from ai_assistant.executor.workspace import get_workspace_index
+        get_workspace_index()
+
+    warm_up.start("Core Intelligence", core)
+    warm_up.start("Intent Classifier", classifier)
+    warm_up.start("Workspace Index", workspace)
+    if voice_mode:
+        def voice():
+            from ai_assistant.voice.listener import get_listener
+            # Opens the microphone now, so ambient calibration is done before the first turn
+            get_listener().start()
+            # The speaker creates its TTS engine on its own worker thread, then renders the
+            # recurring phrases to audio while idle so they play without synthesis
+            from ai_assistant.commands.interpreter import ACTION_SCHEMA
+            from ai_assistant.voice.phrases import recurring_phrases
+            from ai_assistant.voice.speaker import get_speaker
+            get_speaker().prerender(recurring_phrases(ACTION_SCHEMA))
+        warm_up.start("Voice System", voice)
+    if VISION_AVAILABLE:
+        warm_up.start("Omni-Vision", lambda: (importlib.import_module("pyautogui"), importlib.import_module("PIL.Image")))
+    if WEB_AVAILABLE:
+        warm_up.start("Web Agent", lambda: importlib.import_module("ddgs"))
+    return warm_up
+
+def startup_sequence(warm_up: WarmUp):
     """
-    Simulates a high-tech boot-up sequence.
+    Boot-up sequence: one progress row per capability being warmed up.
+    Waits at most settings.WARMUP_WAIT seconds; anything slower keeps loading in the background.
     """
     console.clear()
-    
-    steps = [
-        ("Initializing Core Kernel...", 0.5),
-        ("Loading Neural Weights...", 0.8),
-        ("Calibrating Omni-Vision Sensors...", 0.6),
-        ("Establishing Secure Uplink...", 0.7),
-        ("Mounting Workspace File System...", 0.4),
-    ]
+    if not warm_up.tasks:
+        return
 
     with Progress(
         SpinnerColumn(spinner_name="dots2"),
         TextColumn("[bold cyan]{task.description}"),
         BarColumn(bar_width=40, style="blue", complete_style="bold cyan"),
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
         TimeElapsedColumn(),
         console=console,
         transient=True
     ) as progress:
         
-        # Add tasks
-        tasks = [progress.add_task(step[0], total=100) for step in steps]
+        # Add tasks (indeterminate until the warm-up thread finishes)
+        tasks = {name: progress.add_task(f"Loading {name}...", total=None) for name in warm_up.tasks}
         
-        # Scramble progress to look "techy"
-        import random
-        while not progress.finished:
-            for task_id in tasks:
-                if not progress.tasks[task_id].finished:
-                    advance = random.uniform(1, 10)
-                    progress.advance(task_id, advance)
-                    time.sleep(0.02)
+        deadline = time.monotonic() + settings.WARMUP_WAIT
+        while time.monotonic() < deadline:
+            for name, task_id in tasks.items():
+                if warm_up.done(name) and not progress.tasks[task_id].finished:
+                    progress.update(task_id, total=1, completed=1)
+            if progress.finished:
+                break
+            time.sleep(0.02)
     
     console.print("[bold green]SYSTEM READY.[/bold green]", justify="center")
-    time.sleep(0.5)
 
 
 def print_banner():
@@ -124,18 +153,230 @@ def print_banner():
     console.print(layout)
     console.print("\n")
 
+def render_proposed_action(command: dict, index: int, commands) -> None:
+    """
+    Prints the table describing a command awaiting confirmation.
+    """
+    params = command.get("params", {})
+    # The total is unknown while commands are still streaming in
+    progress = f"{index+1}/{len(commands)}" if isinstance(commands, list) else f"{index+1}"
+    table = Table(title=f"Proposed Action ({progress})", box=box.ROUNDED)
+    table.add_column("Property", style="cyan", no_wrap=True)
+    table.add_column("Value", style="magenta")
+    table.add_row("Action", command.get("action"))
+    table.add_row("Confidence", f"{command.get('confidence', 0.0):.2f}")
+    for k, v in params.items():
+        table.add_row(f"Param: {k}", str(v))
+    
+    console.print(table)
+
+_YES = {"y", "yes", "yeah", "yep", "sure", "ok", "okay", "proceed"}
+_NO = {"n", "no", "nope", "not", "don't", "dont", "never", "cancel", "stop"}
+
+def parse_confirmation(answer: str) -> str:
+    """
+    'y', 'n' or 'a' for a typed or spoken answer, by whole words. Any negation rejects
+    ("no, not always"); "always" only counts as an affirmative answer; anything else is a no.
+    """
+    words = set(re.findall(r"[a-z']+", (answer or "").lower()))
+    if not words or words & _NO:
+        return "n"
+    if "always" in words or words == {"a"}:
+        return "a"
+    return "y" if words & _YES else "n"
+
+def ask_confirmation(question: str, voice_mode: bool, cache: bool = True) -> str:
+    """
+    Asks the user to confirm by voice or keyboard. Returns 'y', 'n' or 'a' (yes, and always
+    allow this from now on).
+    """
+    if voice_mode:
+        from ai_assistant.voice.listener import listen
+        from ai_assistant.voice.speaker import speak
+        # The question must be fully spoken before we listen for the answer
+        speak(question, wait=True, cache=cache)
+        with console.status("[bold yellow]Waiting for confirmation...[/bold yellow]", spinner="clock"):
+            choice = parse_confirmation(listen())
+        if choice == "n":
+            console.print("[bold red](Voice confirmation failed or rejected.)[/bold red]")
+        return choice
+    return parse_confirmation(console.input("    [bold yellow]EXECUTE?[/bold yellow] (y/n, a = always) > "))
+
+def plan_pending(commands: list, permissions) -> list:
+    """
+    The commands of a plan that need confirmation, when they can be confirmed once, together
+    (at least two, all within the plan risk tier); otherwise an empty list.
+    """
+    pending = [c for c in commands if c.get("action") != "respond" and permissions.evaluate(c)[0] == UNKNOWN]
+    if len(pending) < 2 or not permissions.plan_approvable(pending):
+        return []
+    return pending
+
+def plan_question(pending: list) -> str:
+    actions = ", ".join(dict.fromkeys(c.get("action") for c in pending))
+    return f"I am about to run {len(pending)} actions: {actions}. Should I proceed?"
+
+def confirm_plan(commands: list, permissions, voice_mode: bool):
+    """
+    Asks once for the whole plan when every command that would need confirmation is within
+    the plan risk tier. Returns None if the plan doesn't qualify (each command is asked
+    about on its own), True if it was approved and False if it was rejected.
+    """
+    pending = plan_pending(commands, permissions)
+    if not pending:
+        return None
+    for i, command in enumerate(commands):
+        if command.get("action") != "respond":
+            render_proposed_action(command, i, commands)
+    with tracer.span("confirm", action="plan", commands=len(pending)):
+        choice = ask_confirmation(plan_question(pending), voice_mode, cache=False)
+    if choice == "a":
+        for command in pending:
+            permissions.grant_command(command)
+    if choice not in ("y", "a"):
+        console.print("[bold red]Plan cancelled.[/bold red]")
+        if voice_mode:
+            from ai_assistant.voice.speaker import speak
+            speak("Plan cancelled.", cache=True)
+        return False
+    return True
+
+def stream_with_status(commands, message: str):
+    """
+    Iterates a command stream, showing a spinner only while waiting for the next command.
+    """
+    iterator = iter(commands)
+    while True:
+        with console.status(message, spinner="bouncingBar"):
+            command = next(iterator, None)
+        if command is None:
+            return
+        yield command
+
+def report_trace():
+    """Stage latency histograms plus LLM connection reuse, speculation, cascade and phrase cache outcomes (--trace)."""
+    tracer.report(console)
+    if "ai_assistant.llm.transport" in sys.modules:
+        from ai_assistant.llm.transport import get_transport_metrics
+        m = get_transport_metrics()
+        if m["requests"]:
+            versions = ", ".join(f"{version}: {count}" for version, count in m["http_versions"].items())
+            console.print(f"[dim]LLM HTTP: {m['requests']} requests, {m['new_connections']} new connections, "
+                          f"{m['reused_connections']} reused ({versions})[/dim]")
+    if "ai_assistant.voice.speculation" in sys.modules:
+        from ai_assistant.voice.speculation import speculation_stats
+        v = speculation_stats.summary()
+        if v["utterances"]:
+            console.print(f"[dim]Speculation: {v['hits']} hits, {v['misses']} misses (hit rate {v['hit_rate']:.0%}), "
+                          f"{v['superseded']} superseded, {v['saved_ms']:.0f} ms saved[/dim]")
+    if "ai_assistant.llm.cascade" in sys.modules:
+        from ai_assistant.llm.cascade import cascade_stats
+        c = cascade_stats.summary()
+        if c["requests"]:
+            console.print(f"[dim]Fast model: {c['answered_by_fast']}/{c['requests']} answered, escalation rate "
+                          f"{c['escalation_rate']:.0%} {c['escalation_reasons']}, ~{c['latency_saved_ms']:.0f} ms saved, "
+                          f"{c['latency_added_ms']:.0f} ms added by escalations[/dim]")
+    if "ai_assistant.voice.speaker" in sys.modules:
+        from ai_assistant.voice.speaker import get_phrase_cache_stats
+        p = get_phrase_cache_stats()
+        if p and p["hits"] + p["misses"]:
+            console.print(f"[dim]Phrase audio cache: {p['hits']} hits, {p['misses']} misses, {p['renders']} rendered[/dim]")
+    tracer.disable()
+
 def main():
     parser = argparse.ArgumentParser(description=settings.APP_NAME)
     parser.add_argument("--voice", action="store_true", help="Enable voice interaction mode")
+    parser.add_argument("--stream", action="store_true", help="Stream LLM output and present commands as they arrive")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Run the REPL as an asyncio pipeline so listening, executing and speaking overlap")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print a per-module import and init time breakdown before the first prompt")
+    parser.add_argument("--trace", nargs="?", const="trace.jsonl", metavar="PATH",
+                        help="Time every pipeline stage, print latency histograms on exit and write spans to PATH (JSONL)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Headless: run one instruction per line of FILE (- for stdin) and write JSONL results")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the local HTTP/WebSocket API server: concurrent sessions, each with its own history")
+    parser.add_argument("--host", help=f"--serve: address to bind (default {settings.SERVER_HOST})")
+    parser.add_argument("--port", type=int, help=f"--serve: port to listen on (default {settings.SERVER_PORT})")
+    parser.add_argument("--allow", metavar="ACTIONS",
+                        help="--batch/--serve: comma-separated actions (wildcards allowed) executed without confirmation; "
+                             f"default: {settings.BATCH_ALLOWED_ACTIONS}")
+    parser.add_argument("--workers", type=int, help=f"--batch: lines processed concurrently (default {settings.BATCH_WORKERS})")
+    parser.add_argument("--output", default="-", metavar="PATH", help="--batch: where to write the results (default stdout)")
     args = parser.parse_args()
 
+    if args.trace:
+        tracer.enable(args.trace)
+
+    if args.batch:
+        # stdout carries the results; no UI, prompts or warm-up screen
+        from ai_assistant.utils.logger import log_to_stderr
+        log_to_stderr()
+        from ai_assistant import batch
+        code = batch.main(args.batch, allow=args.allow, workers=args.workers, output_path=args.output)
+        tracer.disable()
+        sys.exit(code)
+
+    if args.serve:
+        if not _available("aiohttp"):
+            console.print("[bold red]--serve needs aiohttp (pip install aiohttp).[/bold red]")
+            sys.exit(1)
+        from ai_assistant import server
+        try:
+            server.main(host=args.host, port=args.port, allow=args.allow)
+        finally:
+            if args.trace:
+                report_trace()
+        return
+
+    if args.profile_startup:
+        # Imports are only captured when launched through run_assistant.py, which enables this earlier
+        startup_profiler.enable()
+
     voice_mode = args.voice and VOICE_AVAILABLE
+    stream_mode = args.stream or settings.STREAM_RESPONSES
+
+    if voice_mode:
+        from ai_assistant.voice.listener import listen
+        from ai_assistant.voice.speaker import speak, Narrator
+
+    # Interprets stable interim transcripts while the final one is still being recognized
+    speculator = None
+    if voice_mode and settings.VOICE_SPECULATION:
+        from ai_assistant.voice.speculation import Speculator
+        speculator = Speculator(stable_partials=settings.VOICE_STABLE_PARTIALS)
     
-    startup_sequence()
+    warm_up = start_warm_up(voice_mode)
+    startup_sequence(warm_up)
     print_banner()
 
+    if settings.SCREEN_WATCHER_ENABLED and VISION_AVAILABLE:
+        from ai_assistant.vision.watcher import start_screen_watcher
+        start_screen_watcher()
+
+    if args.profile_startup:
+        startup_profiler.mark("time to first prompt")
+        startup_profiler.report(console)
+
+    if args.async_mode:
+        import asyncio
+        from ai_assistant.pipeline import AsyncAssistant
+        try:
+            asyncio.run(AsyncAssistant(voice_mode=voice_mode, stream_mode=stream_mode).run())
+        except KeyboardInterrupt:
+            console.print("\n[bold red]Force Exit.[/bold red]")
+        if args.trace:
+            report_trace()
+        return
+
     if voice_mode:
-        speak(f"Welcome back. Systems are online.")
+        speak(f"Welcome back. Systems are online.", cache=True)
+
+    # Confirmed commands start right away; independent ones run concurrently
+    scheduler = PlanScheduler() if settings.PARALLEL_EXECUTION else None
+    # Pre-approved commands (rules, low risk) skip the confirmation round-trip
+    permissions = get_permission_manager() if settings.PERMISSIONS_ENABLED else None
 
     # 2. REPL Loop
     while True:
@@ -143,12 +384,14 @@ def main():
             # Input
             if voice_mode:
                 with console.status("[bold green]Listening...[/bold green]", spinner="dots"):
-                    user_input = listen()
+                    user_input = listen(speculator.on_partial if speculator else None)
                 if not user_input:
+                    if speculator:
+                        speculator.reset()
                     continue
                 console.print(f"[bold cyan]YOU >[/bold cyan] {user_input}")
                 if user_input.lower() in ["quit", "stop", "exit"]:
-                    speak("Goodbye.")
+                    speak("Goodbye.", wait=True, cache=True)
                     break
             else:
                 user_input = console.input("\n[bold cyan]YOU >[/bold cyan] ").strip()
@@ -158,75 +401,121 @@ def main():
                 console.print("[bold red]System Shutdown Initiated...[/bold red]")
                 break
 
-            # A. Interpret
-            with console.status("[bold blue]Analyzing Intent...[/bold blue]", spinner="bouncingBar"):
-                # Simulate a little thinking time for effect if too fast
-                # time.sleep(0.5) 
-                commands = interpret_command(user_input)
-            
-            # Helper to handle list or single
-            if isinstance(commands, dict):
-                commands = [commands]
-
-            for i, command in enumerate(commands):
-                action = command.get("action")
-                params = command.get("params", {})
-                confidence = command.get("confidence", 0.0)
-
-                # B. Safety Checks
-                if action == "respond":
-                    message = params.get('message', '')
-                    console.print(Panel(message, title="AI Response", border_style="green", expand=False))
-                    if voice_mode:
-                        speak(message)
-                    continue
+            with tracer.span("turn", voice=voice_mode, stream=stream_mode):
+                # Speaks answers while the model is still generating them (stream mode)
+                narrator = Narrator() if voice_mode and stream_mode else None
 
-                # Create a status table
-                table = Table(title=f"Proposed Action ({i+1}/{len(commands)})", box=box.ROUNDED)
-                table.add_column("Property", style="cyan", no_wrap=True)
-                table.add_column("Value", style="magenta")
-                table.add_row("Action", action)
-                table.add_row("Confidence", f"{confidence:.2f}")
-                for k, v in params.items():
-                    table.add_row(f"Param: {k}", str(v))
+                # A. Interpret (already done if the speculation on the interim transcript was right)
+                speculated = speculator.resolve(user_input) if speculator else None
+                if speculated is not None:
+                    commands = speculated
+                elif stream_mode:
+                    # Commands are presented one by one while the model is still generating the rest
+                    commands = stream_with_status(
+                        interpret_command_stream(user_input, on_message=narrator.feed if narrator else None),
+                        "[bold blue]Analyzing Intent...[/bold blue]",
+                    )
+                else:
+                    with console.status("[bold blue]Analyzing Intent...[/bold blue]", spinner="bouncingBar"):
+                        # Simulate a little thinking time for effect if too fast
+                        # time.sleep(0.5) 
+                        commands = interpret_command(user_input)
                 
-                console.print(table)
+                # Helper to handle list or single
+                if isinstance(commands, dict):
+                    commands = [commands]
 
-                # C. Explicit User Permission
-                if voice_mode:
-                    speak(f"I am about to {action}. Should I proceed?")
-                    with console.status("[bold yellow]Waiting for confirmation...[/bold yellow]", spinner="clock"):
-                        confirmation = listen()
-                    
-                    if confirmation and "yes" in confirmation.lower():
-                        choice = 'y'
-                    else:
-                        choice = 'n'
-                        console.print("[bold red](Voice confirmation failed or rejected.)[/bold red]")
-                else:
-                    choice = console.input("    [bold yellow]EXECUTE?[/bold yellow] (y/n) > ").lower()
+                # A whole plan of low-risk commands is confirmed once (the total is unknown while streaming)
+                # None: not asked as a whole, each command is confirmed on its own
+                plan = confirm_plan(commands, permissions, voice_mode) if isinstance(commands, list) and permissions else None
 
-                if choice != 'y':
-                    console.print("[bold red]Action cancelled.[/bold red]")
-                    if voice_mode: speak("Action cancelled.")
-                    continue
+                scheduled = []
+                for i, command in enumerate(commands):
+                    action = command.get("action")
+                    params = command.get("params", {})
 
-                # D. Execute
-                with console.status("[bold green]Executing...[/bold green]", spinner="dots12"):
-                    result = execute_action(command)
-                
-                console.print(f"[bold green]AI >[/bold green] {result}\n")
-                if voice_mode:
-                    speak("Done.")
+                    # B. Safety Checks
+                    if action == "respond":
+                        message = params.get('message', '')
+                        console.print(Panel(message, title="AI Response", border_style="green", expand=False))
+                        if voice_mode and not (narrator and narrator.claim(message)):
+                            speak(message)
+                        continue
+
+                    # C. Explicit User Permission, unless a rule or the risk tier decides
+                    decision, reason = permissions.evaluate(command) if permissions else (UNKNOWN, None)
+                    if plan is None:
+                        # (A plan asked about as a whole has already been shown)
+                        render_proposed_action(command, i, commands)
+                    if decision == DENIED:
+                        console.print(f"[bold red]Action blocked ({reason}).[/bold red]")
+                        if voice_mode: speak("Action cancelled.", cache=True)
+                        continue
+                    if decision == ALLOWED:
+                        console.print(f"    [dim]Pre-approved ({reason}).[/dim]")
+                    elif plan is False:
+                        # Rejected together with the rest of the plan
+                        console.print(f"    [dim]Skipped {action} (plan cancelled).[/dim]")
+                        continue
+                    elif plan is None:
+                        # Time spent waiting for the user, to tell it apart from processing time
+                        with tracer.span("confirm", action=action):
+                            choice = ask_confirmation(f"I am about to {action}. Should I proceed?", voice_mode)
+                        if choice == "a" and permissions:
+                            permissions.grant_command(command)
+                        elif choice != "y":
+                            console.print("[bold red]Action cancelled.[/bold red]")
+                            if voice_mode: speak("Action cancelled.", cache=True)
+                            continue
+
+                    # D. Execute
+                    if scheduler:
+                        # Keeps running while the next command is being confirmed
+                        scheduled.append(scheduler.submit(command))
+                        continue
+
+                    with console.status("[bold green]Executing...[/bold green]", spinner="dots12"):
+                        result = execute_action(command)
+                    
+                    console.print(f"[bold green]AI >[/bold green] {result}\n")
+                    if voice_mode:
+                        speak("Done.", cache=True)
+
+                # E. Report results of the concurrently executed plan, in plan order
+                if scheduled:
+                    with console.status("[bold green]Executing...[/bold green]", spinner="dots12"):
+                        results = [future.result() for future in scheduled]
+                    for result in results:
+                        console.print(f"[bold green]AI >[/bold green] {result}\n")
+                    if voice_mode:
+                        speak("Done.", cache=True)
 
         except KeyboardInterrupt:
             console.print("\n[bold red]Force Exit.[/bold red]")
             break
+        except EOFError:
+            # Ctrl-D or the end of piped input
+            console.print("[bold red]System Shutdown Initiated...[/bold red]")
+            break
         except Exception as e:
             logger.error(f"System Error: {e}")
             message = "I encountered a system error."
             console.print(f"[bold red]{message}[/bold red]")
-            if voice_mode: speak(message)
+            if voice_mode: speak(message, cache=True)
+
+    if scheduler:
+        scheduler.shutdown(wait=False)
+    if speculator:
+        speculator.shutdown()
+    if voice_mode:
+        from ai_assistant.voice.listener import close
+        from ai_assistant.voice.speaker import shutdown
+        close()
+        # Lets the last queued phrases finish
+        shutdown()
+
+    if args.trace:
+        report_trace()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,286 @@
+import asyncio
+import threading
+import contextvars
+from rich.panel import Panel
+
+from ai_assistant.commands.interpreter import interpret_command, interpret_command_stream
+from ai_assistant.config import settings
+from ai_assistant.executor.scheduler import PlanScheduler
+from ai_assistant.main import console, render_proposed_action, plan_pending, plan_question, parse_confirmation
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.permissions import get_permission_manager, ALLOWED, DENIED, UNKNOWN
+from ai_assistant.utils.tracing import tracer
+
+logger = setup_logger(__name__)
+
+def _run_in_daemon(loop: asyncio.AbstractEventLoop, func, *args) -> asyncio.Future:
+    """
+    Runs a blocking call (console input, microphone) on a daemon thread.
+    Unlike the default executor, a pending read never blocks interpreter shutdown.
+    """
+    future = loop.create_future()
+    # Carry the caller's context (e.g. the current trace span) over to the thread
+    context = contextvars.copy_context()
+
+    def worker():
+        try:
+            result = context.run(func, *args)
+        except BaseException as e:
+            # Bound now: `e` is unset when the except block ends, possibly before the callback runs
+            loop.call_soon_threadsafe(lambda e=e: future.done() or future.set_exception(e))
+        else:
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+async def _replay(commands: list):
+    for command in commands:
+        yield command
+
+class AsyncAssistant:
+    """
+    asyncio version of the REPL in main.main().
+    Confirmation stays in the foreground exactly as in the sequential loop, but approved
+    commands execute in the background (respecting their ordering constraints, see
+    executor.scheduler) and speech is queued on its own thread,
+    so the next utterance can be captured while the previous one is still being handled.
+    """
+    def __init__(self, voice_mode: bool = False, stream_mode: bool = False):
+        self.voice_mode = voice_mode
+        self.stream_mode = stream_mode
+        self.loop = None
+        self._scheduler = PlanScheduler()
+        self._pending = set()
+        self._speculator = None
+        self._permissions = get_permission_manager() if settings.PERMISSIONS_ENABLED else None
+        if voice_mode and settings.VOICE_SPECULATION:
+            from ai_assistant.voice.speculation import Speculator
+            self._speculator = Speculator(stable_partials=settings.VOICE_STABLE_PARTIALS)
+
+    # --- Blocking subsystems behind executors ---
+
+    async def say(self, text: str, wait: bool = False, cache: bool = False):
+        if not self.voice_mode:
+            return
+        from ai_assistant.voice.speaker import speak
+        # Queued on the speaker's own thread; returns at once unless asked to wait
+        utterance = speak(text, cache=cache)
+        if wait:
+            await self.loop.run_in_executor(None, utterance.wait)
+
+    async def listen(self, status: str = "[bold green]Listening...[/bold green]", spinner: str = "dots", on_partial=None):
+        from ai_assistant.voice.listener import listen
+        with console.status(status, spinner=spinner):
+            return await _run_in_daemon(self.loop, listen, on_partial)
+
+    async def read_input(self):
+        if self.voice_mode:
+            if self._speculator is None:
+                return await self.listen()
+            text = await self.listen(on_partial=self._speculator.on_partial)
+            if not text:
+                self._speculator.reset()
+            return text
+        text = await _run_in_daemon(self.loop, console.input, "\n[bold cyan]YOU >[/bold cyan] ")
+        return text.strip()
+
+    async def interpret(self, user_input: str, on_message=None):
+        """
+        Async iterator over the commands for user_input.
+        on_message receives "respond" messages as they stream in (stream mode only).
+        """
+        if self._speculator is not None:
+            # Already interpreted if the speculation on the interim transcript was right
+            commands = await self.loop.run_in_executor(None, contextvars.copy_context().run, self._speculator.resolve, user_input)
+            if commands is not None:
+                for command in commands:
+                    yield command
+                return
+
+        if not self.stream_mode:
+            with console.status("[bold blue]Analyzing Intent...[/bold blue]", spinner="bouncingBar"):
+                commands = await self.loop.run_in_executor(None, contextvars.copy_context().run, interpret_command, user_input)
+            if isinstance(commands, dict):
+                commands = [commands]
+            for command in commands:
+                yield command
+            return
+
+        stream = interpret_command_stream(user_input, on_message=on_message)
+        while True:
+            with console.status("[bold blue]Analyzing Intent...[/bold blue]", spinner="bouncingBar"):
+                command = await self.loop.run_in_executor(None, contextvars.copy_context().run, next, stream, None)
+            if command is None:
+                return
+            yield command
+
+    # --- Confirmation & execution ---
+
+    async def confirm(self, question: str, cache: bool = True) -> str:
+        """'y', 'n' or 'a' (yes, and always allow this from now on)."""
+        if self.voice_mode:
+            # The question must be fully spoken before we listen for the answer
+            await self.say(question, wait=True, cache=cache)
+            choice = parse_confirmation(await self.listen("[bold yellow]Waiting for confirmation...[/bold yellow]", spinner="clock"))
+            if choice == "n":
+                console.print("[bold red](Voice confirmation failed or rejected.)[/bold red]")
+            return choice
+
+        return parse_confirmation(await _run_in_daemon(self.loop, console.input, "    [bold yellow]EXECUTE?[/bold yellow] (y/n, a = always) > "))
+
+    async def confirm_plan(self, commands: list):
+        """
+        Asks once for the whole plan when it qualifies (see main.confirm_plan). Returns None
+        if it doesn't, True if it was approved and False if it was rejected.
+        """
+        pending = plan_pending(commands, self._permissions)
+        if not pending:
+            return None
+        for i, command in enumerate(commands):
+            if command.get("action") != "respond":
+                render_proposed_action(command, i, commands)
+        with tracer.span("confirm", action="plan", commands=len(pending)):
+            choice = await self.confirm(plan_question(pending), cache=False)
+        if choice == "a":
+            for command in pending:
+                self._permissions.grant_command(command)
+        if choice not in ("y", "a"):
+            console.print("[bold red]Plan cancelled.[/bold red]")
+            await self.say("Plan cancelled.", cache=True)
+            return False
+        return True
+
+    def schedule(self, command: dict) -> asyncio.Task:
+        """
+        Executes a confirmed command in the background.
+        It starts as soon as the earlier commands it depends on have finished.
+        """
+        future = asyncio.wrap_future(self._scheduler.submit(command))
+
+        async def run():
+            result = await future
+            console.print(f"[bold green]AI >[/bold green] {result}\n")
+            await self.say("Done.", cache=True)
+
+        task = asyncio.create_task(run())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def drain(self):
+        """Waits for every scheduled command and queued phrase to finish."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.voice_mode:
+            from ai_assistant.voice.speaker import get_speaker
+            await self.loop.run_in_executor(None, get_speaker().wait)
+
+    async def handle_turn(self, user_input: str):
+        # Background executions and speech are traced as children of the turn, but the
+        # turn span itself ends once all of its commands have been dispatched
+        with tracer.span("turn", voice=self.voice_mode, stream=self.stream_mode, pipeline="async"):
+            await self._handle_turn(user_input)
+
+    async def _handle_turn(self, user_input: str):
+        i = 0
+        # Speaks answers while the model is still generating them (stream mode)
+        narrator = None
+        if self.voice_mode and self.stream_mode:
+            from ai_assistant.voice.speaker import Narrator
+            narrator = Narrator()
+
+        commands = self.interpret(user_input, narrator.feed if narrator else None)
+        # Without streaming the whole plan is known before anything runs, so it can be confirmed
+        # once, as in the sync REPL. While streaming the total is unknown: each command is asked
+        # about as it arrives.
+        plan = listed = None
+        if not self.stream_mode and self._permissions:
+            listed = [command async for command in commands]
+            plan = await self.confirm_plan(listed)
+            commands = _replay(listed)
+
+        async for command in commands:
+            action = command.get("action")
+            params = command.get("params", {})
+
+            if action == "respond":
+                message = params.get('message', '')
+                console.print(Panel(message, title="AI Response", border_style="green", expand=False))
+                if not (narrator and narrator.claim(message)):
+                    await self.say(message)
+                i += 1
+                continue
+
+            if plan is None:
+                render_proposed_action(command, i, listed)
+            i += 1
+
+            # Pre-approved commands (rules, low risk) skip the confirmation round-trip
+            decision, reason = self._permissions.evaluate(command) if self._permissions else (UNKNOWN, None)
+            if decision == DENIED:
+                console.print(f"[bold red]Action blocked ({reason}).[/bold red]")
+                await self.say("Action cancelled.", cache=True)
+                continue
+            if decision == ALLOWED:
+                console.print(f"    [dim]Pre-approved ({reason}).[/dim]")
+            elif plan is False:
+                # Rejected together with the rest of the plan
+                console.print(f"    [dim]Skipped {action} (plan cancelled).[/dim]")
+                continue
+            elif plan is None:
+                with tracer.span("confirm", action=action):
+                    choice = await self.confirm(f"I am about to {action}. Should I proceed?")
+                if choice == "a" and self._permissions:
+                    self._permissions.grant_command(command)
+                elif choice != "y":
+                    console.print("[bold red]Action cancelled.[/bold red]")
+                    await self.say("Action cancelled.", cache=True)
+                    continue
+
+            console.print(f"[dim]Executing {action} in the background...[/dim]")
+            self.schedule(command)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        await self.say("Welcome back. Systems are online.", cache=True)
+
+        try:
+            while True:
+                try:
+                    user_input = await self.read_input()
+                    if not user_input:
+                        continue
+
+                    if self.voice_mode:
+                        console.print(f"[bold cyan]YOU >[/bold cyan] {user_input}")
+                        if user_input.lower() in ["quit", "stop", "exit"]:
+                            await self.drain()
+                            await self.say("Goodbye.", wait=True, cache=True)
+                            break
+                    elif user_input.lower() in ["quit", "exit"]:
+                        console.print("[bold red]System Shutdown Initiated...[/bold red]")
+                        await self.drain()
+                        break
+
+                    await self.handle_turn(user_input)
+
+                except EOFError:
+                    # Ctrl-D or the end of piped input
+                    console.print("[bold red]System Shutdown Initiated...[/bold red]")
+                    await self.drain()
+                    break
+                except Exception as e:
+                    logger.error(f"System Error: {e}")
+                    message = "I encountered a system error."
+                    console.print(f"[bold red]{message}[/bold red]")
+                    await self.say(message, cache=True)
+        finally:
+            self._scheduler.shutdown(wait=False)
+            if self._speculator is not None:
+                self._speculator.shutdown()
+            if self.voice_mode:
+                from ai_assistant.voice.listener import close
+                from ai_assistant.voice.speaker import shutdown
+                close()
+                shutdown(wait=False)
@@ -0,0 +1,344 @@
+"""
+Local API server: many concurrent sessions, each with its own conversation history.
+
+    python run_assistant.py --serve --port 8765 --allow "respond,read_file,list_directory"
+
+    POST   /sessions                   -> {"session": "<id>"}
+    POST   /sessions/{id}/commands     {"input": "..."} (application/json) -> NDJSON events, streamed as they happen
+    GET    /sessions/{id}/ws           WebSocket: every text message is an instruction, events come back as JSON
+    DELETE /sessions/{id}              ends the session
+    GET    /stats
+
+Only POST /sessions creates a session; other ids get a 404. Requests carrying an Origin
+header that isn't this machine are refused, so a web page open in the browser can't
+drive the server (browsers always send Origin on cross-site requests and WebSockets).
+
+Events: "session", then "message" (pieces of a "respond" message while it is generated),
+"command" (as soon as the LLM has produced it), "result" (once executed), and "done" or
+"error". Commands of a turn run in order, under the pre-approved action policy (see batch);
+turns of one session run one at a time, sessions run concurrently. Interpretations in
+flight are bounded by SERVER_LLM_CONCURRENCY; idle sessions are evicted after
+SERVER_SESSION_TTL seconds or once there are more than SERVER_MAX_SESSIONS.
+"""
+import json
+import time
+import uuid
+import asyncio
+import importlib
+from urllib.parse import urlsplit
+from contextlib import aclosing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web, WSMsgType
+from ai_assistant.batch import ActionPolicy, run_command
+from ai_assistant.commands.interpreter import interpret_command_stream
+from ai_assistant.config import settings
+from ai_assistant.llm.client import LLMClient, use_client
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer, LatencyHistogram
+
+logger = setup_logger(__name__)
+
+SESSION_ID = r"[A-Za-z0-9_.-]{1,64}"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.client = LLMClient()
+        self.lock = asyncio.Lock()   # One turn at a time: each turn builds on the previous one's history
+        self.last_used = time.monotonic()
+        self.turns = 0
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+class SessionStore:
+    """Sessions by id, least recently used first. Only touched from the event loop."""
+    def __init__(self, max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        session = Session(uuid.uuid4().hex)
+        self._sessions[session.id] = session
+        self.created += 1
+        self.evict()
+        return session
+
+    def get(self, session_id: str):
+        """The session, marked as just used; None for an unknown or evicted id."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        self.evict()
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def evict(self):
+        """Drops sessions idle for longer than the TTL, then the least recently used beyond the limit."""
+        now = time.monotonic()
+        excess = len(self._sessions) - self.max_sessions
+        for session in list(self._sessions.values()):
+            if session.busy:
+                continue
+            if now - session.last_used > self.ttl or excess > 0:
+                del self._sessions[session.id]
+                self.evicted += 1
+                excess -= 1
+                logger.debug(f"Evicted session {session.id}")
+
+class AssistantServer:
+    def __init__(self, policy: ActionPolicy, max_sessions: int = None, ttl: float = None,
+                 llm_concurrency: int = None, workers: int = None):
+        self.policy = policy
+        self.sessions = SessionStore(max_sessions or settings.SERVER_MAX_SESSIONS, ttl or settings.SERVER_SESSION_TTL)
+        self.llm_concurrency = max(1, llm_concurrency or settings.SERVER_LLM_CONCURRENCY)
+        # Interpretation blocks on the LLM (and may stream for seconds); actions get their own threads
+        self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="server-llm")
+        self._workers = ThreadPoolExecutor(max_workers=max(1, workers or settings.SERVER_WORKERS),
+                                           thread_name_prefix="server-exec")
+        self._llm_slots = None
+        self._reaper = None
+        self.stats = {"turns": 0, "errors": 0, "active_turns": 0, "waiting_for_llm": 0}
+        self.first_command = LatencyHistogram()
+        self.turn_latency = LatencyHistogram()
+
+    # --- Turns ---
+
+    async def turn(self, session: Session, text: str):
+        """Interprets and executes one instruction; yields its events as they happen."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        pending = 1          # The interpretation, plus every command until it is executed
+        previous = None      # Execution of the previous command: they run in order
+        statuses = set()
+
+        def finished(_=None):
+            nonlocal pending
+            pending -= 1
+            if pending == 0:
+                events.put_nowait(None)
+
+        def on_command(index: int, command: dict):
+            nonlocal pending, previous
+            pending += 1
+            events.put_nowait({"event": "command", "index": index, "action": command.get("action"),
+                               "params": command.get("params", {}), "confidence": command.get("confidence")})
+            previous = loop.create_task(self._execute(session, index, command, previous, events))
+            previous.add_done_callback(finished)
+
+        def on_interpreted(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                events.put_nowait({"event": "error", "error": str(task.exception())})
+            finished()
+
+        async with session.lock:
+            session.turns += 1
+            self.stats["active_turns"] += 1
+            started = time.perf_counter()
+            first_command = None
+            try:
+                interpretation = loop.create_task(self._interpret(session, text, on_command, events))
+                interpretation.add_done_callback(on_interpreted)
+                while (event := await events.get()) is not None:
+                    if event["event"] == "command" and first_command is None:
+                        first_command = _ms(started)
+                        self.first_command.record(first_command)
+                    elif event["event"] in ("result", "error"):
+                        statuses.add(event.get("status", "error"))
+                    yield event
+            finally:
+                self.stats["active_turns"] -= 1
+                session.last_used = time.monotonic()
+
+            total = _ms(started)
+            self.turn_latency.record(total)
+            self.stats["turns"] += 1
+            status = next((s for s in ("error", "denied") if s in statuses), "ok")
+            if status == "error":
+                self.stats["errors"] += 1
+            yield {"event": "done", "status": status, "first_command_ms": first_command, "total_ms": total}
+
+    async def _interpret(self, session: Session, text: str, on_command, events: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+
+        def on_message(piece):
+            if piece:
+                loop.call_soon_threadsafe(events.put_nowait, {"event": "message", "text": piece})
+
+        def interpret():
+            # Everything the interpreter does through llm.client (history, cache key) uses this session's client
+            with use_client(session.client), tracer.span("server.interpret", session=session.id):
+                for index, command in enumerate(interpret_command_stream(text, on_message=on_message)):
+                    loop.call_soon_threadsafe(on_command, index, command)
+
+        self.stats["waiting_for_llm"] += 1
+        try:
+            await self._llm_slots.acquire()
+        finally:
+            self.stats["waiting_for_llm"] -= 1
+        try:
+            await loop.run_in_executor(self._llm_pool, interpret)
+        finally:
+            self._llm_slots.release()
+
+    async def _execute(self, session: Session, index: int, command: dict, previous: asyncio.Task, events: asyncio.Queue):
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        def execute():
+            with use_client(session.client):
+                return run_command(command, self.policy)
+
+        result = await asyncio.get_running_loop().run_in_executor(self._workers, execute)
+        events.put_nowait({"event": "result", "index": index, **result})
+
+    # --- HTTP and WebSocket endpoints ---
+
+    async def create_session(self, request: web.Request) -> web.Response:
+        session = self.sessions.create()
+        return web.json_response({"session": session.id})
+
+    async def end_session(self, request: web.Request) -> web.Response:
+        session_id = request.match_info["session_id"]
+        if not self.sessions.remove(session_id):
+            raise web.HTTPNotFound(text=f"No session {session_id}")
+        return web.json_response({"session": session_id, "ended": True})
+
+    def _session(self, request: web.Request) -> Session:
+        session_id = request.match_info["session_id"]
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise web.HTTPNotFound(text=f"No session {session_id}")
+        return session
+
+    async def commands(self, request: web.Request) -> web.StreamResponse:
+        # JSON only: a cross-site form or text/plain POST would get through without a preflight
+        if request.content_type != "application/json":
+            raise web.HTTPUnsupportedMediaType(text='Expected {"input": "..."} as application/json')
+        text = _instruction(await request.text(), plain=False)
+        if not text:
+            raise web.HTTPBadRequest(text='Expected {"input": "..."}')
+        session = self._session(request)
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        await response.write(_encode({"event": "session", "session": session.id}))
+        async with aclosing(self.turn(session, text)) as events:
+            async for event in events:
+                await response.write(_encode(event))
+        await response.write_eof()
+        return response
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        session_id = self._session(request).id
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            text = _instruction(message.data)
+            if not text:
+                await ws.send_str(_encode({"event": "error", "error": "Empty instruction"}).decode("utf-8"))
+                continue
+            # Looked up per message: the session may have been evicted while the socket was idle
+            session = self.sessions.get(session_id)
+            if session is None:
+                await ws.send_str(_encode({"event": "error", "error": f"No session {session_id}"}).decode("utf-8"))
+                break
+            await ws.send_str(_encode({"event": "session", "session": session.id}).decode("utf-8"))
+            async with aclosing(self.turn(session, text)) as events:
+                async for event in events:
+                    await ws.send_str(_encode(event).decode("utf-8"))
+        return ws
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.summary())
+
+    def summary(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "sessions_created": self.sessions.created,
+            "sessions_evicted": self.sessions.evicted,
+            "llm_concurrency": self.llm_concurrency,
+            **self.stats,
+            "first_command": self.first_command.summary(),
+            "turn": self.turn_latency.summary(),
+        }
+
+    # --- Lifecycle ---
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[_local_origin_only])
+        app.add_routes([
+            web.post("/sessions", self.create_session),
+            web.post(f"/sessions/{{session_id:{SESSION_ID}}}/commands", self.commands),
+            web.get(f"/sessions/{{session_id:{SESSION_ID}}}/ws", self.websocket),
+            web.delete(f"/sessions/{{session_id:{SESSION_ID}}}", self.end_session),
+            web.get("/stats", self.get_stats),
+        ])
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app: web.Application):
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        # The first LLMClient would otherwise import openai (slow) on the event loop
+        await asyncio.get_running_loop().run_in_executor(None, importlib.import_module, "openai")
+        self._reaper = asyncio.create_task(self._reap())
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(min(60.0, self.sessions.ttl / 2))
+            self.sessions.evict()
+
+    async def _on_cleanup(self, app: web.Application):
+        self._reaper.cancel()
+        self._llm_pool.shutdown(wait=False, cancel_futures=True)
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+@web.middleware
+async def _local_origin_only(request: web.Request, handler):
+    """Refuses requests from web pages that aren't served from this machine."""
+    origin = request.headers.get("Origin")
+    if origin is not None and urlsplit(origin).hostname not in LOCAL_HOSTS:
+        logger.warning(f"Refused {request.method} {request.path} from origin {origin}")
+        raise web.HTTPForbidden(text="Cross-origin requests are not allowed")
+    return await handler(request)
+
+def _instruction(raw: str, plain: bool = True) -> str:
+    """The instruction in a request body or message: {"input": "..."}, or plain text if allowed."""
+    raw = raw.strip()
+    if raw.startswith("{"):
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            return raw if plain else ""
+        if isinstance(data, dict):
+            return str(data.get("input") or "").strip()
+    return raw if plain else ""
+
+def _encode(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+def main(host: str = None, port: int = None, allow: str = None):
+    """Entry point for --serve; runs until interrupted."""
+    policy = ActionPolicy.parse(allow if allow is not None else settings.SERVER_ALLOWED_ACTIONS)
+    host = host or settings.SERVER_HOST
+    port = port or settings.SERVER_PORT
+    logger.info(f"Serving on http://{host}:{port} (pre-approved actions: {', '.join(policy.patterns) or 'none'})")
+    web.run_app(AssistantServer(policy).build_app(), host=host, port=port, print=None)
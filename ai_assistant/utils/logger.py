@@ -1,10 +1,24 @@
 import logging
 import sys
 
+# Where every logger created by setup_logger writes
+_stream = sys.stdout
+_handlers = []
+
+def log_to_stderr():
+    """
+    Moves all log output to stderr, for when stdout carries machine-readable
+    output (e.g. --batch results).
+    """
+    global _stream
+    _stream = sys.stderr
+    for handler in _handlers:
+        handler.setStream(sys.stderr)
+
 def setup_logger(name: str):
     """
     Configures and returns a logger instance.
-    Logs to console (stdout).
+    Logs to console (stdout, or stderr after log_to_stderr()).
     """
     logger = logging.getLogger(name)
     
@@ -14,7 +28,8 @@ def setup_logger(name: str):
         
     logger.setLevel(logging.INFO)
 
-    handler = logging.StreamHandler(sys.stdout)
+    handler = logging.StreamHandler(_stream)
+    _handlers.append(handler)
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     handler.setFormatter(formatter)
     
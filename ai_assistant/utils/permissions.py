@@ -1,50 +1,260 @@
-import json
 import os
+import re
+import json
+import time
+import fnmatch
+import sqlite3
+import threading
+from ai_assistant.config import settings
 from ai_assistant.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+ALLOWED = "ALLOWED"
+DENIED = "DENIED"
+UNKNOWN = "UNKNOWN"
+
+# From harmless to destructive; "none" as a threshold means nothing qualifies
+RISK_TIERS = ("low", "medium", "high")
+ACTION_RISK = {
+    "respond": "low",
+    "read_file": "low",
+    "list_directory": "low",
+    "search_web": "low",
+    "analyze_screen": "medium",   # The screenshot is sent to the vision model
+    "open_url": "medium",
+    "open_app": "medium",
+    "create_folder": "medium",
+    "write_file": "medium",
+    "type_text": "high",          # Types into whatever window has the focus
+    "close_app": "high",
+    "system_control": "high",
+}
+# The parameter a rule's target pattern is matched against
+TARGET_PARAMS = {
+    "open_url": "url",
+    "open_app": "name",
+    "close_app": "name",
+    "system_control": "action",
+    "search_web": "query",
+    "type_text": "text",
+    "create_folder": "name",
+    "write_file": "filename",
+    "read_file": "filename",
+}
+
+def _tier(name: str) -> int:
+    return RISK_TIERS.index(name) if name in RISK_TIERS else -1
+
+def _checked_tier(name: str, allowed: tuple, fallback: str, setting: str) -> str:
+    """A known tier name; anything else is logged and replaced by the safe fallback."""
+    name = (name or "").strip().lower()
+    if name in allowed:
+        return name
+    logger.warning(f"Unknown risk tier {name!r} in {setting}; using {fallback!r}")
+    return fallback
+
+def command_target(command: dict) -> str:
+    params = command.get("params") or {}
+    return str(params.get(TARGET_PARAMS.get(command.get("action"), ""), "") or "")
+
+class Rule:
+    """
+    "action:target" with shell-style wildcards in either part, e.g. "read_file:*" or
+    "open_url:https://docs.*"; a bare action means any target. Matching is case-sensitive.
+    """
+    def __init__(self, pattern: str, decision: str):
+        action, colon, target = pattern.strip().partition(":")
+        self.action = action.strip()
+        self.target = target.strip() if colon else "*"
+        self.pattern = f"{self.action}:{self.target}"
+        self.decision = decision
+        # More literal characters = more specific; the most specific matching rule decides
+        self.specificity = len(re.sub(r"[*?\[\]]", "", self.pattern))
+        self.exact = not re.search(r"[*?\[]", self.pattern)
+        self._action = re.compile(fnmatch.translate(self.action))
+        self._target = re.compile(fnmatch.translate(self.target))
+
+    def matches(self, action: str, target: str) -> bool:
+        return bool(self._action.match(action) and self._target.match(target))
+
+class PermissionPolicy:
+    """
+    Rules compiled for lookup: exact "action:target" rules in a dict, the others as
+    precompiled patterns grouped by action, most specific first (deny before allow on a tie).
+    """
+    def __init__(self, rules=()):
+        self._exact = {}          # (action, target) -> Rule
+        self._by_action = {}      # action -> [Rule]
+        self._any_action = []     # Rules with wildcards in the action
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: Rule):
+        if rule.exact:
+            self._exact[(rule.action, rule.target)] = rule
+            return
+        bucket = self._any_action if re.search(r"[*?\[]", rule.action) else self._by_action.setdefault(rule.action, [])
+        bucket[:] = [r for r in bucket if r.pattern != rule.pattern] + [rule]
+        bucket.sort(key=lambda r: (-r.specificity, r.decision != DENIED))
+
+    def match(self, action: str, target: str):
+        """The rule that decides the command, or None."""
+        rule = self._exact.get((action, target))
+        if rule is not None:
+            return rule
+        best = None
+        for bucket in (self._by_action.get(action, ()), self._any_action):
+            for rule in bucket:
+                if rule.matches(action, target):
+                    if best is None or (rule.specificity, rule.decision == DENIED) > (best.specificity, best.decision == DENIED):
+                        best = rule
+                    break   # Sorted: the first match is the best in its bucket
+        return best
+
 class PermissionManager:
     """
-    Manages user permissions for safe execution.
-    Persists decisions to a file.
+    Decides which commands may run without asking.
+
+    An allow or deny rule matching the command decides; otherwise commands up to the
+    auto-approve risk tier are allowed and the rest need confirmation. Rules come from
+    PERMISSION_RULES ("!" in front denies) and from grants, which are stored one row each
+    in sqlite.
     """
-    def __init__(self, storage_file="permissions.json"):
-        self.storage_file = storage_file
-        self.permissions = self._load_permissions()
+    def __init__(self, db_path: str = None, rules: str = "", auto_approve: str = "low",
+                 plan_tier: str = "medium", risk: str = ""):
+        self.db_path = db_path
+        # An unknown name must never rank below "low": as a threshold it approves nothing,
+        # as an action's risk it counts as high
+        self.auto_approve = _checked_tier(auto_approve, RISK_TIERS + ("none",), "none", "PERMISSION_AUTO_APPROVE")
+        self.plan_tier = _checked_tier(plan_tier, RISK_TIERS + ("none",), "none", "PERMISSION_PLAN_TIER")
+        self.risk_overrides = {}
+        for item in risk.split(","):
+            action, _, tier = item.partition(":")
+            if tier.strip():
+                self.risk_overrides[action.strip()] = _checked_tier(tier, RISK_TIERS, "high", "PERMISSION_RISK")
+        self._lock = threading.Lock()
+        self._db = None
+        self.policy = PermissionPolicy()
+        for spec in rules.split(","):
+            spec = spec.strip()
+            if spec:
+                denied = spec.startswith("!")
+                self.policy.add(Rule(spec.lstrip("!"), DENIED if denied else ALLOWED))
+        for pattern, decision in self._load_rules():
+            self.policy.add(Rule(pattern, decision))
+
+    def _connect(self):
+        if self._db is None and self.db_path:
+            try:
+                directory = os.path.dirname(self.db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS rules ("
+                    "pattern TEXT PRIMARY KEY, decision TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open permission store at {self.db_path}: {e}")
+                self.db_path = None
+                self._db = None
+        return self._db
 
-    def _load_permissions(self):
-        if os.path.exists(self.storage_file):
+    def _load_rules(self) -> list[tuple[str, str]]:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return []
             try:
-                with open(self.storage_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+                rows = db.execute("SELECT pattern, decision FROM rules").fetchall()
+                if not rows:
+                    rows = self._import_legacy(db)
+                return rows
+            except sqlite3.Error as e:
+                logger.error(f"Permission store read failed: {e}")
+                return []
 
-    def _save_permissions(self):
+    def _import_legacy(self, db) -> list[tuple[str, str]]:
+        """Decisions from the old permissions.json (exact "action:target" keys), taken over once."""
+        path = os.path.join(os.path.dirname(self.db_path), "permissions.json")
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.permissions, f, indent=4)
-        except Exception as e:
-            logger.error(f"Failed to save permissions: {e}")
+            with open(path, "r") as f:
+                legacy = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return []
+        # The old keys had no wildcards; escape anything that would now read as one
+        rows = [(re.sub(r"([*?\[])", r"[\1]", key), value) for key, value in legacy.items() if value in (ALLOWED, DENIED)]
+        db.executemany("INSERT OR IGNORE INTO rules (pattern, decision, created_at) VALUES (?, ?, ?)",
+                       [(pattern, decision, time.time()) for pattern, decision in rows])
+        db.commit()
+        logger.info(f"Imported {len(rows)} permissions from {path}")
+        return rows
+
+    def add_rule(self, pattern: str, decision: str):
+        """Adds a rule and stores it (a single row; nothing else is rewritten)."""
+        rule = Rule(pattern, decision)
+        with self._lock:
+            self.policy.add(rule)
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute("INSERT OR REPLACE INTO rules (pattern, decision, created_at) VALUES (?, ?, ?)",
+                               (rule.pattern, decision, time.time()))
+                    db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to save permission {rule.pattern}: {e}")
+
+    def risk(self, action: str) -> str:
+        return self.risk_overrides.get(action) or ACTION_RISK.get(action, "high")
+
+    def evaluate(self, command: dict) -> tuple[str, str]:
+        """(ALLOWED, DENIED or UNKNOWN, why); UNKNOWN means the user has to confirm."""
+        action = command.get("action") or ""
+        rule = self.policy.match(action, command_target(command))
+        if rule is not None:
+            return rule.decision, f"rule {rule.pattern}"
+        risk = self.risk(action)
+        if _tier(risk) <= _tier(self.auto_approve):
+            return ALLOWED, f"{risk} risk"
+        return UNKNOWN, f"{risk} risk"
+
+    def plan_approvable(self, commands: list[dict]) -> bool:
+        """Whether these commands are low-risk enough to be confirmed once, together."""
+        return all(_tier(self.risk(c.get("action"))) <= _tier(self.plan_tier) for c in commands)
 
     def check_permission(self, action: str, target: str) -> str:
         """
         Returns: 'ALLOWED', 'DENIED', or 'UNKNOWN'
         """
-        key = f"{action}:{target}"
-        return self.permissions.get(key, "UNKNOWN")
+        return self.evaluate({"action": action, "params": {TARGET_PARAMS.get(action, ""): target}})[0]
 
     def grant_permission(self, action: str, target: str):
-        key = f"{action}:{target}"
-        self.permissions[key] = "ALLOWED"
-        self._save_permissions()
+        self.add_rule(f"{action}:{target}", ALLOWED)
 
     def deny_permission(self, action: str, target: str):
-        key = f"{action}:{target}"
-        self.permissions[key] = "DENIED"
-        self._save_permissions()
+        self.add_rule(f"{action}:{target}", DENIED)
+
+    def grant_command(self, command: dict):
+        """Always allows this action on this target from now on."""
+        target = re.sub(r"([*?\[])", r"[\1]", command_target(command))
+        self.grant_permission(command.get("action"), target)
+
+# Global instance (created on first use)
+_permission_manager = None
+_permission_lock = threading.Lock()
 
-# Global instance
-permission_manager = PermissionManager()
+def get_permission_manager() -> PermissionManager:
+    global _permission_manager
+    if _permission_manager is None:
+        with _permission_lock:
+            if _permission_manager is None:
+                _permission_manager = PermissionManager(
+                    db_path=settings.PERMISSIONS_DB,
+                    rules=settings.PERMISSION_RULES,
+                    auto_approve=settings.PERMISSION_AUTO_APPROVE,
+                    plan_tier=settings.PERMISSION_PLAN_TIER,
+                    risk=settings.PERMISSION_RISK,
+                )
+    return _permission_manager
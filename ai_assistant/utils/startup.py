@@ -0,0 +1,131 @@
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class StartupProfiler:
+    """
+    Measures where startup time goes: per-module import time (like `python -X importtime`)
+    and named init phases (client construction, engine loading, ...).
+    Disabled by default; every hook is a no-op until enable() is called.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.started_at = time.perf_counter()
+        self.imports = {}     # module -> [cumulative seconds, self seconds]
+        self.phases = []      # (name, thread name, seconds)
+        self.marks = []       # (label, seconds since start)
+        self._stack = []
+        self._lock = threading.Lock()
+        self._original_import = None
+
+    def enable(self):
+        """Starts recording. Call as early as possible, before the package is imported."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only time the main thread's first import of a module; everything else passes through
+        if level != 0 or name in sys.modules or threading.current_thread() is not threading.main_thread():
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.imports[name] = [elapsed, elapsed - children]
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a named init phase (thread-safe)."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, threading.current_thread().name, time.perf_counter() - start))
+
+    def mark(self, label: str):
+        """Records a milestone (e.g. 'first prompt') relative to enable()."""
+        if self.enabled:
+            self.marks.append((label, time.perf_counter() - self.started_at))
+
+    def report(self, console, top: int = 20):
+        """Prints the breakdown as rich tables."""
+        from rich.table import Table
+        from rich import box
+
+        table = Table(title="Startup Profile: Imports", box=box.SIMPLE)
+        table.add_column("Module", style="cyan")
+        table.add_column("Cumulative (ms)", justify="right")
+        table.add_column("Self (ms)", justify="right")
+        # Top-level packages only make the list readable; nested modules are included in them
+        rows = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for module, (cumulative, own) in rows:
+            table.add_row(module, f"{cumulative * 1000:.1f}", f"{own * 1000:.1f}")
+        console.print(table)
+
+        table = Table(title="Startup Profile: Init Phases", box=box.SIMPLE)
+        table.add_column("Phase", style="cyan")
+        table.add_column("Thread")
+        table.add_column("Time (ms)", justify="right")
+        for name, thread, seconds in self.phases:
+            table.add_row(name, thread, f"{seconds * 1000:.1f}")
+        for label, seconds in self.marks:
+            table.add_row(f"[bold]{label}[/bold]", "", f"[bold]{seconds * 1000:.1f}[/bold]")
+        console.print(table)
+
+# Global instance
+startup_profiler = StartupProfiler()
+
+class WarmUp:
+    """
+    Preloads capabilities on background threads (while the banner renders), so the
+    first real use doesn't pay for imports, engine init or connection setup.
+    """
+    def __init__(self):
+        self.tasks = {}   # name -> Thread
+        self.errors = {}
+
+    def start(self, name: str, func):
+        def run():
+            try:
+                with startup_profiler.phase(f"warm-up: {name}"):
+                    func()
+            except Exception as e:
+                self.errors[name] = e
+                logger.warning(f"Warm-up of {name} failed: {e}")
+
+        thread = threading.Thread(target=run, name=f"warmup-{name}", daemon=True)
+        self.tasks[name] = thread
+        thread.start()
+
+    def done(self, name: str) -> bool:
+        return not self.tasks[name].is_alive()
+
+    def wait(self, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.tasks.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
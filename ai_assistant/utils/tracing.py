@@ -0,0 +1,278 @@
+import json
+import math
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class LatencyHistogram:
+    """
+    Fixed log-scale buckets from 0.1 ms to ~100 s (about 10% wide each), so recording
+    is O(1) and memory is constant no matter how many samples are taken.
+    """
+    MIN_MS = 0.1
+    GROWTH = 1.1
+    BUCKETS = 150
+
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        if ms <= self.MIN_MS:
+            index = 0
+        else:
+            index = min(self.BUCKETS, int(math.log(ms / self.MIN_MS, self.GROWTH)) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile (clamped to the observed range)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                upper = self.MIN_MS * self.GROWTH ** index
+                return min(max(upper, self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+class Span:
+    __slots__ = ("tracer", "name", "span_id", "parent", "trace_id", "attrs", "events",
+                 "error", "thread", "started_at", "started_wall", "duration_ms")
+
+    def __init__(self, tracer, name: str, parent, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(tracer._ids)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attrs = attrs
+        self.events = []
+        self.error = None
+        self.thread = threading.current_thread().name
+        self.started_wall = time.time()
+        self.started_at = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, key: str, value):
+        self.attrs[key] = value
+
+    def event(self, name: str, **attrs):
+        """Records a point in time inside the span (e.g. a retry)."""
+        self.events.append({"name": name, "at_ms": round((time.perf_counter() - self.started_at) * 1000, 3), **attrs})
+
+    def fail(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self.started_at) * 1000
+            self.tracer._finish(self)
+
+    def __enter__(self):
+        self.tracer._current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.fail(exc)
+        # Restore the parent directly rather than with a token: generators may resume in another context
+        self.tracer._current.set(self.parent)
+        self.end()
+        return False
+
+class _NullSpan:
+    """Returned while tracing is disabled: every operation is a no-op."""
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def event(self, name, **attrs):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """
+    Lightweight tracing for the request pipeline.
+    Stages run inside timed spans nested parent -> child (turn -> interpret -> llm -> llm.attempt);
+    every finished span feeds a per-name latency histogram and, if a trace file is set, is
+    appended to it as one JSON line.
+    Disabled by default: span() then returns a shared no-op object, so instrumented code
+    pays about one attribute check per stage.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self._current = contextvars.ContextVar("current_span", default=None)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._file = None
+        self.path = None
+
+    def enable(self, path: str = None):
+        """Starts tracing; with a path, finished spans are appended to it as JSONL."""
+        if path:
+            self._file = open(path, "a", encoding="utf-8")
+            self.path = path
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # --- Creating spans ---
+
+    def span(self, name: str, **attrs):
+        """Context manager timing a stage as a child of the current span."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, self._current.get(), attrs)
+
+    def start_span(self, name: str, parent=None, **attrs):
+        """
+        Starts a span without making it current; the caller must end() it.
+        For work that is suspended and resumed (generators), use attach() around each resumption.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, parent if parent is not None else self._current.get(), attrs)
+
+    def current(self):
+        return self._current.get() if self.enabled else None
+
+    @contextmanager
+    def attach(self, span):
+        """Makes span the current one for the block, e.g. on a worker thread."""
+        if not self.enabled or span is None or span is _NULL_SPAN:
+            yield
+            return
+        previous = self._current.get()
+        self._current.set(span)
+        try:
+            yield
+        finally:
+            self._current.set(previous)
+
+    def iterate(self, span, iterable):
+        """Iterates while span is current during each step, so spans opened inside nest under it."""
+        iterator = iter(iterable)
+        while True:
+            with self.attach(span):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def annotate(self, **attrs):
+        """Adds attributes to the current span."""
+        if self.enabled:
+            span = self._current.get()
+            if span is not None:
+                span.attrs.update(attrs)
+
+    def event(self, name: str, **attrs):
+        """Records an event on the current span."""
+        if self.enabled:
+            span = self._current.get()
+            if span is not None:
+                span.event(name, **attrs)
+
+    def record(self, name: str, ms: float):
+        """Adds a measurement that isn't a span of its own (e.g. time to first byte) to a histogram."""
+        if self.enabled:
+            with self._lock:
+                self._histogram(name).record(ms)
+
+    # --- Collecting ---
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        # Caller holds the lock
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def _finish(self, span: Span):
+        record = None
+        if self._file is not None:
+            record = json.dumps({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent.span_id if span.parent is not None else None,
+                "name": span.name,
+                "start": round(span.started_wall, 6),
+                "duration_ms": round(span.duration_ms, 3),
+                "thread": span.thread,
+                "attrs": span.attrs,
+                "events": span.events,
+                "error": span.error,
+            }, default=str)
+        with self._lock:
+            self._histogram(span.name).record(span.duration_ms)
+            if record is not None and self._file is not None:
+                self._file.write(record + "\n")
+                self._file.flush()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def report(self, console):
+        """Prints the latency histograms as a rich table."""
+        from rich.table import Table
+        from rich import box
+
+        table = Table(title="Trace: Stage Latency", box=box.SIMPLE)
+        table.add_column("Stage", style="cyan", no_wrap=True)
+        for column in ("Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"):
+            table.add_column(column, justify="right")
+        for name, s in self.summary().items():
+            table.add_row(name, str(s["count"]), f"{s['mean_ms']:.1f}", f"{s['p50_ms']:.1f}",
+                          f"{s['p95_ms']:.1f}", f"{s['p99_ms']:.1f}", f"{s['max_ms']:.1f}")
+        console.print(table)
+        if self.path:
+            console.print(f"[dim]Trace written to {self.path}[/dim]")
+
+# Global instance
+tracer = Tracer()
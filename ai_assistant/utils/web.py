@@ -1,27 +1,217 @@
-from ddgs import DDGS
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from ai_assistant.config import settings
 from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
 
 logger = setup_logger(__name__)
 
+NO_RESULTS_MESSAGE = "No results found. (The search engine might be rate-limiting or the query is too specific.)"
+
+class RateLimited(Exception):
+    """Raised when the search backend signals (or looks like) rate limiting."""
+
+def _looks_rate_limited(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "429" in text
+
+class TokenBucket:
+    """
+    Token bucket limiting how fast requests leave the process.
+    penalize() pauses the bucket after the backend pushed back.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 0.1)
+            time.sleep(wait)
+
+    def penalize(self, delay: float):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.tokens = 0.0
+
+def _ddgs_backend():
+    # Imported on first search: ddgs pulls in a heavy HTTP stack
+    from ddgs import DDGS
+    return DDGS()
+
+class WebSearcher:
+    """
+    DuckDuckGo search with:
+    - a query-normalized result cache with TTL eviction,
+    - coalescing of identical in-flight queries into one request,
+    - a token bucket with exponential backoff so bursts don't trip rate limits.
+    backend_factory is any callable returning an object with a DDGS-style text() method.
+    """
+    def __init__(self, backend_factory=_ddgs_backend, ttl: float = 600, max_entries: int = 256,
+                 rate: float = 1.0, burst: int = 3, max_retries: int = 2, backoff: float = 2.0):
+        self.backend_factory = backend_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate, burst)
+        self._cache = OrderedDict()   # key -> (stored_at, results)
+        self._inflight = {}           # key -> Future
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "requests": 0, "rate_limited": 0}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _backend(self):
+        # One long-lived backend per thread instead of a fresh session per query
+        backend = getattr(self._local, "backend", None)
+        if backend is None:
+            backend = self.backend_factory()
+            self._local.backend = backend
+        return backend
+
+    def _fetch(self, query: str, max_results: int) -> list[str]:
+        """
+        Performs the actual request, retrying with backoff on rate limiting.
+        Empty answers are treated as soft rate limiting as well.
+        """
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            with tracer.span("web.rate_limit"):
+                self.bucket.acquire()
+            with self._lock:
+                self.stats["requests"] += 1
+            try:
+                results = []
+                with tracer.span("web.request", attempt=attempt + 1) as span:
+                    for r in self._backend().text(query, max_results=max_results) or []:
+                        if r:
+                            results.append(f"Title: {r.get('title', 'N/A')}\nURL: {r.get('href', 'N/A')}\nSnippet: {r.get('body', 'N/A')}\n")
+                    span.set("results", len(results))
+                if results:
+                    return results
+                if attempt == self.max_retries:
+                    return []
+            except Exception as e:
+                if not _looks_rate_limited(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimited(str(e))
+
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            tracer.event("backoff", attempt=attempt + 1, delay_s=delay)
+            logger.warning(f"Web search throttled, backing off {delay:.1f}s (attempt {attempt + 1}).")
+            self.bucket.penalize(delay)
+            delay *= 2
+        return []
+
+    def search_results(self, query: str, max_results: int = 3) -> list[str]:
+        """
+        Returns the formatted result entries for a query (cached / coalesced).
+        """
+        key = (self.normalize(query), max_results)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                tracer.annotate(cache="hit")
+                return entry[1]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                owner = False
+            else:
+                self.stats["misses"] += 1
+                future = Future()
+                self._inflight[key] = future
+                owner = True
+
+        if not owner:
+            tracer.annotate(cache="coalesced")
+            return future.result()
+        tracer.annotate(cache="miss")
+
+        try:
+            results = self._fetch(query, max_results)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if results:
+                # Empty answers are never cached: they are usually transient
+                self._cache[key] = (time.monotonic(), results)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        future.set_result(results)
+        return results
+
+    def search(self, query: str, max_results: int = 3) -> str:
+        """
+        Searches the web and returns a summary of results.
+        """
+        try:
+            with tracer.span("web.search"):
+                results = self.search_results(query, max_results)
+            if not results:
+                logger.warning(f"Web search returned no results for query: {query}")
+                return NO_RESULTS_MESSAGE
+            return "\n---\n".join(results)
+        except Exception as e:
+            logger.error(f"Web search failed: {e}")
+            return f"Error performing web search: {str(e)}"
+
+    def search_many(self, queries: list[str], max_results: int = 3, max_workers: int = 4) -> list[str]:
+        """
+        Runs several queries concurrently; results are returned in query order.
+        """
+        if not queries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as pool:
+            return list(pool.map(lambda q: self.search(q, max_results), queries))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+# Global instance
+_searcher = WebSearcher(
+    ttl=settings.WEB_CACHE_TTL,
+    max_entries=settings.WEB_CACHE_SIZE,
+    rate=settings.WEB_RATE_LIMIT,
+    burst=settings.WEB_RATE_BURST,
+    max_retries=settings.WEB_MAX_RETRIES,
+    backoff=settings.WEB_BACKOFF,
+)
+
 def search_web(query: str, max_results: int = 3) -> str:
     """
     Searches the web using DuckDuckGo and returns a summary of results.
     """
-    try:
-        results = []
-        # Using DDGS as a context manager is correct for recent versions
-        with DDGS() as ddgs:
-            # text() method is correct for >= 4.0
-            search_gen = ddgs.text(query, max_results=max_results)
-            for r in search_gen:
-                if r:
-                    results.append(f"Title: {r.get('title', 'N/A')}\nURL: {r.get('href', 'N/A')}\nSnippet: {r.get('body', 'N/A')}\n")
-        
-        if not results:
-            logger.warning(f"Web search returned no results for query: {query}")
-            return "No results found. (The search engine might be rate-limiting or the query is too specific.)"
-            
-        return "\n---\n".join(results)
-    except Exception as e:
-        logger.error(f"Web search failed: {e}")
-        return f"Error performing web search: {str(e)}"
+    return _searcher.search(query, max_results)
+
+def search_web_batch(queries: list[str], max_results: int = 3) -> list[str]:
+    return _searcher.search_many(queries, max_results)
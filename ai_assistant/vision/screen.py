@@ -1,4 +1,3 @@
-import pyautogui
 import base64
 import io
 from ai_assistant.utils.logger import setup_logger
@@ -13,6 +12,29 @@ try:
 except ImportError:
     console = None
 
+def encode_image_base64(image) -> str:
+    """
+    Encodes a PIL image as a base64 JPEG string.
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    # Quality=70 is a good balance for LLM vision tokens vs clarity
+    image.save(buffer, format="JPEG", quality=70)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+def grab_screen():
+    """
+    Captures the primary screen as a PIL image without any UI feedback.
+    Returns None if the capture failed.
+    """
+    try:
+        import pyautogui
+        return pyautogui.screenshot()
+    except Exception as e:
+        logger.error(f"Screen capture failed: {e}")
+        return None
+
 def capture_screen_base64() -> str:
     """
     Captures the primary screen and returns it as a base64 encoded JPEG string.
@@ -33,10 +55,7 @@ def capture_screen_base64() -> str:
 
         with context:
             screenshot = pyautogui.screenshot()
-            buffer = io.BytesIO()
-            # Quality=70 is a good balance for LLM vision tokens vs clarity
-            screenshot.save(buffer, format="JPEG", quality=70)
-            img_str = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            img_str = encode_image_base64(screenshot)
             
         return img_str
     except ImportError:
@@ -0,0 +1,222 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from ai_assistant.config import settings
+from ai_assistant.llm.client import ask_llm, record_exchange
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
+from ai_assistant.vision.screen import grab_screen, encode_image_base64
+
+logger = setup_logger(__name__)
+
+def perceptual_hash(image, hash_size: int = 8) -> int:
+    """
+    Perceptual hash of a PIL image: a difference hash (gradients) concatenated with
+    an average hash (brightness layout), 2*hash_size*hash_size bits in total.
+    Robust to scaling and JPEG noise, but changes when the visible content changes.
+    """
+    from PIL import Image
+    gray = image.convert("L")
+
+    # dHash: is each pixel brighter than its right neighbour?
+    pixels = list(gray.resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    # aHash: is each pixel brighter than the mean?
+    pixels = list(gray.resize((hash_size, hash_size), Image.BILINEAR).getdata())
+    mean = sum(pixels) / len(pixels)
+    for p in pixels:
+        value = (value << 1) | (p > mean)
+    return value
+
+def screen_digest(image) -> int:
+    """Digest of the exact pixels: any visible change, down to one line of text, changes it."""
+    return int.from_bytes(hashlib.blake2b(image.tobytes(), digest_size=16).digest(), "big")
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class VisionCache:
+    """
+    Caches vision answers keyed by (frame hash, prompt).
+    Frames within `tolerance` bits of a cached frame count as the same screen; with 0 the
+    key must match exactly (the analyzer then keys on the exact screen digest).
+    """
+    def __init__(self, max_entries: int = 64, ttl: float = 300, tolerance: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self._entries = OrderedDict()   # (frame_hash, prompt) -> (stored_at, response)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _normalize(prompt: str) -> str:
+        return " ".join(prompt.lower().split())
+
+    def get(self, frame_hash: int, prompt: str):
+        prompt = self._normalize(prompt)
+        now = time.monotonic()
+        with self._lock:
+            for key in reversed(self._entries):
+                cached_hash, cached_prompt = key
+                if cached_prompt != prompt or hamming_distance(cached_hash, frame_hash) > self.tolerance:
+                    continue
+                stored_at, response = self._entries[key]
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    break
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return response
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, frame_hash: int, prompt: str, response: str):
+        with self._lock:
+            key = (frame_hash, self._normalize(prompt))
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class Frame:
+    def __init__(self, image, frame_hash: int, digest: int, captured_at: float):
+        self.image = image
+        self.hash = frame_hash       # Perceptual: coarse, for fuzzy cache matching
+        self.digest = digest         # Exact pixels
+        self.captured_at = captured_at
+        self._encoded = None
+
+    def base64(self) -> str:
+        # Encode lazily and only once per frame
+        if self._encoded is None:
+            self._encoded = encode_image_base64(self.image)
+        return self._encoded
+
+class ScreenWatcher:
+    """
+    Background thread that samples the screen every `interval` seconds and keeps
+    the latest frame (and its perceptual hash) ready for analyze_screen.
+    `grab` returns a PIL image; it defaults to a pyautogui screenshot.
+    """
+    def __init__(self, grab=None, interval: float = 1.0):
+        self.grab = grab or grab_screen
+        self.interval = interval
+        self._latest = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.changes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def sample(self):
+        """Captures one frame now and makes it the latest. Returns the Frame (or None)."""
+        image = self.grab()
+        if image is None:
+            return None
+        frame = Frame(image, perceptual_hash(image), screen_digest(image), time.monotonic())
+        with self._lock:
+            # The newest image always wins; only the encoding of identical pixels is reused
+            previous = self._latest
+            if previous is not None and previous.digest == frame.digest:
+                frame._encoded = previous._encoded
+            else:
+                self.changes += 1
+            self._latest = frame
+        return frame
+
+    def latest(self, max_age: float = None):
+        with self._lock:
+            frame = self._latest
+        if frame is None:
+            return None
+        if max_age is not None and time.monotonic() - frame.captured_at > max_age:
+            return None
+        return frame
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Screen watcher sample failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="screen-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Screen watcher started (interval {self.interval}s).")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+class ScreenAnalyzer:
+    """
+    Answers questions about the screen, skipping capture when the watcher already
+    has a fresh frame and skipping the vision model when the same question was
+    already answered for an unchanged screen.
+    """
+    def __init__(self, ask=None, watcher: ScreenWatcher = None, cache: VisionCache = None, max_frame_age: float = None):
+        self.ask = ask or ask_llm
+        self.watcher = watcher or ScreenWatcher(interval=settings.SCREEN_WATCHER_INTERVAL)
+        self.cache = cache or VisionCache()
+        # A frame older than two sampling periods means the watcher has stalled
+        self.max_frame_age = max_frame_age if max_frame_age is not None else 2 * self.watcher.interval
+
+    def analyze(self, prompt: str):
+        """
+        Returns the vision answer for prompt, or None if the screen could not be captured.
+        """
+        with tracer.span("vision") as span:
+            frame = self.watcher.latest(self.max_frame_age) if self.watcher.running else None
+            span.set("frame", "watcher" if frame is not None else "captured")
+            if frame is None:
+                with tracer.span("vision.capture"):
+                    frame = self.watcher.sample()
+                if frame is None:
+                    return None
+
+            # The coarse perceptual hash misses small changes; it is only used when fuzzy matching is asked for
+            key = frame.hash if self.cache.tolerance > 0 else frame.digest
+            response = self.cache.get(key, prompt)
+            span.set("cache", "hit" if response is not None else "miss")
+            if response is not None:
+                logger.info("Vision cache hit (screen unchanged).")
+                record_exchange(f"{prompt} [Image Sent]", response)
+                return response
+
+            with tracer.span("vision.encode"):
+                image_base64 = frame.base64()
+            response = self.ask(prompt, image_base64=image_base64)
+            self.cache.put(key, prompt, response)
+            return response
+
+# Global instance
+screen_analyzer = ScreenAnalyzer(
+    cache=VisionCache(
+        max_entries=settings.VISION_CACHE_SIZE,
+        ttl=settings.VISION_CACHE_TTL,
+        tolerance=settings.VISION_HASH_TOLERANCE,
+    )
+)
+
+def start_screen_watcher():
+    screen_analyzer.watcher.start()
+
+def analyze_screen(prompt: str):
+    return screen_analyzer.analyze(prompt)
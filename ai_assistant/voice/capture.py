@@ -0,0 +1,338 @@
+import time
+import wave
+import queue
+import threading
+from collections import deque
+import numpy as np
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FRAME_SECONDS = 0.03   # 30 ms frames: short enough for quick endpointing, and a size webrtcvad accepts
+
+def _to_int16_mono(data: bytes, sample_width: int, channels: int) -> bytes:
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.int32) - 128) << 8
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.int32)
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) << 8 | raw[:, 1].astype(np.int32) << 16
+                   | raw[:, 2].astype(np.int32) << 24) >> 16
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype="<i4") >> 16
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples.astype("<i2").tobytes()
+
+class MicrophoneSource:
+    """The default microphone, opened once and read frame by frame (needs PyAudio)."""
+    live = True
+    sample_width = 2
+
+    def __init__(self, sample_rate: int = 16000, frame_seconds: float = FRAME_SECONDS, device_index: int = None):
+        self.sample_rate = sample_rate
+        self.frame_samples = int(sample_rate * frame_seconds)
+        self.device_index = device_index
+        self._microphone = None
+
+    def open(self):
+        import speech_recognition as sr
+        self._microphone = sr.Microphone(device_index=self.device_index, sample_rate=self.sample_rate,
+                                         chunk_size=self.frame_samples)
+        self._microphone.__enter__()
+
+    def read(self) -> bytes:
+        return self._microphone.stream.read(self.frame_samples)
+
+    def close(self):
+        if self._microphone is not None and self._microphone.stream is not None:
+            self._microphone.__exit__(None, None, None)
+
+class WavSource:
+    """
+    A WAV recording in place of the microphone, converted to 16-bit mono. With realtime=True
+    frames are delivered no faster than they were spoken and, as with a live microphone,
+    audio nobody is listening for is dropped; otherwise the file is read as fast as it is
+    consumed and nothing is lost.
+    """
+    sample_width = 2
+
+    def __init__(self, path: str, realtime: bool = True, frame_seconds: float = FRAME_SECONDS):
+        self.path = path
+        self.live = realtime
+        self.frame_seconds = frame_seconds
+        self._wav = None
+
+    def open(self):
+        self._wav = wave.open(self.path, "rb")
+        self.sample_rate = self._wav.getframerate()
+        self.frame_samples = int(self.sample_rate * self.frame_seconds)
+        self._started = time.perf_counter()
+        self._delivered = 0
+
+    def read(self) -> bytes:
+        data = self._wav.readframes(self.frame_samples)
+        if not data:
+            return b""
+        frame = _to_int16_mono(data, self._wav.getsampwidth(), self._wav.getnchannels())
+        if self.live:
+            self._delivered += len(frame) // 2
+            ahead = self._delivered / self.sample_rate - (time.perf_counter() - self._started)
+            if ahead > 0:
+                time.sleep(ahead)
+        return frame
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+
+class EnergyVAD:
+    """
+    Frame classifier on short-time energy and zero-crossing rate. The noise floor it compares
+    against is re-estimated on every non-speech frame, quickly downwards and slowly upwards,
+    so the threshold follows the room without a calibration pause before each utterance.
+    Quiet frames with many zero crossings count as speech too (fricatives: "s", "f").
+    """
+    MIN_FLOOR = 30.0   # RMS on the 16-bit scale; digital silence must not turn every sound into speech
+
+    def __init__(self, ratio: float = 3.0, fricative_ratio: float = 1.5, fricative_zcr: float = 0.25,
+                 calibration_frames: int = 10):
+        self.ratio = ratio
+        self.fricative_ratio = fricative_ratio
+        self.fricative_zcr = fricative_zcr
+        self.floor = None
+        self._calibration = []
+        self._calibration_frames = calibration_frames
+
+    def is_speech(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype="<i2").astype(np.float64)
+        if not samples.size:
+            return False
+        rms = float(np.sqrt(np.mean(samples * samples)))
+
+        if self.floor is None:
+            # Starting level: the first few frames are taken as background noise
+            self._calibration.append(rms)
+            if len(self._calibration) >= self._calibration_frames:
+                self.floor = max(float(np.median(self._calibration)), self.MIN_FLOOR)
+            return False
+
+        zcr = float(np.mean(np.signbit(samples[1:]) != np.signbit(samples[:-1]))) if samples.size > 1 else 0.0
+        speech = rms > self.floor * self.ratio or (rms > self.floor * self.fricative_ratio and zcr > self.fricative_zcr)
+        if not speech:
+            rate = 0.2 if rms < self.floor else 0.02
+            self.floor = max(self.floor + rate * (rms - self.floor), self.MIN_FLOOR)
+        return speech
+
+class WebRtcVAD:
+    """WebRTC's voice activity detector (optional webrtcvad package)."""
+    def __init__(self, sample_rate: int, aggressiveness: int = 2):
+        import webrtcvad
+        self._vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+
+    def is_speech(self, frame: bytes) -> bool:
+        return self._vad.is_speech(frame, self.sample_rate)
+
+def build_vad(sample_rate: int, frame_seconds: float = FRAME_SECONDS):
+    """The VAD chosen by settings.VOICE_VAD, falling back to EnergyVAD when webrtcvad can't be used."""
+    if settings.VOICE_VAD == "webrtc":
+        if sample_rate not in (8000, 16000, 32000, 48000) or round(frame_seconds * 1000) not in (10, 20, 30):
+            logger.warning(f"webrtcvad doesn't support {sample_rate} Hz / {frame_seconds * 1000:.0f} ms frames; using the energy VAD.")
+        else:
+            try:
+                return WebRtcVAD(sample_rate)
+            except ImportError:
+                logger.warning("webrtcvad is not installed; using the energy VAD.")
+    return EnergyVAD(ratio=settings.VOICE_ENERGY_RATIO)
+
+class Playback:
+    """
+    Whether the assistant's own voice is playing. Without echo cancellation the microphone
+    hears it, so meanwhile no frame counts as speech (an utterance can't start from the echo);
+    sustained speech only calls the barge-in handlers (see TTS_BARGE_IN_VOICE).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._handlers = []
+
+    @property
+    def active(self) -> bool:
+        return self._active > 0
+
+    def begin(self):
+        with self._lock:
+            self._active += 1
+
+    def end(self):
+        with self._lock:
+            self._active = max(0, self._active - 1)
+
+    def on_barge_in(self, handler):
+        self._handlers.append(handler)
+
+    def barge_in(self):
+        for handler in list(self._handlers):
+            handler()
+
+# Global instance: set by the speaker, read by every capture stream
+playback = Playback()
+
+class AudioStream:
+    """
+    Long-lived capture from a source (the microphone, or a WAV file for tests).
+
+    A background thread reads fixed-size frames, classifies each with the VAD (which keeps
+    calibrating while nobody is listening) and keeps the latest ones in a ring buffer.
+    utterance() yields the frames of the next utterance: it starts once `min_speech` seconds
+    of speech are heard, includes `preroll` seconds of audio before that, and ends after
+    `end_silence` seconds without speech. While the assistant is speaking (see Playback)
+    nothing counts as speech; `barge_in` seconds of it call the barge-in handlers instead.
+    """
+    def __init__(self, source, vad=None, preroll: float = 0.3, min_speech: float = 0.1, end_silence: float = 0.5,
+                 barge_in: float = 0.4):
+        self.source = source
+        self.vad = vad
+        self.preroll = preroll
+        self.min_speech = min_speech
+        self.end_silence = end_silence
+        self.barge_in = barge_in
+        self._lock = threading.Lock()
+        self._backlog = None     # Frames read while nobody is listening
+        self._queue = None       # Frames for the utterance being captured
+        self._ended = False
+        self._thread = None
+
+    @property
+    def sample_rate(self) -> int:
+        return self.source.sample_rate
+
+    @property
+    def sample_width(self) -> int:
+        return self.source.sample_width
+
+    @property
+    def frame_seconds(self) -> float:
+        return self.source.frame_samples / self.source.sample_rate
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _frames(self, seconds: float) -> int:
+        return max(1, round(seconds / self.frame_seconds))
+
+    def start(self) -> "AudioStream":
+        self.source.open()
+        if self.vad is None:
+            self.vad = build_vad(self.sample_rate, self.frame_seconds)
+        self._start_frames = self._frames(self.min_speech)
+        self._end_frames = self._frames(self.end_silence)
+        self._barge_in_frames = self._frames(self.barge_in)
+        self._preroll_frames = self._frames(self.preroll) + self._start_frames
+        # A live source only needs the pre-roll; a file read ahead of the listener must lose nothing
+        self._backlog = deque(maxlen=self._preroll_frames if self.source.live else None)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(timeout=1.0)
+        self.source.close()
+
+    def _run(self):
+        barge_in_run = 0
+        try:
+            while not self._stopped.is_set():
+                frame = self.source.read()
+                if not frame:
+                    break
+                speech = self.vad.is_speech(frame)
+                if playback.active:
+                    barge_in_run = barge_in_run + 1 if speech else 0
+                    if barge_in_run >= self._barge_in_frames:
+                        barge_in_run = 0
+                        playback.barge_in()
+                    speech = False
+                else:
+                    barge_in_run = 0
+                item = (frame, speech)
+                with self._lock:
+                    if self._queue is None:
+                        self._backlog.append(item)
+                    else:
+                        self._queue.put(item)
+        except Exception as e:
+            logger.error(f"Audio capture stopped: {e}")
+        finally:
+            with self._lock:
+                self._ended = True
+                if self._queue is not None:
+                    self._queue.put(None)
+
+    def _arm(self) -> queue.Queue:
+        with self._lock:
+            frames = queue.Queue()
+            for item in self._backlog:
+                frames.put(item)
+            self._backlog.clear()
+            if self._ended:
+                frames.put(None)
+            self._queue = frames
+            return frames
+
+    def _disarm(self, frames: queue.Queue):
+        with self._lock:
+            self._queue = None
+            leftover = []
+            while not frames.empty():
+                item = frames.get_nowait()
+                if item is not None:
+                    leftover.append(item)
+            # Audio read past the end of the utterance belongs to the next one
+            self._backlog.extendleft(reversed(leftover))
+
+    def utterance(self, timeout: float = None, phrase_time_limit: float = None):
+        """
+        Yields the frames of the next utterance. Yields nothing if no speech starts within
+        `timeout` seconds of audio or the source ends first.
+        """
+        frames = self._arm()
+        try:
+            preroll = deque(maxlen=self._preroll_frames)
+            waited = speech_run = silence_run = 0
+            length = None
+            while True:
+                item = frames.get()
+                if item is None:
+                    return
+                frame, speech = item
+                if length is None:
+                    preroll.append(frame)
+                    waited += 1
+                    speech_run = speech_run + 1 if speech else 0
+                    if speech_run >= self._start_frames:
+                        length = len(preroll)
+                        yield from preroll
+                    elif timeout and waited * self.frame_seconds >= timeout:
+                        return
+                    continue
+
+                yield frame
+                length += 1
+                silence_run = 0 if speech else silence_run + 1
+                if silence_run >= self._end_frames:
+                    return
+                if phrase_time_limit and length * self.frame_seconds >= phrase_time_limit:
+                    return
+        finally:
+            self._disarm(frames)
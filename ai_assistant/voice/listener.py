@@ -1,38 +1,168 @@
+import threading
+import contextvars
 import speech_recognition as sr
+from ai_assistant.config import settings
+from ai_assistant.voice.capture import AudioStream, MicrophoneSource, WavSource
+from ai_assistant.voice.stt import build_backend
 from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
 
 logger = setup_logger(__name__)
 
+class _PartialTranscriber:
+    """
+    Recognizes the utterance captured so far on a background thread and reports the
+    interim hypotheses. Only the newest snapshot is recognized; older ones are skipped
+    while the recognizer is busy.
+    """
+    def __init__(self, recognize, on_partial):
+        self._recognize = recognize
+        self._on_partial = on_partial
+        self._condition = threading.Condition()
+        self._pending = None
+        self._stopped = False
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), name="partial-stt", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: sr.AudioData):
+        with self._condition:
+            self._pending = audio
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                audio, self._pending = self._pending, None
+            try:
+                with tracer.span("listen.partial"):
+                    text = self._recognize(audio)
+            except sr.UnknownValueError:
+                continue
+            except Exception as e:
+                logger.debug(f"Interim recognition failed: {e}")
+                continue
+            with self._condition:
+                if self._stopped:
+                    return
+            if text:
+                self._on_partial(text)
+
+def open_stream(source) -> AudioStream:
+    """Starts capturing from `source` with the endpointing from settings."""
+    return AudioStream(
+        source,
+        preroll=settings.VOICE_PREROLL,
+        min_speech=settings.VOICE_MIN_SPEECH,
+        end_silence=settings.VOICE_END_SILENCE,
+        barge_in=settings.TTS_BARGE_IN_SPEECH,
+    ).start()
+
 class Listener:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        # Adjust query duration
-        self.recognizer.pause_threshold = 1.0 
+    TIMEOUT = 5              # seconds to wait for speech to start
+    PHRASE_TIME_LIMIT = 10   # longest utterance, in seconds
 
-    def listen(self):
+    def __init__(self, recognize=None, recognize_partial=None, stream: AudioStream = None):
+        # recognize(audio_data) -> text; raises sr.UnknownValueError when nothing was understood.
+        # Defaults to the configured backend, whose model is loaded here, once.
+        if recognize is None:
+            recognize = build_backend().recognize
+        self.recognize = recognize
+        # Interim transcripts may come from a different (faster, less accurate) recognizer
+        if recognize_partial is None and settings.STT_PARTIAL_BACKEND:
+            recognize_partial = build_backend(settings.STT_PARTIAL_BACKEND, fallback="").recognize
+        self.recognize_partial = recognize_partial or self.recognize
+        # Capture stream kept open across turns; the microphone unless one is given (e.g. a WAV file)
+        self.stream = stream
+        self._owns_stream = stream is None
+        self._stream_lock = threading.Lock()
+
+    def start(self) -> AudioStream:
+        """Opens the microphone stream, if not open already, so it calibrates before the first turn."""
+        with self._stream_lock:
+            if self._owns_stream and (self.stream is None or not self.stream.running):
+                if self.stream is not None:
+                    # The device failed or went away: reopen it
+                    self.stream.close()
+                self.stream = open_stream(MicrophoneSource(sample_rate=settings.VOICE_SAMPLE_RATE))
+            return self.stream
+
+    def close(self):
+        with self._stream_lock:
+            if self.stream is not None and self._owns_stream:
+                self.stream.close()
+                self.stream = None
+
+    def listen(self, on_partial=None):
         """
-        Listens to the microphone and returns the recognized text.
+        Listens for the next utterance and returns the recognized text.
         Returns None if nothing was heard or an error occurred.
+        With on_partial, interim transcripts of the utterance so far are passed to it while the
+        user is still speaking (every settings.VOICE_PARTIAL_INTERVAL seconds of audio).
         """
-        with sr.Microphone() as source:
-            logger.info("Listening...")
-            print("\n🎤 Listening... (Speak now)")
-            
-            # Dynamic energy adjustment for ambient noise
+        with tracer.span("listen") as span:
             try:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-            except sr.WaitTimeoutError:
-                logger.debug("Listening timed out (no speech detected).")
-                return None
+                stream = self.start()
             except Exception as e:
                 logger.error(f"Microphone error: {e}")
                 return None
+            text = self._listen(stream, on_partial)
+            span.set("heard", text is not None)
+            return text
+
+    def listen_file(self, path: str, on_partial=None, realtime: bool = True):
+        """listen() with a WAV recording as the source (see WavSource)."""
+        stream = open_stream(WavSource(path, realtime=realtime))
+        try:
+            with tracer.span("listen", file=path) as span:
+                text = self._listen(stream, on_partial)
+                span.set("heard", text is not None)
+                return text
+        finally:
+            stream.close()
+
+    def _capture(self, stream: AudioStream, on_partial) -> sr.AudioData:
+        partials = _PartialTranscriber(self.recognize_partial, on_partial) if on_partial else None
+        frames = []
+        next_partial = settings.VOICE_PARTIAL_INTERVAL
+        try:
+            for frame in stream.utterance(timeout=self.TIMEOUT, phrase_time_limit=self.PHRASE_TIME_LIMIT):
+                frames.append(frame)
+                if partials and len(frames) * stream.frame_seconds >= next_partial:
+                    next_partial += settings.VOICE_PARTIAL_INTERVAL
+                    partials.submit(sr.AudioData(b"".join(frames), stream.sample_rate, stream.sample_width))
+        finally:
+            if partials:
+                partials.stop()
+        if not frames:
+            return None
+        return sr.AudioData(b"".join(frames), stream.sample_rate, stream.sample_width)
+
+    def _listen(self, stream: AudioStream, on_partial=None):
+        with tracer.span("listen.capture") as span:
+            logger.info("Listening...")
+            print("\n🎤 Listening... (Speak now)")
+            audio = self._capture(stream, on_partial)
+            if audio is None:
+                logger.debug("Listening timed out (no speech detected).")
+                return None
+            span.set("speech_s", round(len(audio.frame_data) / (audio.sample_rate * audio.sample_width), 2))
+            if getattr(stream.vad, "floor", None) is not None:
+                span.set("noise_floor", round(stream.vad.floor, 1))
 
         try:
             logger.info("Recognizing...")
-            # recognize_google is free for personal use/testing
-            text = self.recognizer.recognize_google(audio)
+            with tracer.span("listen.recognize"):
+                text = self.recognize(audio)
             logger.info(f"Heard: {text}")
             print(f"🎤 You said: {text}")
             return text
@@ -40,10 +170,29 @@ class Listener:
             logger.debug("Could not understand audio")
             return None
         except sr.RequestError as e:
-            logger.error(f"Could not request results from Google Speech Recognition service; {e}")
+            logger.error(f"Could not get results from the speech recognition service; {e}")
             return None
+        except Exception as e:
+            logger.error(f"Speech recognition error: {e}")
+            return None
+
+# Singleton instance (created on first use)
+_listener = None
+_listener_lock = threading.Lock()
+
+def get_listener() -> Listener:
+    global _listener
+    if _listener is None:
+        # The warm-up thread and the first listen() may both get here
+        with _listener_lock:
+            if _listener is None:
+                _listener = Listener()
+    return _listener
 
-_listener = Listener()
+def listen(on_partial=None):
+    return get_listener().listen(on_partial)
 
-def listen():
-    return _listener.listen()
+def close():
+    """Closes the microphone stream, if one was opened."""
+    if _listener is not None:
+        _listener.close()
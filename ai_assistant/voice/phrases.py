@@ -0,0 +1,141 @@
+import os
+import wave
+import hashlib
+import threading
+from ai_assistant.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Said over and over by the REPL; "I am about to {action}." is added for every action
+FIXED_PHRASES = [
+    "Welcome back. Systems are online.",
+    "Done.",
+    "Action cancelled.",
+    "Should I proceed?",
+    "Goodbye.",
+    "I encountered a system error.",
+]
+
+def recurring_phrases(actions) -> list[str]:
+    """Every phrase worth pre-rendering, one sentence each (the speaker plays sentence by sentence)."""
+    from ai_assistant.voice.speaker import split_sentences
+    phrases = []
+    for phrase in FIXED_PHRASES + [f"I am about to {action}." for action in actions]:
+        sentences, _ = split_sentences(phrase, final=True)
+        phrases.extend(s for s in sentences if s not in phrases)
+    return phrases
+
+class PhraseCache:
+    """
+    Pre-rendered audio for recurring phrases: one WAV file per phrase on disk, keyed by
+    text, voice and rate (a different voice or rate renders them again). Once the files
+    exceed max_bytes, the least recently played are evicted.
+    """
+    def __init__(self, directory: str, max_bytes: int = 20 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "renders": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, text: str, voice: str, rate) -> str:
+        raw = "\x1f".join([" ".join(text.split()), voice or "", str(rate)])
+        return os.path.join(self.directory, hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + ".wav")
+
+    def lookup(self, text: str, voice: str, rate):
+        """The WAV file for the phrase, or None if it hasn't been rendered."""
+        path = self.path(text, voice, rate)
+        try:
+            # The modification time doubles as the last use, for eviction
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return path
+
+    def contains(self, text: str, voice: str, rate) -> bool:
+        return os.path.exists(self.path(text, voice, rate))
+
+    def store(self, text: str, voice: str, rate, render) -> str:
+        """
+        Renders the phrase with render(path) and adds it to the cache. Returns its path, or
+        None if the result isn't a playable WAV file (some engines write other formats).
+        """
+        path = self.path(text, voice, rate)
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            render(temp)
+            with wave.open(temp, "rb") as f:
+                if not f.getnframes():
+                    raise wave.Error("no audio")
+            os.replace(temp, path)
+        except (OSError, EOFError, wave.Error) as e:
+            logger.debug(f"Could not pre-render {text!r}: {e}")
+            if os.path.exists(temp):
+                os.remove(temp)
+            return None
+        with self._lock:
+            self.stats["renders"] += 1
+        self.evict()
+        return path
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".wav"):
+                    try:
+                        st = os.stat(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+                self.stats["evictions"] += 1
+
+class WavPlayer:
+    """Plays WAV files through PyAudio, stopping between chunks once `stop` is set."""
+    CHUNK = 1024
+
+    def __init__(self):
+        self._audio = None
+        self.available = True
+
+    def play(self, path: str, stop: threading.Event) -> bool:
+        """False if playback isn't possible here (the caller then synthesizes instead)."""
+        if not self.available:
+            return False
+        try:
+            import pyaudio
+            if self._audio is None:
+                self._audio = pyaudio.PyAudio()
+            with wave.open(path, "rb") as f:
+                stream = self._audio.open(
+                    format=self._audio.get_format_from_width(f.getsampwidth()),
+                    channels=f.getnchannels(),
+                    rate=f.getframerate(),
+                    output=True,
+                )
+                try:
+                    data = f.readframes(self.CHUNK)
+                    while data and not stop.is_set():
+                        stream.write(data)
+                        data = f.readframes(self.CHUNK)
+                finally:
+                    stream.stop_stream()
+                    stream.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Cached phrase playback unavailable ({e}); synthesizing instead.")
+            self.available = False
+            return False
@@ -1,34 +1,415 @@
+import os
+import re
+import sys
+import time
+import queue
+import itertools
+import threading
+import contextvars
 import pyttsx3
+from ai_assistant.config import settings
 from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
+from ai_assistant.voice.capture import playback
+from ai_assistant.voice.phrases import PhraseCache, WavPlayer
 
 logger = setup_logger(__name__)
 
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 10  # Pre-rendering phrases while nothing is being said
+
+_STOP = 99              # Queued after everything else, so pending speech is finished first
+MAX_SENTENCE_CHARS = 250
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx", "fig", "no"}
+_BOUNDARY = re.compile(r"([.!?…]+[\"')\]]*)\s+|\n+")
+
+def split_sentences(text: str, final: bool = False) -> tuple[list[str], str]:
+    """
+    Splits the complete sentences off the start of `text` and returns (sentences, rest).
+    A sentence is complete once whitespace follows its final punctuation, so text that is
+    still streaming in is never cut mid-sentence. With final=True the rest is a sentence too.
+    """
+    sentences, start = [], 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end(1) if match.group(1) else match.start()
+        if match.group(1) == ".":
+            words = text[start:match.start(1)].split()
+            last = words[-1].lower() if words else ""
+            # "Dr. Smith", "e.g. this", "J. Doe", and list numbering ("1. Open the file")
+            if last in _ABBREVIATIONS or (len(last) == 1 and last.isalpha()) or (len(words) == 1 and last.isdigit()):
+                continue
+        sentence = text[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    rest = text[start:]
+    if final:
+        if rest.strip():
+            sentences.append(rest.strip())
+        rest = ""
+    elif len(rest) > MAX_SENTENCE_CHARS:
+        # A long run without punctuation: break it at a comma (or a space) rather than wait
+        cut = max(rest.rfind(", ", 0, MAX_SENTENCE_CHARS), rest.rfind(" ", 0, MAX_SENTENCE_CHARS))
+        if cut > 0:
+            sentences.append(rest[:cut + 1].strip())
+            rest = rest[cut + 1:]
+    return sentences, rest
+
+class Utterance:
+    """
+    Speech queued on the Speaker. Text can keep arriving through feed() until close();
+    each complete sentence is queued (and starts playing) as soon as it is available.
+    wait() blocks until all of it has been spoken, or dropped by an interruption.
+    """
+    def __init__(self, speaker: "Speaker", priority: int, cache: bool = False):
+        self._speaker = speaker
+        self.priority = priority
+        self.cache = cache             # A recurring phrase: played from (and added to) the phrase cache
+        self.interrupted = False
+        self.first_audio_ms = None     # From creation to the first sentence starting to play
+        self._created = time.perf_counter()
+        self._parts = []
+        self._buffer = ""
+        self._queued = 0
+        self._closed = False
+        self._done = threading.Event()
+        # Spans of the spoken sentences nest under the caller's current span (e.g. the turn)
+        self.context = contextvars.copy_context()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, text: str):
+        self._parts.append(text)
+        sentences, self._buffer = split_sentences(self._buffer + text)
+        for sentence in sentences:
+            self._speaker._enqueue(self, sentence)
+
+    def close(self) -> "Utterance":
+        sentences, self._buffer = split_sentences(self._buffer, final=True)
+        for sentence in sentences:
+            self._speaker._enqueue(self, sentence)
+        self._speaker._close(self)
+        return self
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+class _KeyWatcher:
+    """Reports a key press on the terminal (the key is consumed) until stopped."""
+    def __init__(self, on_key):
+        self._on_key = on_key
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not sys.stdin or not sys.stdin.isatty():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="tts-keys", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=0.5)
+            self._thread = None
+
+    def _run(self):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                while not self._stopped.wait(0.05):
+                    if msvcrt.kbhit():
+                        msvcrt.getwch()
+                        self._on_key()
+                        return
+                return
+
+            import tty
+            import select
+            import termios
+            fd = sys.stdin.fileno()
+            saved = termios.tcgetattr(fd)
+            try:
+                # Keys arrive without Enter; Ctrl+C still interrupts
+                tty.setcbreak(fd)
+                while not self._stopped.is_set():
+                    ready, _, _ = select.select([fd], [], [], 0.05)
+                    if ready:
+                        os.read(fd, 1024)
+                        self._on_key()
+                        return
+            finally:
+                termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+        except Exception as e:
+            logger.debug(f"Key barge-in unavailable: {e}")
+
 class Speaker:
+    """
+    Text-to-speech on a dedicated worker thread (pyttsx3 must be created and driven on one
+    thread). Speech is queued sentence by sentence in a priority queue, so say() returns at
+    once, speech goes ahead of background rendering, and it can be interrupted between
+    or during sentences (barge-in: a key press, or the user speaking, see TTS_BARGE_IN_*).
+    """
     def __init__(self):
+        self.engine = None
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._generation = 0             # Bumped by interrupt(): older queued sentences are dropped
+        self._pending = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._interrupted = threading.Event()
+        self._keys = _KeyWatcher(self.interrupt) if settings.TTS_BARGE_IN_KEY else None
+        self._playing = False
+        self.phrases = self._open_phrase_cache()
+        self._player = WavPlayer()
+        self._voice = self._rate = None
+        if settings.TTS_BARGE_IN_VOICE:
+            playback.on_barge_in(self.interrupt)
+        self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+        self._thread.start()
+
+    def _init_engine(self):
         try:
             self.engine = pyttsx3.init()
             # Optional: Set properties (voices, rate, volume)
             # voices = self.engine.getProperty('voices')
             # self.engine.setProperty('voice', voices[1].id) # Try female voice if available
             self.engine.setProperty('rate', 170)
+            self.engine.connect('started-word', self._on_word)
+            self._voice = self.engine.getProperty('voice')
+            self._rate = self.engine.getProperty('rate')
         except Exception as e:
             logger.error(f"Failed to initialize TTS engine: {e}")
             self.engine = None
 
-    def say(self, text):
+    @staticmethod
+    def _open_phrase_cache():
+        if not settings.PHRASE_CACHE_ENABLED:
+            return None
+        try:
+            return PhraseCache(settings.PHRASE_CACHE_DIR, max_bytes=int(settings.PHRASE_CACHE_MAX_MB * 1024 * 1024))
+        except OSError as e:
+            logger.error(f"Failed to open phrase cache at {settings.PHRASE_CACHE_DIR}: {e}")
+            return None
+
+    def _on_word(self, name, location, length):
+        # Engine callbacks run inside runAndWait(), the only safe place to stop it
+        if self._interrupted.is_set():
+            self.engine.stop()
+
+    # --- Queueing ---
+
+    def stream(self, priority: int = PRIORITY_NORMAL) -> Utterance:
+        """An open utterance: feed() it text as it arrives (e.g. from a streaming LLM), then close()."""
+        return Utterance(self, priority)
+
+    def say(self, text: str, priority: int = PRIORITY_NORMAL, cache: bool = False) -> Utterance:
+        """
+        Queues text to be spoken and returns immediately.
+        cache=True marks a recurring phrase, played from pre-rendered audio when available.
+        """
+        utterance = Utterance(self, priority, cache)
+        utterance.feed(text)
+        return utterance.close()
+
+    def _enqueue(self, utterance: Utterance, sentence: str):
+        with self._lock:
+            utterance._queued += 1
+            self._pending += 1
+            self._idle.clear()
+            generation = self._generation
+        # First in, first out within a priority: a question waited for is spoken after what was
+        # queued before it, so nothing is left to play (and mute the microphone) over the answer
+        self._queue.put((utterance.priority, next(self._order), generation, sentence, utterance))
+
+    def _close(self, utterance: Utterance):
+        with self._lock:
+            utterance._closed = True
+            if utterance._queued == 0:
+                utterance._done.set()
+
+    def _finish(self, utterance: Utterance):
+        with self._lock:
+            utterance._queued -= 1
+            if utterance._closed and utterance._queued == 0:
+                utterance._done.set()
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.set()
+
+    def prerender(self, phrases):
+        """Renders recurring phrases to the phrase cache in the background, when nothing is being said."""
+        if self.phrases is None:
+            return
+        for phrase in phrases:
+            self._queue.put((PRIORITY_BACKGROUND, next(self._order), None, phrase, None))
+
+    def interrupt(self):
+        """Barge-in: stops the sentence being spoken and drops everything queued so far."""
+        with self._lock:
+            if self._pending == 0:
+                return
+            self._generation += 1
+        self._interrupted.set()
+        logger.info("Speech interrupted.")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until everything queued has been spoken; False on timeout."""
+        return self._idle.wait(timeout)
+
+    def shutdown(self, wait: bool = True, timeout: float = 10.0):
+        if wait:
+            self.wait(timeout)
+        self._queue.put((_STOP, next(self._order), None, None, None))
+
+    # --- Worker ---
+
+    def _run(self):
+        self._init_engine()
+        while True:
+            _, _, generation, sentence, utterance = self._queue.get()
+            if sentence is None:
+                break
+            if utterance is None:
+                self._render(sentence)
+                continue
+            with self._lock:
+                dropped = generation != self._generation
+                if not dropped:
+                    self._interrupted.clear()
+            if dropped:
+                utterance.interrupted = True
+            else:
+                self._set_playing(True)
+                utterance.context.run(self._speak, sentence, utterance)
+                if self._interrupted.is_set():
+                    utterance.interrupted = True
+            self._finish(utterance)
+            if self._pending == 0:
+                self._set_playing(False)
+        self._set_playing(False)
+
+    def _set_playing(self, playing: bool):
+        if playing == self._playing:
+            return
+        self._playing = playing
+        if playing:
+            playback.begin()
+            if self._keys:
+                self._keys.start()
+        else:
+            if self._keys:
+                self._keys.stop()
+            playback.end()
+
+    def _speak(self, sentence: str, utterance: Utterance):
+        if utterance.first_audio_ms is None:
+            utterance.first_audio_ms = (time.perf_counter() - utterance._created) * 1000
+            tracer.record("speak.first_audio", utterance.first_audio_ms)
         if not self.engine:
             logger.warning("TTS engine not initialized. Cannot speak.")
-            print(f"AI (Silent): {text}")
+            print(f"AI (Silent): {sentence}")
             return
 
         try:
-            logger.info(f"Speaking: {text}")
-            self.engine.say(text)
-            self.engine.runAndWait()
+            logger.info(f"Speaking: {sentence}")
+            with tracer.span("speak", chars=len(sentence)) as span:
+                cached = self._play_cached(sentence) if utterance.cache else False
+                span.set("cached", cached)
+                if not cached:
+                    self.engine.say(sentence)
+                    self.engine.runAndWait()
+                if self._interrupted.is_set():
+                    span.set("interrupted", True)
         except Exception as e:
             logger.error(f"TTS Error: {e}")
+            return
+        if utterance.cache and not cached and self.phrases is not None:
+            # Rendered once nothing else is queued, so it plays from the cache next time
+            self._queue.put((PRIORITY_BACKGROUND, next(self._order), None, sentence, None))
+
+    def _play_cached(self, sentence: str) -> bool:
+        if self.phrases is None:
+            return False
+        path = self.phrases.lookup(sentence, self._voice, self._rate)
+        return path is not None and self._player.play(path, self._interrupted)
+
+    def _render(self, phrase: str):
+        if not self.engine or self.phrases is None or self.phrases.contains(phrase, self._voice, self._rate):
+            return
+
+        def render(path):
+            self.engine.save_to_file(phrase, path)
+            self.engine.runAndWait()
+
+        self._interrupted.clear()
+        with tracer.span("speak.render", chars=len(phrase)):
+            if self.phrases.store(phrase, self._voice, self._rate, render) is None:
+                # This engine doesn't write WAV files: stop trying
+                logger.info("Phrase pre-rendering unavailable with this TTS engine.")
+                self.phrases = None
+
+class Narrator:
+    """
+    Speaks "respond" messages while the LLM is still streaming them: pass feed() as the
+    on_message callback of interpret_command_stream(). claim(message) then tells whether
+    a finished command's message was already spoken this way (so it isn't said twice).
+    """
+    def __init__(self, speaker: Speaker = None):
+        self._speaker = speaker or get_speaker()
+        self._current = None
+        self._spoken = []
+
+    def feed(self, text: str):
+        """Text of the message being streamed; None once it is complete."""
+        if text is None:
+            if self._current is not None:
+                self._spoken.append(self._current.close().text.strip())
+                self._current = None
+            return
+        if self._current is None:
+            self._current = self._speaker.stream()
+        self._current.feed(text)
+
+    def claim(self, message: str) -> bool:
+        message = message.strip()
+        if message in self._spoken:
+            self._spoken.remove(message)
+            return True
+        return False
+
+# Singleton instance (created on first use)
+_speaker = None
+_speaker_lock = threading.Lock()
+
+def get_speaker() -> Speaker:
+    global _speaker
+    if _speaker is None:
+        with _speaker_lock:
+            if _speaker is None:
+                _speaker = Speaker()
+    return _speaker
+
+def speak(text, priority: int = PRIORITY_NORMAL, wait: bool = False, cache: bool = False) -> Utterance:
+    """Queues text to be spoken; with wait=True, returns once it has been spoken."""
+    utterance = get_speaker().say(text, priority, cache)
+    if wait:
+        utterance.wait()
+    return utterance
 
-_speaker = Speaker()
+def get_phrase_cache_stats():
+    """Hits, misses and renders of the phrase audio cache (None before speaking or when disabled)."""
+    if _speaker is None or _speaker.phrases is None:
+        return None
+    return dict(_speaker.phrases.stats)
 
-def speak(text):
-    _speaker.say(text)
+def shutdown(wait: bool = True):
+    """Lets queued speech finish (unless wait=False) and stops the worker, if one was started."""
+    if _speaker is not None:
+        _speaker.shutdown(wait=wait)
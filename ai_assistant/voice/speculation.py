@@ -0,0 +1,152 @@
+import re
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
+
+logger = setup_logger(__name__)
+
+def normalize(text: str) -> str:
+    """Case, punctuation and spacing don't change what a transcript means."""
+    return " ".join(re.sub(r"[^\w\s'%./:-]", " ", text.lower()).split()).strip(" .")
+
+class SpeculationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.utterances = 0
+        self.started = 0        # Speculative interpretations started
+        self.hits = 0           # Final transcript matched: the speculative result was used
+        self.misses = 0         # Final transcript differed: interpreted again
+        self.superseded = 0     # Replaced by a newer stable hypothesis before the final one
+        self.saved_ms = 0.0     # Interpretation time already done when the final transcript arrived
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> dict:
+        with self._lock:
+            decided = self.hits + self.misses
+            return {
+                "utterances": self.utterances,
+                "speculations": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "superseded": self.superseded,
+                "hit_rate": round(self.hits / decided, 3) if decided else 0.0,
+                "saved_ms": round(self.saved_ms, 1),
+            }
+
+class _Speculation:
+    def __init__(self, text: str, transcript: str):
+        self.text = text                # Normalized
+        self.transcript = transcript    # As recognized
+        self.future = None
+        self.duration_ms = None
+
+class Speculator:
+    """
+    Starts interpreting a voice command before its final transcript is ready.
+
+    The listener reports interim hypotheses through on_partial(). Once the same hypothesis
+    has been seen `stable_partials` times in a row (the user has paused), it is interpreted
+    in the background, without side effects (see interpret_speculatively). resolve() then
+    compares it with the final transcript: on a match the result is committed and returned,
+    otherwise it is dropped and the caller interprets the final transcript as usual.
+    A newer stable hypothesis replaces an older speculation.
+    """
+    def __init__(self, interpret=None, stable_partials: int = 2, max_workers: int = 2):
+        if interpret is None:
+            from ai_assistant.commands.interpreter import interpret_speculatively
+            interpret = interpret_speculatively
+        self.interpret = interpret
+        self.stable_partials = stable_partials
+        # A superseded request can't be aborted; it finishes in the background and is ignored
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self._current = None
+        self._last_partial = None
+        self._repeats = 0
+
+    def on_partial(self, transcript: str):
+        """Receives an interim hypothesis (called from the listener's thread)."""
+        text = normalize(transcript or "")
+        if not text:
+            return
+        with self._lock:
+            if text == self._last_partial:
+                self._repeats += 1
+            else:
+                self._last_partial, self._repeats = text, 1
+            if self._repeats < self.stable_partials:
+                return
+            if self._current is not None:
+                if self._current.text == text:
+                    return
+                speculation_stats.add(superseded=1)
+            speculation = self._current = _Speculation(text, transcript)
+        speculation_stats.add(started=1)
+        logger.debug(f"Speculating on: {transcript!r}")
+        speculation.future = self._pool.submit(contextvars.copy_context().run, self._run, speculation)
+
+    def _run(self, speculation: _Speculation):
+        started = time.perf_counter()
+        with tracer.span("speculate", text=speculation.transcript):
+            try:
+                return self.interpret(speculation.transcript)
+            finally:
+                speculation.duration_ms = (time.perf_counter() - started) * 1000
+
+    def resolve(self, final: str):
+        """
+        Returns the speculative commands if they were made for `final` (committing their
+        side effects), otherwise None.
+        """
+        with self._lock:
+            speculation, self._current = self._current, None
+            self._last_partial, self._repeats = None, 0
+        speculation_stats.add(utterances=1)
+        if speculation is None or not final:
+            return None
+
+        if normalize(final) != speculation.text:
+            logger.info(f"Speculation missed: {speculation.transcript!r} != {final!r}")
+            speculation_stats.add(misses=1)
+            tracer.event("speculation", outcome="miss")
+            return None
+
+        waited = time.perf_counter()
+        try:
+            commands, commit = speculation.future.result()
+        except Exception as e:
+            logger.error(f"Speculative interpretation failed: {e}")
+            speculation_stats.add(misses=1)
+            return None
+        waited_ms = (time.perf_counter() - waited) * 1000
+        commit()
+        saved_ms = max(0.0, speculation.duration_ms - waited_ms)
+        speculation_stats.add(hits=1, saved_ms=saved_ms)
+        tracer.event("speculation", outcome="hit", saved_ms=round(saved_ms, 1))
+        return commands
+
+    def reset(self):
+        """Drops any pending speculation (e.g. when listening was aborted)."""
+        with self._lock:
+            self._current = None
+            self._last_partial, self._repeats = None, 0
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+# Global instance
+speculation_stats = SpeculationStats()
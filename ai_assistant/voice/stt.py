@@ -0,0 +1,144 @@
+import json
+import threading
+import speech_recognition as sr
+from ai_assistant.config import settings
+from ai_assistant.utils.logger import setup_logger
+from ai_assistant.utils.tracing import tracer
+
+logger = setup_logger(__name__)
+
+class RecognizerBackend:
+    """
+    A speech-to-text engine. load() does the expensive one-time setup (models are loaded
+    once and shared); recognize(audio) returns the transcript and raises
+    sr.UnknownValueError when nothing was understood, sr.RequestError when the engine failed.
+    """
+    name = "base"
+    offline = False
+
+    def load(self):
+        pass
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        raise NotImplementedError
+
+class GoogleBackend(RecognizerBackend):
+    """Google's free web speech API (network round-trip per utterance)."""
+    name = "google"
+
+    def load(self):
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        return self._recognizer.recognize_google(audio)
+
+class VoskBackend(RecognizerBackend):
+    """Offline Kaldi recognizer (vosk package + a model directory, settings.VOSK_MODEL_PATH)."""
+    name = "vosk"
+    offline = True
+    SAMPLE_RATE = 16000
+
+    def load(self):
+        import vosk
+        vosk.SetLogLevel(-1)
+        if not settings.VOSK_MODEL_PATH:
+            raise RuntimeError("VOSK_MODEL_PATH is not set (download a model from https://alphacephei.com/vosk/models)")
+        self._vosk = vosk
+        self._model = vosk.Model(settings.VOSK_MODEL_PATH)
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        # The model is shared; a recognizer is cheap and holds the per-utterance state
+        recognizer = self._vosk.KaldiRecognizer(self._model, self.SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+class WhisperBackend(RecognizerBackend):
+    """Offline Whisper on the CPU through faster-whisper (int8), model settings.WHISPER_MODEL."""
+    name = "whisper"
+    offline = True
+    SAMPLE_RATE = 16000
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self._model = WhisperModel(settings.WHISPER_MODEL, device="cpu", compute_type="int8",
+                                   cpu_threads=settings.WHISPER_THREADS)
+        self._lock = threading.Lock()
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        import numpy as np
+        raw = audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2)
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        # Greedy decoding without the previous text as prompt: the fastest setting for short commands
+        with self._lock:
+            segments, _ = self._model.transcribe(samples, language="en", beam_size=1,
+                                                 condition_on_previous_text=False, vad_filter=False)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+class FallbackBackend(RecognizerBackend):
+    """Tries `primary`; when it fails to answer (e.g. no network), asks `fallback` instead."""
+    def __init__(self, primary: RecognizerBackend, fallback: RecognizerBackend):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        try:
+            return self.primary.recognize(audio)
+        except sr.RequestError as e:
+            logger.warning(f"{self.primary.name} recognition failed ({e}); using {self.fallback.name}.")
+            tracer.event("stt.fallback", backend=self.fallback.name)
+            return self.fallback.recognize(audio)
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+    "whisper": WhisperBackend,
+}
+
+# Loaded backends, one per engine (created on first use)
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name: str) -> RecognizerBackend:
+    """The backend called `name`, loaded once. Raises ValueError for unknown names and the
+    engine's error (e.g. ImportError, missing model) if it can't be loaded."""
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown speech recognition backend: {name!r} (choose from {', '.join(BACKENDS)})")
+    with _backends_lock:
+        if name not in _backends:
+            backend = BACKENDS[name]()
+            with tracer.span("stt.load", backend=name):
+                backend.load()
+            logger.info(f"Speech recognition backend loaded: {name}")
+            _backends[name] = backend
+        return _backends[name]
+
+def _load(name: str) -> RecognizerBackend:
+    try:
+        return get_backend(name)
+    except Exception as e:
+        logger.error(f"Speech recognition backend {name!r} unavailable: {e}")
+        return None
+
+def build_backend(name: str = None, fallback: str = None) -> RecognizerBackend:
+    """
+    The configured backend (settings.STT_BACKEND), wrapped with the fallback
+    (settings.STT_FALLBACK) when one is set. Falls back to Google if the backend can't load.
+    """
+    name = name or settings.STT_BACKEND
+    fallback = settings.STT_FALLBACK if fallback is None else fallback
+    backend = _load(name) or (None if name == "google" else _load("google"))
+    if backend is None:
+        raise RuntimeError("No speech recognition backend could be loaded")
+    if fallback and fallback != backend.name:
+        secondary = _load(fallback)
+        if secondary is not None:
+            return FallbackBackend(backend, secondary)
+    return backend
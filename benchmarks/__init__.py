@@ -0,0 +1 @@
+"""Latency benchmarks against local fakes of the LLM API, web search and screen capture."""
@@ -0,0 +1,67 @@
+import json
+
+def _reply(*commands) -> str:
+    return json.dumps([{"action": action, "params": params, "confidence": 1.0} for action, params in commands])
+
+# Representative user inputs. `reply` is what the fake model answers if the input reaches the LLM;
+# `tier` is the interpreter tier expected to answer it (rules, classifier or llm).
+# `fast_reply`, where given, is what the fast model answers instead of `reply` (in cascade mode).
+CORPUS = [
+    # Answered by the rule engine
+    {"input": "open chrome", "tier": "rules", "reply": _reply(("open_app", {"name": "chrome"}))},
+    {"input": "close spotify", "tier": "rules", "reply": _reply(("close_app", {"name": "spotify"}))},
+    {"input": "list files", "tier": "rules", "reply": _reply(("list_directory", {}))},
+    {"input": "read notes.txt", "tier": "rules", "reply": _reply(("read_file", {"filename": "notes.txt"}))},
+    {"input": "search for python asyncio tutorial", "tier": "rules",
+     "reply": _reply(("search_web", {"query": "python asyncio tutorial"}))},
+    {"input": "create folder reports and write file reports/q3.txt with revenue up 12%", "tier": "rules",
+     "reply": _reply(("create_folder", {"name": "reports"}), ("write_file", {"filename": "reports/q3.txt", "content": "revenue up 12%"}))},
+    {"input": "open notepad and type hello world", "tier": "rules",
+     "reply": _reply(("open_app", {"name": "notepad"}), ("type_text", {"text": "hello world"}))},
+    {"input": "what's on my screen", "tier": "rules",
+     "reply": _reply(("analyze_screen", {"prompt": "what's on my screen"}))},
+
+    # Answered by the offline intent classifier
+    {"input": "could you launch visual studio", "tier": "classifier", "reply": _reply(("open_app", {"name": "visual studio"}))},
+    {"input": "what's the weather in paris", "tier": "classifier",
+     "reply": _reply(("search_web", {"query": "weather in paris"}))},
+    {"input": "restart the computer now", "tier": "classifier", "reply": _reply(("system_control", {"action": "restart"}))},
+
+    # Need the LLM
+    {"input": "summarize what is in todo.md for me", "tier": "llm",
+     "reply": _reply(("read_file", {"filename": "todo.md"}))},
+    {"input": "tell me a joke about computers", "tier": "llm",
+     "reply": _reply(("respond", {"message": "Why did the computer go to the doctor? It had a virus."}))},
+    {"input": "what is the difference between a list and a tuple in python", "tier": "llm",
+     "reply": _reply(("respond", {"message": "Lists are mutable, tuples are immutable."}))},
+    {"input": "open whatsapp web and message priya", "tier": "llm",
+     "reply": _reply(("open_url", {"url": "https://web.whatsapp.com"}),
+                     ("respond", {"message": "I opened WhatsApp Web. I cannot send messages automatically yet."})),
+     "fast_reply": _reply(("send_message", {"to": "priya"}))},
+    {"input": "find out who won the last world cup and save it to worldcup.txt", "tier": "llm",
+     "reply": _reply(("search_web", {"query": "last world cup winner"}),
+                     ("write_file", {"filename": "worldcup.txt", "content": "Argentina won the 2022 World Cup."})),
+     "fast_reply": '[ { "action": "search_web", "params": { "query": "world cup" }, "confidence": 0.4 } ]'},
+    {"input": "draft a polite reply declining tomorrow's meeting", "tier": "llm",
+     "reply": _reply(("respond", {"message": "Thanks for the invite, unfortunately I can't make it tomorrow."}))},
+]
+
+# Files the corpus refers to, created in the benchmark workspace
+WORKSPACE_FILES = {
+    "notes.txt": "Buy milk\nCall the bank\n" * 20,
+    "todo.md": "# Todo\n- [ ] finish the benchmark\n- [ ] review PRs\n",
+}
+
+# An agent-generated project scaffold: one folder and dozens of small files in one plan
+SCAFFOLD = [{"action": "create_folder", "params": {"name": "scaffold"}}] + [
+    {"action": "write_file", "params": {"filename": f"scaffold/pkg{i % 6}/module_{i}.py", "content": f"VALUE = {i}\n" * 40}}
+    for i in range(48)
+]
+
+def script() -> dict:
+    """Input -> scripted model reply, for FakeOpenAIServer."""
+    return {item["input"]: item["reply"] for item in CORPUS}
+
+def fast_script() -> dict:
+    """Input -> scripted reply of the fast model (defaults to the main model's reply)."""
+    return {item["input"]: item.get("fast_reply", item["reply"]) for item in CORPUS}
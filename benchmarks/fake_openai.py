@@ -0,0 +1,207 @@
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_RESPONSE = '[ { "action": "respond", "params": { "message": "This is a canned benchmark reply." }, "confidence": 1.0 } ]'
+
+def _last_user_text(messages: list[dict]) -> tuple[str, bool]:
+    """Returns (text of the last user message, whether it carried an image)."""
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            text = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+            return text, any(part.get("type") == "image_url" for part in content)
+        return content or "", False
+    return "", False
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for an OpenAI-compatible API (/v1/chat/completions and /v1/models).
+    Point the client at it through OPENAI_BASE_URL.
+
+    Responses come from `script` (user text -> reply, or a callable(messages) -> reply),
+    otherwise DEFAULT_RESPONSE. Timing is configurable:
+    - latency: seconds before the first byte (the model "thinking"),
+    - token_delay: seconds between streamed chunks,
+    - jitter: +/- fraction applied to every delay (seeded, so runs are repeatable),
+    - connect_latency: seconds added once per new connection, standing in for DNS and TLS
+      setup, so connection reuse shows up in the timings (`connections` counts them).
+    Several models can be imitated: model_latency (model -> seconds) overrides `latency`, and
+    model_script (model -> {user text: reply}) overrides `script` for that model.
+    """
+    def __init__(self, script=None, latency: float = 0.2, token_delay: float = 0.01,
+                 jitter: float = 0.1, chunk_size: int = 4, seed: int = 0, host: str = "127.0.0.1", port: int = 0,
+                 connect_latency: float = 0.0, model_latency: dict = None, model_script: dict = None):
+        self.script = script or {}
+        self.model_latency = model_latency or {}
+        self.model_script = model_script or {}
+        self.latency = latency
+        self.token_delay = token_delay
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.streamed = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0   # Most chat completions handled at the same time
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _delay(self, seconds: float):
+        if seconds <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(seconds * factor)
+
+    def reply_for(self, messages: list[dict], model: str = None) -> str:
+        if callable(self.script):
+            return self.script(messages)
+        text, has_image = _last_user_text(messages)
+        if text in self.model_script.get(model, {}):
+            return self.model_script[model][text]
+        if text in self.script:
+            return self.script[text]
+        if has_image:
+            return "The screen shows a code editor with no visible errors."
+        if messages and messages[0].get("role") == "system" and messages[0].get("content", "").startswith("Summarize"):
+            return "The user asked the assistant to run a few desktop tasks."
+        return DEFAULT_RESPONSE
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                if server.connect_latency > 0:
+                    time.sleep(server.connect_latency)
+
+            def _send_json(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json({"object": "list", "data": [
+                        {"id": "fake-model", "object": "model", "created": 0, "owned_by": "benchmark"}
+                    ]})
+                else:
+                    self._send_json({"error": {"message": "Not found"}}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json({"error": {"message": "Not found"}}, status=404)
+                    return
+
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+                try:
+                    self._complete(request)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _complete(self, request: dict):
+                model = request.get("model", "fake-model")
+                reply = server.reply_for(request.get("messages", []), model)
+                server._delay(server.model_latency.get(model, server.latency))
+
+                if request.get("stream"):
+                    with server._lock:
+                        server.streamed += 1
+                    self._stream(reply, model)
+                    return
+
+                self._send_json({
+                    "id": "chatcmpl-benchmark",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _stream(self, reply: str, model: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send(data: str, last: bool = False):
+                    event = f"data: {data}\n\n".encode("utf-8")
+                    # The final chunk goes out together with [DONE], like real servers do: clients
+                    # stop reading at [DONE] and only return the connection to the pool if the body ended
+                    terminator = b"0\r\n\r\n" if last else b""
+                    self.wfile.write(f"{len(event):X}\r\n".encode("ascii") + event + b"\r\n" + terminator)
+                    self.wfile.flush()
+
+                created = int(time.time())
+                for i in range(0, len(reply), server.chunk_size):
+                    if i:
+                        server._delay(server.token_delay)
+                    send(json.dumps({
+                        "id": "chatcmpl-benchmark",
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": reply[i:i + server.chunk_size]}, "finish_reason": None}],
+                    }))
+                send(json.dumps({
+                    "id": "chatcmpl-benchmark",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }))
+                send("[DONE]", last=True)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,137 @@
+import time
+import random
+
+class FakeDDGS:
+    """
+    Stand-in for ddgs.DDGS: returns deterministic results after a configurable delay.
+    """
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def text(self, query: str, max_results: int = 3):
+        self.calls += 1
+        time.sleep(self.latency * (1 + self._random.uniform(-self.jitter, self.jitter)))
+        return [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "href": f"https://example.com/{i + 1}?q={query.replace(' ', '+')}",
+                "body": f"Snippet {i + 1} about {query}.",
+            }
+            for i in range(max_results)
+        ]
+
+class ScriptedRecognizer:
+    """
+    Stand-in speech recognizer for recorded (or synthesized) utterances, in place of a
+    real STT service: `partial` returns the words "spoken" so far, in proportion to how
+    much of the speech the audio covers; `final` returns the final transcript, which may
+    differ from the interim ones (e.g. "note pad" heard as "notepad" at the end).
+    """
+    def __init__(self, transcript: str, speech_seconds: float, final: str = None,
+                 latency: float = 0.3, partial_latency: float = 0.1):
+        self.words = transcript.split()
+        self.transcript = transcript
+        self.speech_seconds = speech_seconds
+        self.final_transcript = final or transcript
+        self.latency = latency
+        self.partial_latency = partial_latency
+        self.calls = {"partial": 0, "final": 0}
+
+    def _heard(self, audio) -> str:
+        seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        count = min(len(self.words), int(len(self.words) * seconds / self.speech_seconds))
+        if not count:
+            import speech_recognition as sr
+            raise sr.UnknownValueError()
+        return " ".join(self.words[:count])
+
+    def partial(self, audio) -> str:
+        self.calls["partial"] += 1
+        time.sleep(self.partial_latency)
+        return self._heard(audio)
+
+    def final(self, audio) -> str:
+        self.calls["final"] += 1
+        time.sleep(self.latency)
+        self._heard(audio)
+        return self.final_transcript
+
+def synthesize_utterance(path: str, speech_seconds: float, lead: float = 0.3, tail: float = 1.5,
+                         sample_rate: int = 16000, seed: int = 0):
+    """
+    Writes a mono 16-bit WAV that voice activity detection treats like one spoken phrase:
+    amplitude-modulated noise ("syllables") between stretches of near-silence.
+    """
+    import wave
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    def quiet(seconds):
+        return rng.normal(0, 30, int(seconds * sample_rate))
+    t = np.arange(int(speech_seconds * sample_rate)) / sample_rate
+    envelope = 0.55 + 0.45 * np.abs(np.sin(2 * np.pi * 3.0 * t))   # ~6 syllables per second
+    speech = rng.normal(0, 6000, t.size) * envelope
+    signal = np.concatenate([quiet(lead), speech, quiet(tail)])
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.clip(signal, -32768, 32767).astype("<i2").tobytes())
+
+class FakeScreen:
+    """
+    Stand-in for a screenshot: a synthetic PIL image after a configurable capture delay.
+    Every `change_every` grabs the content changes, so the vision cache sees both
+    unchanged and changed screens.
+    """
+    def __init__(self, latency: float = 0.05, size=(1280, 720), change_every: int = 5):
+        self.latency = latency
+        self.size = size
+        self.change_every = change_every
+        self.grabs = 0
+
+    def grab(self):
+        from PIL import Image, ImageDraw
+
+        time.sleep(self.latency)
+        self.grabs += 1
+        version = self.grabs // self.change_every if self.change_every else 0
+        image = Image.new("RGB", self.size, (30, 30, 30))
+        draw = ImageDraw.Draw(image)
+        # A few blocks whose layout depends on the version, like windows moving around
+        for i in range(4):
+            x = (version * 97 + i * 211) % (self.size[0] - 200)
+            y = (version * 53 + i * 131) % (self.size[1] - 120)
+            draw.rectangle([x, y, x + 200, y + 120], fill=(200, 200 - i * 40, 80 + i * 40))
+        return image
+
+# Desktop side effects are never performed during a benchmark
+DESKTOP_ACTIONS = {"open_app", "close_app", "open_url", "system_control", "type_text"}
+
+def install_fakes(ddgs_latency: float = 0.3, screen_latency: float = 0.05):
+    """
+    Routes web search and screen capture to the fakes. Returns (FakeDDGS, FakeScreen).
+    Must be called after the ai_assistant modules are importable.
+    """
+    from ai_assistant.utils import web
+    from ai_assistant.vision import watcher
+
+    ddgs = FakeDDGS(latency=ddgs_latency)
+    screen = FakeScreen(latency=screen_latency)
+    web._searcher.backend_factory = lambda: ddgs
+    web._searcher.bucket.rate = 1_000_000.0
+    web._searcher.bucket.capacity = 1_000_000
+    web._searcher.bucket.tokens = 1_000_000
+    watcher.screen_analyzer.watcher.grab = screen.grab
+    return ddgs, screen
+
+def safe_execute(command: dict) -> str:
+    """execute_action() minus desktop side effects (launching apps, shutting down, typing)."""
+    from ai_assistant.executor.actions import execute_action
+
+    if command.get("action") in DESKTOP_ACTIONS:
+        return f"(benchmark) skipped {command.get('action')}"
+    return execute_action(command)
@@ -0,0 +1,171 @@
+"""
+Load test for the API server (--serve): N concurrent sessions, each sending a few turns.
+
+Runs the server in-process against the local fake OpenAI server and reports turn latency
+(to the first command and to the end of the turn), throughput and the most LLM requests
+that were in flight at once, for every LLM concurrency limit given. The fake model also
+checks that no session's requests carry another session's history.
+
+Run from the repository root:
+
+    python -m benchmarks.load --sessions 50 --turns 3 --llm-concurrency 1,8,32
+    python -m benchmarks.load --transport ws --output load_benchmark.json
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.run import Suite, configure, reset_session
+
+ALLOWED_ACTIONS = "respond,read_file,list_directory"
+
+def instruction(session: int, turn: int) -> str:
+    return f"Session {session}: please remember item number {turn} for later"
+
+class IsolationCheck:
+    """Fake model replies that also count requests whose history belongs to another session."""
+    def __init__(self):
+        self.leaks = 0
+
+    def __call__(self, messages: list[dict]) -> str:
+        users = [m.get("content") for m in messages if m.get("role") == "user" and isinstance(m.get("content"), str)]
+        if not users:
+            return "The user asked the assistant to remember a few items."
+        prefix = users[-1].split(":", 1)[0] + ":"
+        if any(not text.startswith(prefix) for text in users[:-1]):
+            self.leaks += 1
+        return json.dumps([
+            {"action": "respond", "params": {"message": f"Noted. {prefix} has {len(users)} items so far."}, "confidence": 1.0},
+            {"action": "read_file", "params": {"filename": "notes.txt"}, "confidence": 1.0},
+        ])
+
+async def timed(events) -> tuple:
+    """(seconds to the first command, seconds to the end of the turn, final status) of one turn."""
+    started = time.perf_counter()
+    first = status = None
+    async for event in events:
+        if event["event"] == "command" and first is None:
+            first = time.perf_counter() - started
+        elif event["event"] == "done":
+            status = event["status"]
+    return first, time.perf_counter() - started, status
+
+async def run_session(client, base_url: str, number: int, turns: int, transport: str,
+                      first_command: Suite, turn: Suite):
+    async with client.post(f"{base_url}/sessions") as response:
+        session_id = (await response.json())["session"]
+
+    def record(first, elapsed, status):
+        if status != "ok" or first is None:
+            turn.errors += 1
+            return
+        first_command.samples.append(first)
+        turn.samples.append(elapsed)
+
+    if transport == "ws":
+        async with client.ws_connect(f"{base_url}/sessions/{session_id}/ws") as ws:
+            async def events():
+                async for message in ws:
+                    event = json.loads(message.data)
+                    yield event
+                    if event["event"] == "done":
+                        return
+
+            for t in range(turns):
+                await ws.send_str(json.dumps({"input": instruction(number, t)}))
+                record(*await timed(events()))
+        return
+
+    for t in range(turns):
+        async with client.post(f"{base_url}/sessions/{session_id}/commands",
+                               json={"input": instruction(number, t)}) as response:
+            async def events():
+                async for line in response.content:
+                    if line.strip():
+                        yield json.loads(line)
+            record(*await timed(events()))
+
+async def run_load(args, llm_concurrency: int) -> dict:
+    import aiohttp
+    from aiohttp import web
+    from ai_assistant.batch import ActionPolicy
+    from ai_assistant.server import AssistantServer
+
+    server = AssistantServer(ActionPolicy.parse(ALLOWED_ACTIONS), max_sessions=args.sessions,
+                             llm_concurrency=llm_concurrency, workers=args.workers)
+    runner = web.AppRunner(server.build_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    base_url = f"http://{host}:{port}"
+
+    first_command, turn = Suite("first_command"), Suite("turn")
+    started = time.perf_counter()
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as client:
+            await asyncio.gather(*(
+                run_session(client, base_url, number, args.turns, args.transport, first_command, turn)
+                for number in range(args.sessions)
+            ))
+    finally:
+        wall = time.perf_counter() - started
+        stats = server.summary()
+        await runner.cleanup()
+
+    result = {"first_command": first_command.summary(), "turn": turn.summary(),
+              "turns_per_s": round(len(turn.samples) / wall, 2), "wall_s": round(wall, 3), "server": stats}
+    result["turn"]["errors"] = turn.errors
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent sessions against the API server, with a fake LLM.")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session (sent one after another)")
+    parser.add_argument("--llm-concurrency", default="1,8",
+                        help="Comma-separated limits on interpretations in flight; one run per limit")
+    parser.add_argument("--workers", type=int, default=4, help="Actions executing at once")
+    parser.add_argument("--transport", choices=("http", "ws"), default="http", help="NDJSON over HTTP or WebSocket")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake model time to first byte (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Fake model delay between streamed chunks (s)")
+    parser.add_argument("--output", default="load_benchmark.json", help="Where to write the results")
+    args = parser.parse_args(argv)
+    limits = [int(limit) for limit in args.llm_concurrency.split(",")]
+
+    check = IsolationCheck()
+    fake = FakeOpenAIServer(script=check, latency=args.llm_latency, token_delay=args.token_delay).start()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="omnios-load-") as tmp:
+        workspace = os.path.join(tmp, "workspace")
+        os.makedirs(workspace)
+        configure(fake.base_url, workspace, os.path.join(tmp, "cache"))
+        from ai_assistant.config import settings
+        # The shared HTTP pool must not be the bottleneck being measured
+        settings.LLM_MAX_CONNECTIONS = settings.LLM_MAX_KEEPALIVE = max(limits)
+
+        for limit in limits:
+            reset_session()
+            fake.peak_in_flight = 0
+            requests = fake.requests
+            results[f"llm_concurrency={limit}"] = result = asyncio.run(run_load(args, limit))
+            result["llm_requests"] = fake.requests - requests
+            result["llm_peak_in_flight"] = fake.peak_in_flight
+    fake.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": vars(args), "history_leaks": check.leaks, "results": results}, f, indent=2)
+
+    print(f"{args.sessions} sessions x {args.turns} turns over {args.transport}")
+    print(f"{'run':20} {'turns':>6} {'errors':>6} {'first p50':>10} {'turn p50':>10} {'turn p95':>10} {'turns/s':>8} {'peak LLM':>9}")
+    for name, r in results.items():
+        print(f"{name:20} {r['turn']['count']:6} {r['turn']['errors']:6} {r['first_command']['p50_ms']:10.1f} "
+              f"{r['turn']['p50_ms']:10.1f} {r['turn']['p95_ms']:10.1f} {r['turns_per_s']:8.2f} {r['llm_peak_in_flight']:9}")
+    print(f"\nRequests carrying another session's history: {check.leaks}")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+End-to-end latency benchmark.
+
+Runs the interpreter, the action executor and full REPL turns against a local fake
+OpenAI-compatible server, a fake DuckDuckGo backend and a synthetic screen, and writes
+p50/p95/p99 latency and throughput per suite to a JSON file.
+
+Run from the repository root:
+
+    python -m benchmarks.run --iterations 5 --output benchmark.json
+    python -m benchmarks.run --compare benchmark.json      # show changes against an earlier run
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from benchmarks.corpus import CORPUS, SCAFFOLD, WORKSPACE_FILES, fast_script, script
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fakes import DESKTOP_ACTIONS, install_fakes, safe_execute
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class Suite:
+    def __init__(self, name: str):
+        self.name = name
+        self.samples = []
+        self.errors = 0
+        self.wall = 0.0
+
+    def time(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.samples.append(elapsed)
+            self.wall += elapsed
+
+    def summary(self) -> dict:
+        ms = [s * 1000 for s in self.samples]
+        return {
+            "count": len(ms),
+            "errors": self.errors,
+            "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "max_ms": round(max(ms), 3) if ms else 0.0,
+            "throughput_per_s": round(len(ms) / self.wall, 2) if self.wall else 0.0,
+        }
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+FAST_MODEL = "fast-model"
+
+def configure(base_url: str, workspace: str, cache_dir: str, cascade: str = "off"):
+    """
+    Points the assistant at the fakes. Settings are patched after import as well,
+    because settings.py lets a local .env override the environment.
+    """
+    overrides = {
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": base_url,
+        "BASE_WORKSPACE_DIR": workspace,
+        "CACHE_DIR": cache_dir,
+        "INTERPRET_CACHE_PERSIST": "False",
+        "INTENT_EXAMPLES_PATH": os.path.join(cache_dir, "intent_examples.jsonl"),
+    }
+    os.environ.update(overrides)
+
+    from ai_assistant.config import settings
+    from ai_assistant.commands import interpreter
+    from ai_assistant.commands.cache import InterpretationCache
+
+    settings.OPENAI_API_KEY = overrides["OPENAI_API_KEY"]
+    settings.OPENAI_BASE_URL = base_url
+    settings.BASE_WORKSPACE_DIR = workspace
+    settings.CACHE_DIR = cache_dir
+    settings.INTERPRET_CACHE_PERSIST = False
+    settings.INTENT_EXAMPLES_PATH = overrides["INTENT_EXAMPLES_PATH"]
+    settings.FAST_MODEL_NAME = FAST_MODEL if cascade != "off" else ""
+    settings.CASCADE_MODE = cascade
+    # Memory-only cache, so a benchmark never touches the user's on-disk cache
+    interpreter.interpretation_cache = InterpretationCache(
+        max_size=settings.INTERPRET_CACHE_SIZE, ttl=settings.INTERPRET_CACHE_TTL
+    )
+
+    for name, content in WORKSPACE_FILES.items():
+        with open(os.path.join(workspace, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+def reset_session():
+    """Starts each iteration like a fresh session: empty history and caches."""
+    from ai_assistant.commands import interpreter
+    from ai_assistant.llm.client import get_client
+    from ai_assistant.utils import web
+    from ai_assistant.vision.watcher import screen_analyzer
+
+    get_client().clear_history()
+    interpreter.interpretation_cache.clear()
+    web._searcher.clear()
+    screen_analyzer.cache = type(screen_analyzer.cache)(
+        max_entries=screen_analyzer.cache.max_entries,
+        ttl=screen_analyzer.cache.ttl,
+        tolerance=screen_analyzer.cache.tolerance,
+    )
+
+def check_tiers() -> list[str]:
+    """Reports corpus entries that are no longer answered by their expected tier."""
+    from ai_assistant.commands import interpreter
+
+    mismatches = []
+    for item in CORPUS:
+        if interpreter._match_rules(item["input"]) is not None:
+            tier = "rules"
+        elif interpreter._classify(item["input"]) is not None:
+            tier = "classifier"
+        else:
+            tier = "llm"
+        if tier != item["tier"]:
+            mismatches.append(f"{item['input']!r}: expected {item['tier']}, answered by {tier}")
+    return mismatches
+
+def run_turn(user_input: str, scheduler) -> list[str]:
+    """One REPL turn without the prompts: interpret, then execute every command of the plan."""
+    from ai_assistant.commands.interpreter import interpret_command
+
+    commands = interpret_command(user_input)
+    futures = [scheduler.submit(command) for command in commands if command.get("action") != "respond"]
+    return [future.result() for future in futures]
+
+def run_plan(commands: list[dict], scheduler) -> list[str]:
+    return [future.result() for future in scheduler.submit_many(commands)]
+
+def run_stream(user_input: str) -> float:
+    """Consumes interpret_command_stream(); returns the time to the first command."""
+    from ai_assistant.commands.interpreter import interpret_command_stream
+
+    start = time.perf_counter()
+    first = None
+    for _ in interpret_command_stream(user_input):
+        if first is None:
+            first = time.perf_counter() - start
+    return first or 0.0
+
+def run(args) -> dict:
+    from ai_assistant.executor.scheduler import PlanScheduler
+    from ai_assistant.commands.interpreter import interpret_command
+
+    suites = {}
+    def suite(name: str) -> Suite:
+        return suites.setdefault(name, Suite(name))
+
+    # Desktop actions are skipped by safe_execute, so timing them would only measure the skip
+    commands = [
+        command for item in CORPUS for command in json.loads(item["reply"])
+        if command["action"] not in DESKTOP_ACTIONS
+    ]
+    scheduler = PlanScheduler(executor_fn=safe_execute)
+    first_command = Suite("interpret_stream_first_command")
+
+    try:
+        for _ in range(args.iterations):
+            # Cold: every input interpreted for the first time in the session
+            reset_session()
+            for item in CORPUS:
+                suite("interpret").time(interpret_command, item["input"])
+                suite(f"interpret[{item['tier']}]").samples.append(suite("interpret").samples[-1])
+
+            # Warm: the same inputs again, now answered from the interpretation cache
+            for item in CORPUS:
+                suite("interpret_warm").time(interpret_command, item["input"])
+
+            if args.stream:
+                reset_session()
+                for item in CORPUS:
+                    first_command.samples.append(suite("interpret_stream").time(run_stream, item["input"]))
+
+            reset_session()
+            for command in commands:
+                suite("execute").time(safe_execute, command)
+                suite(f"execute[{command['action']}]").samples.append(suite("execute").samples[-1])
+
+            reset_session()
+            for item in CORPUS:
+                suite("turn").time(run_turn, item["input"], scheduler)
+
+            # A whole scaffold plan: ready writes are coalesced into one batch
+            suite("execute_plan[scaffold]").time(run_plan, SCAFFOLD, scheduler)
+    finally:
+        scheduler.shutdown()
+
+    if first_command.samples:
+        first_command.wall = sum(first_command.samples)
+        suites[first_command.name] = first_command
+    for s in suites.values():
+        if not s.wall:
+            s.wall = sum(s.samples)
+    return {name: s.summary() for name, s in sorted(suites.items())}
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    lines = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if before[key]:
+                change = (result[key] - before[key]) / before[key] * 100
+                lines.append(f"{name:40} {key:7} {before[key]:10.2f} -> {result[key]:10.2f} ms ({change:+.1f}%)")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark with local fakes.")
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the corpus per suite")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake model time to first byte (s)")
+    parser.add_argument("--connect-latency", type=float, default=0.05,
+                        help="Fake connection setup time (s), paid once per new connection")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Fake model delay between streamed chunks (s)")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Fake web search latency (s)")
+    parser.add_argument("--screen-latency", type=float, default=0.05, help="Fake screen capture latency (s)")
+    parser.add_argument("--cascade", choices=("off", "cascade", "race"), default="off",
+                        help="Interpret with a fast model first (cascade) or race it against the main model")
+    parser.add_argument("--fast-latency", type=float, default=0.05, help="Fake fast model time to first byte (s)")
+    parser.add_argument("--stream", action="store_true", help="Also benchmark the streaming interpreter")
+    parser.add_argument("--output", default="benchmark.json", help="Where to write the results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(script=script(), latency=args.llm_latency, token_delay=args.token_delay,
+                              connect_latency=args.connect_latency,
+                              model_latency={FAST_MODEL: args.fast_latency},
+                              model_script={FAST_MODEL: fast_script()}).start()
+    with tempfile.TemporaryDirectory(prefix="omnios-bench-") as tmp:
+        workspace = os.path.join(tmp, "workspace")
+        os.makedirs(workspace)
+        configure(server.base_url, workspace, os.path.join(tmp, "cache"), cascade=args.cascade)
+        install_fakes(ddgs_latency=args.search_latency, screen_latency=args.screen_latency)
+
+        mismatches = check_tiers()
+        for line in mismatches:
+            print(f"warning: corpus tier changed: {line}", file=sys.stderr)
+
+        started = time.perf_counter()
+        results = run(args)
+        elapsed = time.perf_counter() - started
+    server.stop()
+
+    from ai_assistant.llm.client import get_cascade_stats, get_transport_metrics
+    transport = get_transport_metrics()
+    cascade = get_cascade_stats() if args.cascade != "off" else None
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "corpus_size": len(CORPUS),
+            "llm_latency_s": args.llm_latency,
+            "token_delay_s": args.token_delay,
+            "search_latency_s": args.search_latency,
+            "screen_latency_s": args.screen_latency,
+            "connect_latency_s": args.connect_latency,
+            "llm_requests": server.requests,
+            "llm_connections": server.connections,
+            "llm_transport": transport,
+            "cascade": args.cascade,
+            "fast_latency_s": args.fast_latency,
+            "cascade_stats": cascade,
+            "duration_s": round(elapsed, 2),
+            "tier_mismatches": mismatches,
+        },
+        "results": results,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'suite':40} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>10}")
+    for name, r in results.items():
+        print(f"{name:40} {r['count']:6} {r['p50_ms']:10.2f} {r['p95_ms']:10.2f} {r['p99_ms']:10.2f} {r['throughput_per_s']:10.2f}")
+    print(f"\nLLM HTTP: {transport['requests']} requests over {server.connections} connections, "
+          f"TTFB p50 {transport['ttfb']['p50_ms']:.1f} ms, p95 {transport['ttfb']['p95_ms']:.1f} ms")
+    if cascade:
+        print(f"Cascade ({args.cascade}): {cascade['answered_by_fast']}/{cascade['requests']} answered by the fast model, "
+              f"escalation rate {cascade['escalation_rate']:.0%}, {cascade['latency_saved_ms']:.0f} ms saved, "
+              f"{cascade['latency_added_ms']:.0f} ms added by escalations")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print("\nChanges against " + args.compare)
+        for line in compare(results, baseline):
+            print(line)
+    return report
+
+if __name__ == "__main__":
+    main()
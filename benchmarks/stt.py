@@ -0,0 +1,141 @@
+"""
+Speech recognition backend benchmark.
+
+Transcribes a fixed corpus of WAV files with each backend and reports model load time,
+per-utterance latency, real-time factor (processing time / audio duration; below 1 is
+faster than real time) and, where a reference transcript exists, word error rate.
+
+The corpus is a directory of WAV files, each optionally next to a same-named .txt file
+holding its reference transcript. Without --corpus, synthetic utterances are used: they
+measure speed only (there are no words to recognize).
+
+Run from the repository root:
+
+    python -m benchmarks.stt --corpus recordings/ --backends google,vosk,whisper
+"""
+import os
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+from benchmarks.fakes import synthesize_utterance
+from benchmarks.run import percentile
+
+def load_corpus(directory: str) -> list[tuple[str, str]]:
+    """[(wav path, reference transcript or None)] in a stable order."""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        reference = os.path.splitext(path)[0] + ".txt"
+        text = None
+        if os.path.exists(reference):
+            with open(reference, encoding="utf-8") as f:
+                text = f.read().strip()
+        corpus.append((path, text))
+    return corpus
+
+def synthetic_corpus(directory: str) -> list[tuple[str, str]]:
+    corpus = []
+    for i, seconds in enumerate((1.0, 2.0, 3.0, 5.0)):
+        path = os.path.join(directory, f"synthetic_{i}.wav")
+        synthesize_utterance(path, seconds, seed=i)
+        corpus.append((path, None))
+    return corpus
+
+def word_errors(reference: str, hypothesis: str) -> int:
+    """Word-level edit distance (substitutions + deletions + insertions)."""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1]
+
+def bench_backend(name: str, corpus, iterations: int) -> dict:
+    import speech_recognition as sr
+    from ai_assistant.voice.stt import BACKENDS
+
+    backend = BACKENDS[name]()
+    started = time.perf_counter()
+    try:
+        backend.load()
+    except Exception as e:
+        return {"available": False, "error": f"{type(e).__name__}: {e}"}
+    load_ms = (time.perf_counter() - started) * 1000
+
+    latencies, audio_seconds, busy_seconds = [], 0.0, 0.0
+    errors = unrecognized = 0
+    ref_words = wrong_words = 0
+    for _ in range(iterations):
+        for path, reference in corpus:
+            with sr.AudioFile(path) as source:
+                audio = sr.Recognizer().record(source)
+            duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            started = time.perf_counter()
+            try:
+                text = backend.recognize(audio)
+            except sr.UnknownValueError:
+                text = ""
+                unrecognized += 1
+            except Exception:
+                errors += 1
+                continue
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed * 1000)
+            audio_seconds += duration
+            busy_seconds += elapsed
+            if reference is not None:
+                ref_words += len(reference.split())
+                wrong_words += word_errors(reference, text)
+
+    return {
+        "available": True,
+        "offline": backend.offline,
+        "load_ms": round(load_ms, 1),
+        "count": len(latencies),
+        "errors": errors,
+        "unrecognized": unrecognized,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "rtf": round(busy_seconds / audio_seconds, 3) if audio_seconds else None,
+        "wer": round(wrong_words / ref_words, 3) if ref_words else None,
+    }
+
+def main(argv=None):
+    from ai_assistant.voice.stt import BACKENDS
+
+    parser = argparse.ArgumentParser(description="Compare speech recognition backends on a WAV corpus.")
+    parser.add_argument("--corpus", help="Directory of .wav files (with optional .txt references)")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backends to compare")
+    parser.add_argument("--iterations", type=int, default=1, help="Passes over the corpus per backend")
+    parser.add_argument("--output", default="stt_benchmark.json", help="Where to write the results")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="omnios-stt-") as tmp:
+        corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(tmp)
+        if not corpus:
+            parser.error(f"no .wav files in {args.corpus}")
+        results = {name: bench_backend(name, corpus, args.iterations)
+                   for name in (b.strip().lower() for b in args.backends.split(",")) if name}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": {**vars(args), "corpus_size": len(corpus)}, "results": results}, f, indent=2)
+
+    print(f"{'backend':10} {'load ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'RTF':>7} {'WER':>7} {'errors':>7}")
+    for name, r in results.items():
+        if not r["available"]:
+            print(f"{name:10} unavailable: {r['error']}")
+            continue
+        wer = f"{r['wer']:.1%}" if r["wer"] is not None else "-"
+        rtf = f"{r['rtf']:.3f}" if r["rtf"] is not None else "-"
+        print(f"{name:10} {r['load_ms']:9.1f} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {rtf:>7} {wer:>7} {r['errors']:7}")
+
+    usable = [(r["p50_ms"], name) for name, r in results.items() if r["available"] and r["count"]]
+    if usable:
+        print(f"\nFastest: {min(usable)[1]} (set STT_BACKEND={min(usable)[1]})")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
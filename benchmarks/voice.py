@@ -0,0 +1,107 @@
+"""
+Voice latency benchmark: speculative interpretation of interim transcripts.
+
+Plays synthesized utterances through the listener in real time (as if spoken into the
+microphone), with a scripted recognizer standing in for the STT service and the local
+fake OpenAI server for the LLM, and measures the time from the end of speech until the
+commands are ready, with and without speculation.
+
+Run from the repository root:
+
+    python -m benchmarks.voice --iterations 3 --output voice_benchmark.json
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from benchmarks.corpus import script
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fakes import ScriptedRecognizer, synthesize_utterance
+from benchmarks.run import Suite, configure, reset_session
+
+SECONDS_PER_WORD = 0.35
+LEAD_SECONDS = 0.3
+
+# (what is said, final transcript if it differs from the interim ones)
+UTTERANCES = [
+    ("open chrome", None),
+    ("tell me a joke about computers", None),
+    ("what is the difference between a list and a tuple in python", None),
+    ("draft a polite reply declining tomorrow's meeting", None),
+    ("open note pad", "open notepad"),   # Interim transcripts differ from the final one: a miss
+]
+
+def run_utterance(path: str, recognizer: ScriptedRecognizer, speculate: bool) -> float:
+    """Returns the seconds from the end of speech until the commands are ready."""
+    from ai_assistant.config import settings
+    from ai_assistant.commands.interpreter import interpret_command
+    from ai_assistant.voice.listener import Listener
+    from ai_assistant.voice.speculation import Speculator
+
+    listener = Listener(recognize=recognizer.final, recognize_partial=recognizer.partial)
+    speculator = Speculator(stable_partials=settings.VOICE_STABLE_PARTIALS) if speculate else None
+    started = time.perf_counter()
+    try:
+        final = listener.listen_file(path, on_partial=speculator.on_partial if speculator else None)
+        commands = speculator.resolve(final) if speculator else None
+        if commands is None:
+            commands = interpret_command(final)
+    finally:
+        if speculator:
+            speculator.shutdown()
+    return time.perf_counter() - started - (LEAD_SECONDS + recognizer.speech_seconds)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice latency benchmark with recorded-style utterances.")
+    parser.add_argument("--iterations", type=int, default=2, help="Passes over the utterances per mode")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="Fake model time to first byte (s)")
+    parser.add_argument("--stt-latency", type=float, default=0.3, help="Scripted final recognition time (s)")
+    parser.add_argument("--partial-latency", type=float, default=0.1, help="Scripted interim recognition time (s)")
+    parser.add_argument("--output", default="voice_benchmark.json", help="Where to write the results")
+    args = parser.parse_args(argv)
+
+    from ai_assistant.voice.speculation import speculation_stats
+
+    server = FakeOpenAIServer(script=script(), latency=args.llm_latency).start()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="omnios-voice-") as tmp:
+        workspace = os.path.join(tmp, "workspace")
+        os.makedirs(workspace)
+        configure(server.base_url, workspace, os.path.join(tmp, "cache"))
+
+        recordings = []
+        for i, (spoken, final) in enumerate(UTTERANCES):
+            path = os.path.join(tmp, f"utterance_{i}.wav")
+            seconds = SECONDS_PER_WORD * len(spoken.split())
+            synthesize_utterance(path, seconds, lead=LEAD_SECONDS, seed=i)
+            recordings.append((path, spoken, final, seconds))
+
+        for mode, speculate in (("sequential", False), ("speculative", True)):
+            suite = Suite(mode)
+            speculation_stats.reset()
+            for _ in range(args.iterations):
+                for path, spoken, final, seconds in recordings:
+                    reset_session()
+                    recognizer = ScriptedRecognizer(spoken, seconds, final=final, latency=args.stt_latency,
+                                                    partial_latency=args.partial_latency)
+                    suite.samples.append(run_utterance(path, recognizer, speculate))
+            suite.wall = sum(suite.samples)
+            results[mode] = suite.summary()
+            if speculate:
+                results[mode]["speculation"] = speculation_stats.summary()
+    server.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": vars(args), "results": results}, f, indent=2)
+
+    print(f"{'mode':14} {'count':>6} {'p50 ms':>10} {'p95 ms':>10}   (end of speech -> commands ready)")
+    for mode, r in results.items():
+        print(f"{mode:14} {r['count']:6} {r['p50_ms']:10.1f} {r['p95_ms']:10.1f}")
+    s = results["speculative"]["speculation"]
+    print(f"\nSpeculation: {s['hits']} hits, {s['misses']} misses (hit rate {s['hit_rate']:.0%}), {s['saved_ms']:.0f} ms saved")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
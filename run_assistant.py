@@ -5,6 +5,11 @@ import os
 # Add the current directory to sys.path to ensure modules are found
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Start profiling before anything from the package is imported
+if "--profile-startup" in sys.argv:
+    from ai_assistant.utils.startup import startup_profiler
+    startup_profiler.enable()
+
 from ai_assistant.main import main
 
 if __name__ == "__main__":
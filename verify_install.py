@@ -15,16 +15,17 @@ try:
 
     print("Verifying Rule-Based Interpreter...")
     cmd = interpret_command("open chrome")
-    assert cmd == {"action": "open_app", "target": "chrome"}
+    assert cmd == [{"action": "open_app", "params": {"name": "chrome"}, "confidence": 1.0}]
     print("Rule-based interpreter passed.")
 
     print("Verifying Action Executor (Mocked)...")
     # Mocking os.startfile to avoid actually opening things during test
     if hasattr(os, 'startfile'):
         os.startfile = MagicMock()
+    os.system = MagicMock(return_value=0)
     
-    res = execute_action({"action": "open_app", "target": "notepad"})
-    assert "Successfully opened" in res
+    res = execute_action({"action": "open_app", "params": {"name": "notepad"}})
+    assert "Launched application" in res
     print("Action executor passed.")
 
     print("Verifying LLM Fallback Structure...")